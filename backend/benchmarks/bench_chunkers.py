@@ -0,0 +1,171 @@
+"""
+Benchmark the structural chunkers of brace languages (Go, Rust, Java, C,
+C++) against the size-based line windows they replace.
+
+For every language it reports throughput, chunks per file, how full the
+chunks are relative to the code embedder's token limit, and how many
+definitions (functions, types, impls) that would fit in one chunk end up
+split across chunks. Token counts come from the CodeT5 tokenizer when it is available,
+otherwise from the same estimate the ingest falls back to.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_chunkers
+    python -m benchmarks.bench_chunkers --path ~/src/linux --path ~/src/tokio --max-files 500
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+
+from embeddings.token_budget import get_token_counter
+from repo_ingestion.brace_chunker import scan_blocks
+from repo_ingestion.chunker_new import chunk_brace_language, detect_language, pack_lines
+
+LANGUAGES = ("go", "rust", "java", "c", "cpp")
+
+
+def synthetic_source(language: str, functions: int, rng: random.Random) -> str:
+    """A file of `functions` definitions with braces in strings and comments."""
+    parts = []
+    for i in range(functions):
+        body_lines = rng.randint(3, 60)
+        body = "".join(
+            f"        total += values[{j}] * {rng.randint(1, 99)}; // {{ not a block\n"
+            for j in range(body_lines)
+        )
+        literal = '"format {%d} }"' % i
+        if language == "go":
+            parts.append(f"// fn{i} sums values.\nfunc fn{i}(values []int) int {{\n    total := 0\n"
+                         f"    if len(values) > 0 {{\n{body}    }}\n    _ = {literal}\n    return total\n}}\n")
+        elif language == "rust":
+            parts.append(f"/// fn{i} sums values.\npub fn fn{i}<'a>(values: &'a [i64]) -> i64 {{\n"
+                         f"    let mut total = 0;\n    for _ in 0..1 {{\n{body}    }}\n"
+                         f"    let _s = {literal};\n    let _c = '{{';\n    total\n}}\n")
+        elif language == "java":
+            parts.append(f"    /** fn{i} sums values. */\n    public int fn{i}(int[] values) {{\n"
+                         f"        int total = 0;\n        if (values.length > 0) {{\n{body}        }}\n"
+                         f"        String s = {literal};\n        return total;\n    }}\n")
+        else:
+            parts.append(f"/* fn{i} sums values {{ */\nint fn{i}(const int *values) {{\n    int total = 0;\n"
+                         f"    if (values) {{\n{body}    }}\n    const char *s = {literal};\n    return total;\n}}\n")
+
+    if language == "java":
+        return "package bench;\n\npublic class Bench {\n" + "\n".join(parts) + "}\n"
+    header = {"go": "package bench\n", "rust": "use std::fmt;\n",
+              "c": "#include <stdio.h>\n", "cpp": "#include <vector>\n"}[language]
+    return header + "\n" + "\n".join(parts)
+
+
+def collect_files(paths, max_files: int) -> dict:
+    """{language: [source, ...]} of the brace-language files under `paths`."""
+    corpus = {language: [] for language in LANGUAGES}
+    for root in paths:
+        for directory, _, names in os.walk(os.path.expanduser(root)):
+            for name in names:
+                language = detect_language(name)
+                if language not in corpus or len(corpus[language]) >= max_files:
+                    continue
+                try:
+                    with open(os.path.join(directory, name), encoding="utf-8") as f:
+                        corpus[language].append(f.read())
+                except (OSError, UnicodeDecodeError):
+                    continue
+    return corpus
+
+
+def fitting_definitions(blocks, prefix, limit):
+    """
+    (start, end) of the outermost multi-line blocks that fit in one chunk,
+    descending into the ones that do not (namespaces, large classes).
+    """
+    for block in blocks:
+        if block.close_line == block.open_line:
+            continue
+        if prefix[block.close_line] - prefix[block.open_line - 1] <= limit:
+            yield block.open_line, block.close_line
+        else:
+            yield from fitting_definitions(block.children, prefix, limit)
+
+
+def split_definitions(definitions, ranges) -> int:
+    """Definitions not contained in any single chunk."""
+    return sum(
+        1 for start, end in definitions
+        if not any(lo <= start and end <= hi for lo, hi in ranges)
+    )
+
+
+def measure(language: str, sources, counter) -> dict:
+    results = {}
+    for label in ("size", "structural"):
+        chunks = tokens = split = definitions = 0
+        elapsed = 0.0
+
+        for source in sources:
+            lines = source.splitlines()
+            started = time.perf_counter()
+            if label == "structural":
+                pieces = chunk_brace_language(source, language, counter)
+                ranges = [(p["start_line"], p["end_line"]) for p in pieces]
+                texts = [p["text"] for p in pieces]
+            else:
+                costs = counter.line_costs(lines)
+                windows = pack_lines(costs, counter.limit, int(counter.limit * 0.1))
+                ranges = [(start + 1, end) for start, end in windows]
+                texts = ["\n".join(lines[start:end]) for start, end in windows]
+            elapsed += time.perf_counter() - started
+
+            chunks += len(texts)
+            tokens += sum(counter.count_many(texts))
+            # a definition that fits the budget is what a query wants in one piece
+            prefix = list(itertools.accumulate(counter.line_costs(lines), initial=0))
+            blocks = list(fitting_definitions(scan_blocks("\n".join(lines), language), prefix, counter.limit))
+            definitions += len(blocks)
+            split += split_definitions(blocks, ranges)
+
+        size = sum(len(source.encode("utf-8")) for source in sources)
+        results[label] = {
+            "mb_per_s": size / 1e6 / elapsed if elapsed else 0.0,
+            "chunks_per_file": chunks / len(sources),
+            "fill": tokens / (chunks * counter.limit) if chunks else 0.0,
+            "split_definitions": f"{split}/{definitions}",
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", action="append", default=[],
+                        help="directory with real sources (repeatable); default: synthetic files")
+    parser.add_argument("--max-files", type=int, default=300, help="files per language from --path")
+    parser.add_argument("--synthetic-files", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counter = get_token_counter("code")
+    print(f"token counts: {'CodeT5 tokenizer' if counter.exact else 'estimated'}, "
+          f"limit {counter.limit} tokens per chunk")
+
+    if args.path:
+        corpus = collect_files(args.path, args.max_files)
+    else:
+        rng = random.Random(args.seed)
+        corpus = {
+            language: [synthetic_source(language, rng.randint(5, 40), rng) for _ in range(args.synthetic_files)]
+            for language in LANGUAGES
+        }
+
+    print(f"{'language':<9}{'chunker':<12}{'files':>6}{'MB/s':>8}{'chunks/file':>13}{'fill':>7}  split definitions")
+    for language, sources in corpus.items():
+        if not sources:
+            continue
+        for label, row in measure(language, sources, counter).items():
+            print(f"{language:<9}{label:<12}{len(sources):>6}{row['mb_per_s']:>8.1f}"
+                  f"{row['chunks_per_file']:>13.1f}{row['fill']:>7.0%}  {row['split_definitions']}")
+
+
+if __name__ == "__main__":
+    main()
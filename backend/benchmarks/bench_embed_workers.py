@@ -0,0 +1,86 @@
+"""
+Benchmark how embedding throughput scales with the number of embedding
+worker processes (GITSAGE_EMBED_CODE_WORKERS / GITSAGE_EMBED_TEXT_WORKERS).
+
+Chunks the fixture repos (plus an optional --path) the way the ingest
+does, then for each route embeds them in-process and on pools of 1, 2, 4...
+workers, with as many batches in flight as there are workers (what the
+streaming ingest does) and the cores split evenly between the workers.
+Prints chunks/s, the speedup over one worker and the scaling efficiency
+(speedup / workers; 100% is linear). Vectors of every pool are checked
+against the in-process ones.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_embed_workers
+    python -m benchmarks.bench_embed_workers --route code --workers 1 2 4 8 --chunks 2000
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_embedders import load_corpus, route_texts, torch_embedder
+from benchmarks.github_standin import FIXTURES_DIR
+from config import INGEST_EMBED_BATCH_SIZE
+from embeddings.onnx_backend import cosine_parity
+from embeddings.worker_pool import PooledEmbedder
+
+
+def embed_batches(embedder, texts, in_flight: int) -> tuple:
+    """(seconds, vectors) to embed texts in ingest-sized batches, `in_flight` at once."""
+    batches = [texts[start:start + INGEST_EMBED_BATCH_SIZE] for start in range(0, len(texts), INGEST_EMBED_BATCH_SIZE)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=in_flight) as threads:
+        results = list(threads.map(embedder.embed, batches))
+    elapsed = time.perf_counter() - started
+    return elapsed, np.asarray([vector for result in results for vector in result], dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--path", action="append", default=[], help="extra source directory (repeatable)")
+    parser.add_argument("--route", choices=("code", "text"), action="append", help="default: both")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--chunks", type=int, default=1000, help="chunks per route")
+    args = parser.parse_args()
+
+    texts = route_texts(load_corpus(args.fixtures, args.path), args.chunks)
+    cores = os.cpu_count() or 1
+
+    for route in args.route or ("code", "text"):
+        route_chunks = texts[route]
+        if not route_chunks:
+            continue
+        print(f"\n{route}: {len(route_chunks)} chunks, {cores} cores")
+        print(f"{'workers':<10}{'threads':>8}{'chunks/s':>10}{'speedup':>9}{'scaling':>9}{'min cos':>9}")
+
+        embedder = torch_embedder(route)
+        embedder.embed(route_chunks[:8])  # warm-up
+        seconds, reference = embed_batches(embedder, route_chunks, 1)
+        print(f"{'in-proc':<10}{cores:>8}{len(route_chunks) / seconds:>10.1f}")
+
+        single = None
+        for workers in args.workers:
+            pool = PooledEmbedder(route, workers, threads=max(1, cores // workers))
+            try:
+                # start every worker and load its model before timing
+                pool.embed(route_chunks[:workers * 8])
+                seconds, vectors = embed_batches(pool, route_chunks, workers)
+            finally:
+                pool.shutdown()
+            rate = len(route_chunks) / seconds
+            if workers == 1:
+                single = rate
+            speedup = rate / single if single else float("nan")
+            print(f"{workers:<10}{max(1, cores // workers):>8}{rate:>10.1f}{speedup:>8.2f}x"
+                  f"{speedup / workers:>9.0%}{cosine_parity(reference, vectors).min():>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
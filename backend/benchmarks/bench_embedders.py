@@ -0,0 +1,151 @@
+"""
+Benchmark the embedding backends: eager PyTorch against ONNX Runtime
+(fp32 and int8-quantized).
+
+Chunks the fixture repos (plus an optional --path) the way the ingest
+does, then for each route (CodeT5 for code, MiniLM for text) and backend
+prints batch throughput, single-query latency (what every /ask pays) and
+parity with the torch vectors: the cosine of each chunk's vector with its
+torch vector, and how many of the torch top-10 chunks for a set of queries
+each backend also ranks in its top 10. Exits non-zero if a backend's
+vectors drift below onnx_backend.MIN_PARITY_COSINE.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_embedders
+    python -m benchmarks.bench_embedders --backends onnx-int8 --chunks 2000 --path ~/src/project
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.github_standin import FIXTURES_DIR, load_fixtures
+from embeddings.onnx_backend import BACKENDS, MIN_PARITY_COSINE, OnnxEmbedder, cosine_parity
+from repo_ingestion.chunker_new import chunk_file
+from repo_ingestion.validation_engine import validate_and_clean
+
+QUERIES = [
+    "where are files downloaded from github",
+    "how is the vector store queried",
+    "parse command line arguments",
+    "retry a failed http request with backoff",
+    "what does this project do",
+    "installation instructions",
+    "error handling when the file cannot be read",
+    "unit tests for the parser",
+]
+
+TOP_K = 10
+
+
+def load_corpus(fixtures_dir: str, paths) -> dict:
+    files = {}
+    for name, fixture in load_fixtures(fixtures_dir).items():
+        files.update({f"{name}/{path}": content for path, content in fixture["files"].items()})
+    for root in paths:
+        for directory, _, names in os.walk(os.path.expanduser(root)):
+            for file_name in names:
+                path = os.path.join(directory, file_name)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        files[path] = f.read()
+                except (OSError, UnicodeDecodeError):
+                    continue
+    return files
+
+
+def route_texts(files: dict, limit: int) -> dict:
+    """{route: [chunk text, ...]} of the corpus, at most `limit` per route."""
+    texts = {"code": [], "text": []}
+    for path, content in files.items():
+        cleaned = validate_and_clean(content)
+        if not cleaned:
+            continue
+        for chunk in chunk_file(path, cleaned):
+            if len(texts[chunk["type"]]) < limit:
+                texts[chunk["type"]].append(chunk["text"])
+    return texts
+
+
+def torch_embedder(route: str):
+    if route == "code":
+        from embeddings.code_embedder_new import CodeEmbedder
+        return CodeEmbedder()
+    from embeddings.sentence_embedder import SentenceEmbedder
+    return SentenceEmbedder()
+
+
+def top_k(query_vectors: np.ndarray, chunk_vectors: np.ndarray) -> list:
+    q = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    c = chunk_vectors / np.maximum(np.linalg.norm(chunk_vectors, axis=1, keepdims=True), 1e-12)
+    scores = q @ c.T
+    return [set(np.argsort(-row)[:TOP_K]) for row in scores]
+
+
+def measure(embedder, texts, repeat: int) -> dict:
+    embedder.embed(texts[:8])  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        vectors = embedder.embed(texts)
+        best = min(best, time.perf_counter() - started)
+
+    latencies = []
+    for query in QUERIES * 3:
+        started = time.perf_counter()
+        embedder.embed([query])
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "vectors": np.asarray(vectors, dtype=np.float32),
+        "queries": np.asarray(embedder.embed(QUERIES), dtype=np.float32),
+        "chunks_per_s": len(texts) / best,
+        "query_ms": statistics.median(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--path", action="append", default=[], help="extra source directory (repeatable)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--chunks", type=int, default=500, help="chunks per route")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    texts = route_texts(load_corpus(args.fixtures, args.path), args.chunks)
+    failed = []
+
+    for route, route_chunks in texts.items():
+        if not route_chunks:
+            continue
+        print(f"\n{route}: {len(route_chunks)} chunks")
+        print(f"{'backend':<11}{'chunks/s':>10}{'query ms':>10}{'min cos':>10}{'mean cos':>10}  top-{TOP_K} overlap")
+
+        reference = measure(torch_embedder(route), route_chunks, args.repeat)
+        reference_top = top_k(reference["queries"], reference["vectors"])
+        print(f"{'torch':<11}{reference['chunks_per_s']:>10.1f}{reference['query_ms']:>10.1f}")
+
+        for backend in args.backends:
+            result = measure(OnnxEmbedder(route, backend), route_chunks, args.repeat)
+            cosines = cosine_parity(reference["vectors"], result["vectors"])
+            overlap = statistics.mean(
+                len(expected & found) / len(expected)
+                for expected, found in zip(reference_top, top_k(result["queries"], result["vectors"]))
+            )
+            print(f"{backend:<11}{result['chunks_per_s']:>10.1f}{result['query_ms']:>10.1f}"
+                  f"{cosines.min():>10.4f}{cosines.mean():>10.4f}  {overlap:.0%}"
+                  f"   ({result['chunks_per_s'] / reference['chunks_per_s']:.1f}x)")
+            if cosines.min() < MIN_PARITY_COSINE[backend]:
+                failed.append(f"{route}/{backend}")
+
+    if failed:
+        raise SystemExit(f"parity below MIN_PARITY_COSINE for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark the /ingest pipeline end to end against the GitHub stand-in.
+
+Starts github_standin.py in-process, points the ingestion config at it
+and runs `ingest_repository` for each fixture. The first run of a repo is
+a cold ingest into a fresh data directory (which also holds the
+benchmark's ChromaDB, so the production store is never written); later runs
+show the incremental / skip path. Embedding and ChromaDB are the real ones,
+so the numbers include model time.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_ingest --runs 2
+    python -m benchmarks.bench_ingest --synthetic 2000 --latency-ms 40 --rate-limit 500 --rate-window 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.github_standin import (
+    FIXTURES_DIR, Simulation, load_fixtures, start_standin, synthetic_fixture,
+)
+
+
+async def _ingest_once(ingest_repository, repo_name: str) -> dict:
+    started = time.perf_counter()
+    result = await ingest_repository(f"https://github.com/{repo_name}")
+    elapsed = time.perf_counter() - started
+
+    return {
+        "repo": repo_name,
+        "seconds": round(elapsed, 3),
+        "skipped": result.get("skipped", False),
+        "chunk_count": result.get("chunk_count", 0),
+        "failed_files": len(result.get("failed_files") or []),
+        "stages": result.get("stages"),
+    }
+
+
+async def run_benchmark(args, fixtures: dict) -> dict:
+    simulation = Simulation(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate, rate_limit=args.rate_limit,
+        rate_window=args.rate_window, tree_limit=args.tree_limit, seed=args.seed,
+    )
+    runner, base_url = await start_standin(fixtures, simulation, port=args.port)
+
+    # config is read on import, so the environment is set first
+    os.environ["GITSAGE_GITHUB_API_URL"] = base_url
+    os.environ["GITSAGE_GITHUB_RAW_URL"] = f"{base_url}/raw"
+    os.environ["GITSAGE_DATA_DIR"] = args.data_dir or tempfile.mkdtemp(prefix="gitsage-bench-")
+    # the vector store goes with the rest of the ingest state; set explicitly
+    # so a GITSAGE_CHROMA_DIR in .env cannot point it at the production store
+    # (load_dotenv leaves variables that are already set alone)
+    os.environ["GITSAGE_CHROMA_DIR"] = os.path.join(os.environ["GITSAGE_DATA_DIR"], "chroma")
+    os.environ["GITSAGE_INGEST_MODE"] = args.mode
+
+    from repo_ingestion.github_client import close_github_client
+    from repo_ingestion.unified_pipeline import ingest_repository
+
+    runs = []
+    try:
+        for run_index in range(args.runs):
+            if args.parallel:
+                results = await asyncio.gather(*(
+                    _ingest_once(ingest_repository, name) for name in fixtures
+                ))
+            else:
+                results = [await _ingest_once(ingest_repository, name) for name in fixtures]
+
+            for result in results:
+                result["run"] = run_index + 1
+                print(f"run {result['run']} {result['repo']}: {result['seconds']:.2f}s, "
+                      f"{result['chunk_count']} chunks, {result['failed_files']} failed, "
+                      f"skipped={result['skipped']}")
+            runs.extend(results)
+    finally:
+        await close_github_client()
+        await runner.cleanup()
+
+    return {
+        "mode": args.mode,
+        "data_dir": os.environ["GITSAGE_DATA_DIR"],
+        "runs": runs,
+        "standin": dict(simulation.stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="benchmark a generated repo with N modules instead of the fixtures")
+    parser.add_argument("--mode", choices=("files", "archive"), default="files")
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--parallel", action="store_true", help="ingest all repos of a run concurrently")
+    parser.add_argument("--data-dir", help="GITSAGE_DATA_DIR to use (default: fresh temp dir)")
+    parser.add_argument("--port", type=int, default=0, help="stand-in port (default: any free port)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--tree-limit", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        name = f"gitsage-fixtures/synthetic-{args.synthetic}"
+        fixtures = {name: synthetic_fixture(name, args.synthetic, seed=args.seed)}
+    else:
+        fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No fixtures found in {args.fixtures}")
+
+    results = asyncio.run(run_benchmark(args, fixtures))
+    print(f"stand-in: {results['standin']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark file validation/cleaning: the original per-check pipeline
+(is_valid_text, is_binary, is_minified, is_too_small, clean_file_content)
+against validation_engine.validate_and_clean.
+
+Runs both over the same corpus, fails if any file gets a different
+decision or cleaned text, and prints the throughput of each.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_validation
+    python -m benchmarks.bench_validation --synthetic 3000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.github_standin import FIXTURES_DIR, load_fixtures, synthetic_fixture
+from repo_ingestion.file_cleaner import clean_file_content
+from repo_ingestion.file_processor import is_binary, is_minified, is_too_small, is_valid_text
+from repo_ingestion.validation_engine import validate_and_clean
+
+
+def legacy_validate(content):
+    """The checks validate_files used to run, one after another."""
+    if not is_valid_text(content):
+        return None
+    if is_binary(content):
+        return None
+    if is_minified(content):
+        return None
+    if is_too_small(content):
+        return None
+    return clean_file_content(content) or None
+
+
+def edge_case_files(seed: int = 0) -> dict:
+    """Files that exercise each rejection path and the separator handling."""
+    rng = random.Random(seed)
+    banner = "".join(f"# Copyright line {i}\n" for i in range(30))
+    body = "".join(f"def f_{i}(x):   \n    return x + {i}\n\n\n\n" for i in range(400))
+
+    return {
+        "edge/banner.py": banner + body,
+        "edge/crlf.py": (banner + body).replace("\n", "\r\n"),
+        "edge/generated.py": "// Code generated by protoc. DO NOT EDIT.\n" + body,
+        "edge/generated_late.py": body + "# This file is @generated\n",
+        "edge/minified.js": "var a=1;" * 5000,
+        "edge/long_lines.js": "\n".join("x" * 400 for _ in range(50)),
+        "edge/binaryish.txt": "".join(chr(rng.randint(0, 8)) for _ in range(4000)),
+        "edge/unicode.md": "# Überblick\n\n" + "Größe und Länge — ünïcödé ✓\n" * 300,
+        "edge/formfeed.c": "int a;\f\nint b;\n" * 400,
+        "edge/tiny.txt": "hello",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--synthetic", type=int, default=1000, metavar="N",
+                        help="add a generated repo with N modules to the corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = {}
+    for name, fixture in load_fixtures(args.fixtures).items():
+        corpus.update({f"{name}/{path}": content for path, content in fixture["files"].items()})
+    if args.synthetic:
+        generated = synthetic_fixture("bench/synthetic", args.synthetic)
+        corpus.update({f"synthetic/{path}": content for path, content in generated["files"].items()})
+    corpus.update(edge_case_files())
+
+    total_bytes = sum(len(content.encode("utf-8")) for content in corpus.values())
+    print(f"corpus: {len(corpus)} files, {total_bytes / 1e6:.1f} MB")
+
+    mismatches = [
+        path for path, content in corpus.items()
+        if legacy_validate(content) != validate_and_clean(content)
+    ]
+    if mismatches:
+        raise SystemExit(f"decision mismatch for {len(mismatches)} files: {mismatches[:10]}")
+    kept = sum(1 for content in corpus.values() if validate_and_clean(content) is not None)
+    print(f"decisions identical ({kept} kept, {len(corpus) - kept} rejected)")
+
+    timings = {}
+    for label, validate in (("legacy", legacy_validate), ("engine", validate_and_clean)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for content in corpus.values():
+                validate(content)
+            best = min(best, time.perf_counter() - started)
+        timings[label] = best
+        print(f"{label:>7}: {best * 1000:8.1f} ms  ({total_bytes / 1e6 / best:6.1f} MB/s)")
+
+    print(f"speedup: {timings['legacy'] / timings['engine']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark the vector path from the embedders to the vector store and back:
+float32 NumPy arrays end to end, against the previous path of Python lists
+of floats (`.tolist()` in the embedders, `np.array` per vector in the cache,
+the store and the retriever).
+
+The cost of the path does not depend on the model, so the embedder output
+is a random float32 matrix of the model's shape (768 dimensions for
+CodeT5, 384 for MiniLM) in ingest-sized batches. For each route and path
+it prints the time and the memory held by the vectors of every chunk of
+the ingest:
+
+    hand-off   embedder output -> one vector per chunk
+    cache      vectors -> embedding cache blobs
+    store      vectors -> the float32 matrix chromadb upserts
+    retrieve   scoring the results of a query against the query vector
+
+With --chroma (needs chromadb) the store step upserts into an in-memory
+chromadb collection instead.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_vector_path
+    python -m benchmarks.bench_vector_path --chunks 50000 --chroma
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import INGEST_EMBED_BATCH_SIZE, INGEST_STORE_BATCH_SIZE
+from retrieval.retriever_new import cosine_similarities
+
+DIMENSIONS = {"code": 768, "text": 384}
+
+# results scored per query (the retriever asks for 3 x top_k)
+QUERY_RESULTS = 15
+
+
+# --------------------------------------------------
+# previous path: Python lists of floats
+# --------------------------------------------------
+
+def list_handoff(batches):
+    vectors = []
+    for batch in batches:
+        vectors.extend(batch.tolist())
+    return vectors
+
+
+def list_cache(vectors):
+    return [np.asarray(vector, dtype=np.float32).tobytes() for vector in vectors]
+
+
+def list_store(vectors):
+    # chromadb converts every list it is given to a float32 array
+    return [np.array(vector, dtype=np.float32) for vector in vectors]
+
+
+def list_retrieve(query, results):
+    scores = []
+    for vector in results:
+        a, b = np.array(query), np.array(vector)
+        scores.append(float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))))
+    return scores
+
+
+# --------------------------------------------------
+# float32 path
+# --------------------------------------------------
+
+def array_handoff(batches):
+    vectors = []
+    for batch in batches:
+        vectors.extend(batch)  # row views, no copy
+    return vectors
+
+
+def array_cache(vectors):
+    return [vector.tobytes() for vector in vectors]
+
+
+def array_store(vectors):
+    return np.stack(vectors)
+
+
+def array_retrieve(query, results):
+    return cosine_similarities(query, results).tolist()
+
+
+PATHS = {
+    "lists": (list_handoff, list_cache, list_store, list_retrieve),
+    "float32": (array_handoff, array_cache, array_store, array_retrieve),
+}
+
+
+def measure(fn, *args):
+    """(result, seconds, bytes the result holds)."""
+    # memory and time are measured on separate runs: tracing slows down
+    # allocations, most of all the many small ones of the list path
+    gc.collect()
+    tracemalloc.start()
+    result = fn(*args)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    gc.collect()
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started, held
+
+
+def chroma_store(vectors, to_payload):
+    import chromadb
+
+    collection = chromadb.EphemeralClient().create_collection(f"bench_{time.monotonic_ns()}")
+    for start in range(0, len(vectors), INGEST_STORE_BATCH_SIZE):
+        batch = vectors[start:start + INGEST_STORE_BATCH_SIZE]
+        collection.upsert(
+            ids=[str(start + i) for i in range(len(batch))],
+            embeddings=to_payload(batch),
+        )
+    return collection.count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000, help="chunks per route")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chroma", action="store_true", help="upsert into an in-memory chromadb")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for route, dimension in DIMENSIONS.items():
+        batches = [
+            rng.standard_normal((min(INGEST_EMBED_BATCH_SIZE, args.chunks - start), dimension), dtype=np.float32)
+            for start in range(0, args.chunks, INGEST_EMBED_BATCH_SIZE)
+        ]
+        queries = rng.standard_normal((args.queries, dimension), dtype=np.float32)
+        print(f"\n{route}: {args.chunks} chunks x {dimension} dimensions")
+        print(f"{'path':<9}{'hand-off ms':>12}{'held MB':>9}{'cache ms':>10}{'store ms':>10}"
+              f"{'retrieve ms':>13}")
+
+        timings = {}
+        for name, (handoff, cache, store, retrieve) in PATHS.items():
+            vectors, handoff_s, held = measure(handoff, batches)
+            _, cache_s, _ = measure(cache, vectors)
+            if args.chroma:
+                _, store_s, _ = measure(chroma_store, vectors, store)
+            else:
+                _, store_s, _ = measure(store, vectors)
+
+            started = time.perf_counter()
+            for i, query in enumerate(queries):
+                start = (i * QUERY_RESULTS) % max(1, len(vectors) - QUERY_RESULTS)
+                results = vectors[start:start + QUERY_RESULTS]
+                retrieve(query if name == "float32" else query.tolist(), results)
+            retrieve_s = time.perf_counter() - started
+
+            # the batch matrices the views point into are part of what the
+            # float32 path holds
+            if name == "float32":
+                held += sum(batch.nbytes for batch in batches)
+            timings[name] = (handoff_s, held, cache_s, store_s, retrieve_s)
+            print(f"{name:<9}{handoff_s * 1000:>12.1f}{held / 1024 ** 2:>9.1f}{cache_s * 1000:>10.1f}"
+                  f"{store_s * 1000:>10.1f}{retrieve_s * 1000:>13.1f}")
+            del vectors
+
+        lists, arrays = timings["lists"], timings["float32"]
+        print(f"{'saved':<9}{lists[0] / arrays[0]:>11.1f}x{lists[1] / arrays[1]:>8.1f}x"
+              f"{lists[2] / arrays[2]:>9.1f}x{lists[3] / arrays[3]:>9.1f}x{lists[4] / arrays[4]:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Local stand-in for the GitHub endpoints used by ingestion.
+
+Replays repository fixtures (JSON files with repo metadata and file
+contents, see record_fixture.py) and synthesizes everything else from them:
+git trees with real blob/tree SHAs, raw file downloads, tarballs and the
+contents API. Latency, rate limiting and transient failures can be
+simulated, so the whole /ingest path can be benchmarked and load-tested
+without network access.
+
+Usage (from backend/):
+
+    python -m benchmarks.github_standin --fixtures benchmarks/fixtures --port 8765
+
+    GITSAGE_GITHUB_API_URL=http://127.0.0.1:8765 \\
+    GITSAGE_GITHUB_RAW_URL=http://127.0.0.1:8765/raw \\
+    uvicorn main:app
+
+Then ingest e.g. https://github.com/gitsage-fixtures/sample-app.
+"""
+
+import argparse
+import asyncio
+import base64
+import glob
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import tarfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# GitHub stops listing recursive trees at 100k entries
+DEFAULT_TREE_LIMIT = 100_000
+
+
+# ---------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------
+def load_fixtures(fixtures_dir: str = FIXTURES_DIR) -> Dict[str, dict]:
+    """
+    Load every *.json fixture in a directory, keyed by "owner/repo".
+    """
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        fixtures[fixture["metadata"]["full_name"].lower()] = fixture
+    return fixtures
+
+
+def synthetic_fixture(full_name: str, file_count: int, seed: int = 0,
+                      lines_per_file: int = 120) -> dict:
+    """
+    Deterministic fixture of `file_count` Python modules spread over nested
+    packages, plus a README. Useful for load tests larger than a recording.
+    """
+    rng = random.Random(seed)
+    files = {"README.md": f"# {full_name}\n\nSynthetic repository with {file_count} modules.\n"}
+
+    for i in range(file_count):
+        depth = rng.randint(0, 3)
+        package = "/".join(f"pkg{rng.randint(0, 9)}" for _ in range(depth))
+        path = f"src/{package}/module_{i}.py" if package else f"src/module_{i}.py"
+
+        lines = [f'"""Module {i} of {full_name}."""', "", "import os", ""]
+        while len(lines) < lines_per_file:
+            n = len(lines)
+            lines += [
+                f"def function_{n}(value):",
+                f"    # step {rng.randint(0, 10 ** 6)}",
+                f"    return os.path.join(str(value), 'item_{n}')",
+                "",
+            ]
+        files[path] = "\n".join(lines) + "\n"
+
+    return {
+        "metadata": {
+            "full_name": full_name,
+            "default_branch": "main",
+            "pushed_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+        },
+        "files": files,
+    }
+
+
+def _git_object_sha(kind: str, data: bytes) -> str:
+    return hashlib.sha1(f"{kind} {len(data)}\0".encode("ascii") + data).hexdigest()
+
+
+class FixtureRepo:
+    """
+    One fixture turned into git objects: blobs, nested trees and a tarball.
+    """
+
+    def __init__(self, fixture: dict):
+        self.metadata = dict(fixture["metadata"])
+        self.metadata.setdefault("default_branch", "main")
+        self.metadata.setdefault("name", self.metadata["full_name"].split("/")[1])
+        self.branch = self.metadata["default_branch"]
+
+        self.blobs: Dict[str, bytes] = {
+            path: content.encode("utf-8") for path, content in fixture["files"].items()
+        }
+        self.blob_shas = {path: _git_object_sha("blob", data) for path, data in self.blobs.items()}
+
+        # tree sha -> list of entries as GitHub lists them (non-recursive)
+        self.trees: Dict[str, List[dict]] = {}
+        self.root_sha = self._build_tree(sorted(self.blobs), "")
+        self._tarball: Optional[bytes] = None
+
+    def _build_tree(self, paths: List[str], prefix: str) -> str:
+        files, subdirs = [], {}
+        for path in paths:
+            name = path[len(prefix):]
+            if "/" in name:
+                subdirs.setdefault(name.split("/", 1)[0], []).append(path)
+            else:
+                files.append(name)
+
+        entries = []
+        for name in files:
+            path = prefix + name
+            entries.append({
+                "path": name, "mode": "100644", "type": "blob",
+                "sha": self.blob_shas[path], "size": len(self.blobs[path]),
+            })
+        for name, sub_paths in subdirs.items():
+            sha = self._build_tree(sub_paths, f"{prefix}{name}/")
+            entries.append({"path": name, "mode": "040000", "type": "tree", "sha": sha})
+
+        # git orders entries by name, with directories compared as "name/"
+        entries.sort(key=lambda e: e["path"] + ("/" if e["type"] == "tree" else ""))
+        payload = b"".join(
+            f"{'40000' if e['type'] == 'tree' else e['mode']} {e['path']}\0".encode("utf-8")
+            + bytes.fromhex(e["sha"])
+            for e in entries
+        )
+        sha = _git_object_sha("tree", payload)
+        self.trees[sha] = entries
+        return sha
+
+    def resolve_tree(self, ref: str) -> Optional[str]:
+        if ref in (self.branch, "HEAD"):
+            return self.root_sha
+        return ref if ref in self.trees else None
+
+    def list_tree(self, sha: str, recursive: bool, limit: int) -> dict:
+        if not recursive:
+            entries = self.trees[sha]
+        else:
+            entries = []
+
+            def walk(tree_sha: str, prefix: str):
+                for entry in self.trees[tree_sha]:
+                    entries.append({**entry, "path": prefix + entry["path"]})
+                    if entry["type"] == "tree":
+                        walk(entry["sha"], prefix + entry["path"] + "/")
+
+            walk(sha, "")
+
+        return {"sha": sha, "tree": entries[:limit], "truncated": len(entries) > limit}
+
+    def tarball(self) -> bytes:
+        if self._tarball is None:
+            owner, name = self.metadata["full_name"].split("/")
+            root = f"{owner}-{name}-{self.root_sha[:7]}"
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w") as archive:
+                for path, data in sorted(self.blobs.items()):
+                    info = tarfile.TarInfo(f"{root}/{path}")
+                    info.size = len(data)
+                    archive.addfile(info, io.BytesIO(data))
+            self._tarball = gzip.compress(buffer.getvalue(), compresslevel=6)
+        return self._tarball
+
+
+# ---------------------------------------------------------
+# Server
+# ---------------------------------------------------------
+class Simulation:
+    """
+    Fault and latency model applied to every request.
+
+    Args:
+        latency_ms: Mean added latency per request
+        jitter_ms: Uniform +/- jitter around the mean
+        failure_rate: Share of requests answered with a 502
+        rate_limit: Requests allowed per `rate_window` seconds (0 = unlimited);
+                    excess requests get `throttle_status` with Retry-After
+        rate_window: Length of the rate-limit window in seconds
+        throttle_status: 429, or 403 as GitHub does for exhausted quotas
+        tree_limit: Entries after which recursive trees are truncated
+        seed: Seed for the failure / jitter random generator
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 failure_rate: float = 0.0, rate_limit: int = 0,
+                 rate_window: float = 60.0, throttle_status: int = 429,
+                 tree_limit: int = DEFAULT_TREE_LIMIT, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.throttle_status = throttle_status
+        self.tree_limit = tree_limit
+        self.random = random.Random(seed)
+
+        self.window_start = time.time()
+        self.window_count = 0
+        self.stats: Counter = Counter()
+
+    def rate_headers(self) -> dict:
+        now = time.time()
+        if now - self.window_start >= self.rate_window:
+            self.window_start, self.window_count = now, 0
+        if not self.rate_limit:
+            return {}
+        reset_at = self.window_start + self.rate_window
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(0, self.rate_limit - self.window_count)),
+            "X-RateLimit-Reset": str(int(math.ceil(reset_at))),
+        }
+
+
+def _json_response(request: web.Request, body) -> web.Response:
+    # GitHub-style ETags; a matching If-None-Match gets an empty 304
+    payload = json.dumps(body).encode("utf-8")
+    etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+    if request.headers.get("If-None-Match") == etag:
+        request.app["simulation"].stats["not_modified"] += 1
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(body=payload, content_type="application/json", headers={"ETag": etag})
+
+
+@web.middleware
+async def _simulate(request: web.Request, handler):
+    sim: Simulation = request.app["simulation"]
+    if request.path.startswith("/_standin/"):
+        return await handler(request)
+
+    sim.stats["requests"] += 1
+    delay = sim.latency_ms + sim.random.uniform(-sim.jitter_ms, sim.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    headers = sim.rate_headers()
+    if sim.rate_limit and sim.window_count >= sim.rate_limit:
+        sim.stats["throttled"] += 1
+        retry_after = max(1, int(math.ceil(sim.window_start + sim.rate_window - time.time())))
+        return web.json_response(
+            {"message": "API rate limit exceeded"},
+            status=sim.throttle_status,
+            headers={**headers, "Retry-After": str(retry_after)},
+        )
+    sim.window_count += 1
+
+    if sim.failure_rate and sim.random.random() < sim.failure_rate:
+        sim.stats["failed"] += 1
+        return web.json_response({"message": "Server Error"}, status=502, headers=headers)
+
+    response = await handler(request)
+    response.headers.update(headers)
+    return response
+
+
+def _repo(request: web.Request) -> FixtureRepo:
+    full_name = f"{request.match_info['owner']}/{request.match_info['repo']}".lower()
+    repo = request.app["repos"].get(full_name)
+    if repo is None:
+        raise web.HTTPNotFound(text='{"message": "Not Found"}', content_type="application/json")
+    return repo
+
+
+async def _metadata(request: web.Request) -> web.Response:
+    return _json_response(request, _repo(request).metadata)
+
+
+async def _tree(request: web.Request) -> web.Response:
+    repo = _repo(request)
+    sha = repo.resolve_tree(request.match_info["ref"])
+    if sha is None:
+        raise web.HTTPNotFound(text='{"message": "Not Found"}', content_type="application/json")
+    recursive = request.query.get("recursive") not in (None, "", "0", "false")
+    tree_limit = request.app["simulation"].tree_limit
+    return _json_response(request, repo.list_tree(sha, recursive, tree_limit))
+
+
+async def _tarball(request: web.Request) -> web.Response:
+    repo = _repo(request)
+    if repo.resolve_tree(request.match_info["ref"]) is None:
+        raise web.HTTPNotFound()
+    return web.Response(body=repo.tarball(), content_type="application/x-gzip")
+
+
+async def _contents(request: web.Request) -> web.Response:
+    repo = _repo(request)
+    data = repo.blobs.get(request.match_info["path"])
+    if data is None:
+        raise web.HTTPNotFound(text='{"message": "Not Found"}', content_type="application/json")
+    return _json_response(request, {
+        "path": request.match_info["path"],
+        "sha": repo.blob_shas[request.match_info["path"]],
+        "size": len(data),
+        "encoding": "base64",
+        "content": base64.b64encode(data).decode("ascii"),
+    })
+
+
+async def _raw(request: web.Request) -> web.Response:
+    repo = _repo(request)
+    if request.match_info["ref"] != repo.branch:
+        raise web.HTTPNotFound()
+    data = repo.blobs.get(request.match_info["path"])
+    if data is None:
+        raise web.HTTPNotFound()
+    return web.Response(body=data, content_type="text/plain", charset="utf-8")
+
+
+async def _stats(request: web.Request) -> web.Response:
+    return web.json_response(dict(request.app["simulation"].stats))
+
+
+def create_app(fixtures: Dict[str, dict], simulation: Optional[Simulation] = None) -> web.Application:
+    app = web.Application(middlewares=[_simulate])
+    app["repos"] = {name: FixtureRepo(fixture) for name, fixture in fixtures.items()}
+    app["simulation"] = simulation or Simulation()
+
+    app.router.add_get("/repos/{owner}/{repo}", _metadata)
+    app.router.add_get("/repos/{owner}/{repo}/git/trees/{ref}", _tree)
+    app.router.add_get("/repos/{owner}/{repo}/tarball/{ref}", _tarball)
+    app.router.add_get("/repos/{owner}/{repo}/contents/{path:.+}", _contents)
+    app.router.add_get("/raw/{owner}/{repo}/{ref}/{path:.+}", _raw)
+    app.router.add_get("/_standin/stats", _stats)
+    return app
+
+
+async def start_standin(fixtures: Dict[str, dict], simulation: Optional[Simulation] = None,
+                        host: str = "127.0.0.1", port: int = 0):
+    """
+    Start the stand-in on the running loop.
+
+    Returns:
+        Tuple of (runner, base_url); call `await runner.cleanup()` to stop
+    """
+    runner = web.AppRunner(create_app(fixtures, simulation))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of *.json fixtures")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="also serve gitsage-fixtures/synthetic-N with N generated modules")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per window, 0 = unlimited")
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--throttle-status", type=int, choices=(403, 429), default=429)
+    parser.add_argument("--tree-limit", type=int, default=DEFAULT_TREE_LIMIT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if args.synthetic:
+        name = f"gitsage-fixtures/synthetic-{args.synthetic}"
+        fixtures[name] = synthetic_fixture(name, args.synthetic, seed=args.seed)
+
+    simulation = Simulation(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate, rate_limit=args.rate_limit,
+        rate_window=args.rate_window, throttle_status=args.throttle_status,
+        tree_limit=args.tree_limit, seed=args.seed,
+    )
+
+    print(f"Serving {len(fixtures)} repos: {', '.join(sorted(fixtures))}")
+    print(f"  GITSAGE_GITHUB_API_URL=http://{args.host}:{args.port}")
+    print(f"  GITSAGE_GITHUB_RAW_URL=http://{args.host}:{args.port}/raw")
+    web.run_app(create_app(fixtures, simulation), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
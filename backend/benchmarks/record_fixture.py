@@ -0,0 +1,63 @@
+"""
+Record a GitHub repository as a fixture for github_standin.py.
+
+Fetches the repo metadata and tree from GitHub, applies the ingestion
+filter (without the per-repo budget) and stores the selected files, so
+replaying the fixture serves exactly what an ingest would download.
+
+Usage (from backend/, with GITHUB_PAT set):
+
+    python -m benchmarks.record_fixture https://github.com/owner/repo
+"""
+
+import argparse
+import json
+import os
+
+from benchmarks.github_standin import FIXTURES_DIR
+from repo_ingestion.before_file_download_filter import filter_repo_tree
+from repo_ingestion.downloader import download_selected_files
+from repo_ingestion.fetcher import fetch_meta_repodata, fetch_repo_tree, get_repo_details
+
+# metadata fields used by ingestion and the comparison engine
+METADATA_FIELDS = (
+    "full_name", "name", "description", "default_branch", "pushed_at", "updated_at",
+    "node_id", "language", "license", "stargazers_count", "forks_count",
+)
+
+
+def record_fixture(repo_url: str) -> dict:
+    owner, repo = get_repo_details(repo_url)
+    metadata = fetch_meta_repodata(owner, repo)
+    branch = metadata["default_branch"]
+
+    tree = fetch_repo_tree(owner, repo, branch)
+    selected = filter_repo_tree(tree, max_total_bytes=0, max_files=0)
+    files = download_selected_files(owner, repo, branch, selected)
+
+    return {
+        "metadata": {key: metadata.get(key) for key in METADATA_FIELDS},
+        "files": dict(sorted(files.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("repo_url")
+    parser.add_argument("-o", "--output", help="fixture path (default: fixtures/<owner>-<repo>.json)")
+    args = parser.parse_args()
+
+    fixture = record_fixture(args.repo_url)
+    output = args.output or os.path.join(
+        FIXTURES_DIR, fixture["metadata"]["full_name"].replace("/", "-") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, indent=1)
+
+    size = sum(len(content) for content in fixture["files"].values())
+    print(f"✓ Recorded {len(fixture['files'])} files ({size} bytes) to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ from datetime import datetime
 from urllib.parse import urlparse
 from .repo_profile import RepoProfile
 from .feature_classifier import FeatureClassifier
+from repo_ingestion.http_cache import cached_get_json
+from config import GITHUB_API_URL
 
 
 class ComparisonEngine:
@@ -44,12 +46,10 @@ class ComparisonEngine:
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
-        api_url = f"https://api.github.com/repos/{owner}/{repo}"
+        api_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
         
         try:
-            response = requests.get(api_url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = cached_get_json(api_url, headers=headers, timeout=30)
 
             # Get license name
             license_name = ""
@@ -105,7 +105,7 @@ class ComparisonEngine:
         
         # Try to fetch package.json
         try:
-            package_url = f"https://api.github.com/repos/{owner}/{repo}/contents/package.json"
+            package_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/package.json"
             response = requests.get(package_url, headers=headers, timeout=10)
             if response.status_code == 200:
                 content_data = response.json()
@@ -125,7 +125,7 @@ class ComparisonEngine:
         # Try to fetch requirements.txt if no package.json dependencies found
         if not dependencies:
             try:
-                req_url = f"https://api.github.com/repos/{owner}/{repo}/contents/requirements.txt"
+                req_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/requirements.txt"
                 response = requests.get(req_url, headers=headers, timeout=10)
                 if response.status_code == 200:
                     content_data = response.json()
@@ -6,8 +6,98 @@ load_dotenv()
 GITHUB_PAT = os.getenv("GITHUB_PAT")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# a token is optional: without one GitHub allows 60 API requests per hour,
+# and a local stand-in server (benchmarks/github_standin.py) needs none
 if not GITHUB_PAT:
-    raise Exception("GITHUB_PAT not found in environment")
+    print("[config] GITHUB_PAT not set; GitHub requests are unauthenticated")
 
 if not GROQ_API_KEY:
-    raise Exception("GROQ_API_KEY not found in environment")
\ No newline at end of file
+    raise Exception("GROQ_API_KEY not found in environment")
+
+
+# GitHub endpoints; point both at benchmarks/github_standin.py to ingest
+# recorded fixtures without network access
+GITHUB_API_URL = os.getenv("GITSAGE_GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GITHUB_RAW_URL = os.getenv("GITSAGE_GITHUB_RAW_URL", "https://raw.githubusercontent.com").rstrip("/")
+
+# "files" downloads each filtered file from GITHUB_RAW_URL,
+# "archive" streams the single repository tarball instead
+INGEST_MODE = os.getenv("GITSAGE_INGEST_MODE", "files")
+
+# /ingest of directories on the server (paths, file:// URLs, bare clones).
+# off by default: whatever is ingested can be read back through /ask. when
+# on, only sources under one of the roots (separated by os.pathsep) are read
+LOCAL_SOURCES_ENABLED = os.getenv("GITSAGE_LOCAL_SOURCES", "").lower() in ("1", "true", "yes")
+LOCAL_SOURCE_ROOTS = [
+    os.path.realpath(os.path.expanduser(root.strip()))
+    for root in os.getenv("GITSAGE_LOCAL_SOURCE_ROOTS", "").split(os.pathsep)
+    if root.strip()
+]
+
+# concurrent raw-file downloads per ingest and retries per file
+DOWNLOAD_MAX_CONCURRENCY = int(os.getenv("GITSAGE_DOWNLOAD_CONCURRENCY", "16"))
+DOWNLOAD_MAX_RETRIES = int(os.getenv("GITSAGE_DOWNLOAD_RETRIES", "4"))
+
+# local state kept between ingests (last ingested trees, caches)
+GITSAGE_DATA_DIR = os.getenv(
+    "GITSAGE_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".gitsage"),
+)
+
+# the vector store. it goes with the ingest state above (a tree state and
+# the chunks it describes must not come from different stores), so setting
+# GITSAGE_DATA_DIR moves it too; the default keeps the original location
+CHROMA_DB_DIR = os.getenv("GITSAGE_CHROMA_DIR") or (
+    os.path.join(GITSAGE_DATA_DIR, "chroma") if os.getenv("GITSAGE_DATA_DIR")
+    else os.path.join(os.path.dirname(os.path.abspath(__file__)), "vectorstore", "chroma_db")
+)
+
+# content-addressed cache of downloaded files, shared by all repos on the node
+BLOB_CACHE_DIR = os.getenv("GITSAGE_BLOB_CACHE_DIR", os.path.join(GITSAGE_DATA_DIR, "blobs"))
+BLOB_CACHE_MAX_BYTES = int(os.getenv("GITSAGE_BLOB_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# ETag-revalidated GitHub API responses (metadata, trees)
+HTTP_CACHE_DIR = os.getenv("GITSAGE_HTTP_CACHE_DIR", os.path.join(GITSAGE_DATA_DIR, "http"))
+
+# micro-batch sizes of the streaming ingest's embed and store stages
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("GITSAGE_EMBED_BATCH_SIZE", "32"))
+INGEST_STORE_BATCH_SIZE = int(os.getenv("GITSAGE_STORE_BATCH_SIZE", "256"))
+
+# per-repo ingest budget; when a repo exceeds it the highest-value files are
+# kept (READMEs, entry points, source over tests). 0 disables a limit, the
+# default: a budget makes ingests of large repos partial (and archive mode
+# then needs the tree listing too)
+INGEST_MAX_TOTAL_BYTES = int(os.getenv("GITSAGE_MAX_REPO_BYTES", "0"))
+INGEST_MAX_FILES = int(os.getenv("GITSAGE_MAX_REPO_FILES", "0"))
+
+# worker processes for validate/clean/chunk; 0 runs that stage in a thread
+# of the API process instead
+INGEST_PROCESS_WORKERS = int(os.getenv("GITSAGE_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+
+# files whose estimated similarity with an already ingested file of the same
+# repo reaches this are stored as aliases of it instead of being embedded
+# again (vendored / copied code). 0 disables near-duplicate detection.
+DEDUP_THRESHOLD = float(os.getenv("GITSAGE_DEDUP_THRESHOLD", "0.9"))
+
+# file contents and chunks (with their vectors) held by one streaming ingest
+# at once; downloads wait while the limit is reached. 0 disables the limit.
+INGEST_MAX_INFLIGHT_BYTES = int(os.getenv("GITSAGE_INGEST_MAX_INFLIGHT_BYTES", str(256 * 1024 ** 2)))
+
+# vectors of chunk texts embedded before, keyed by model and text; shared by
+# every repo on the node so re-ingests and forks skip the models. 0 disables.
+EMBEDDING_CACHE_PATH = os.getenv("GITSAGE_EMBEDDING_CACHE_PATH", os.path.join(GITSAGE_DATA_DIR, "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("GITSAGE_EMBEDDING_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+# padded tokens (batch size x longest input) per forward pass of an
+# embedding model; inputs are grouped by length to keep padding low
+EMBED_BATCH_TOKENS = int(os.getenv("GITSAGE_EMBED_BATCH_TOKENS", "16384"))
+
+# inference backend of the embedding models: "torch", "onnx" (ONNX Runtime,
+# models exported on first use) or "onnx-int8" (dynamically quantized)
+EMBEDDING_BACKEND = os.getenv("GITSAGE_EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("GITSAGE_ONNX_MODEL_DIR", os.path.join(GITSAGE_DATA_DIR, "onnx"))
+
+# embedding worker processes per route, each with its own copy of the model
+# (CodeT5 for code, MiniLM for text); 0 embeds that route in the API process
+EMBED_CODE_WORKERS = int(os.getenv("GITSAGE_EMBED_CODE_WORKERS", "0"))
+EMBED_TEXT_WORKERS = int(os.getenv("GITSAGE_EMBED_TEXT_WORKERS", "0"))
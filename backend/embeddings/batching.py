@@ -0,0 +1,47 @@
+"""
+Length-bucketed batching for the embedding models.
+
+Inputs are sorted by token count and cut into batches whose padded size
+(batch size times its longest input) stays within a token budget, so each
+forward pass has a bounded, predictable tensor size and almost no compute
+goes into padding. Batches hold their inputs' original indices, so callers
+can put the vectors back in input order.
+"""
+
+from typing import List, Sequence
+
+from config import EMBED_BATCH_TOKENS
+
+# upper bound on inputs per batch, however short they are
+MAX_BATCH_SIZE = 128
+
+
+def length_batches(lengths: Sequence[int], max_tokens: int = EMBED_BATCH_TOKENS,
+                   max_size: int = MAX_BATCH_SIZE) -> List[List[int]]:
+    """
+    Group inputs by length.
+
+    Args:
+        lengths: Token count of every input (after truncation)
+        max_tokens: Budget of padded tokens per batch; an input longer than
+                    the budget gets a batch of its own
+        max_size: Maximum number of inputs per batch
+
+    Returns:
+        Batches of indices into `lengths`, longest inputs first (so a
+        batch that does not fit in memory fails on the first pass)
+    """
+    order = sorted(range(len(lengths)), key=lambda index: -lengths[index])
+
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for index in order:
+        # sorted longest first: the batch is padded to its first input
+        longest = lengths[batch[0]] if batch else lengths[index]
+        if batch and (len(batch) >= max_size or max(longest, 1) * (len(batch) + 1) > max_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
@@ -1,8 +1,12 @@
 from typing import List
 
+import numpy as np
 import torch
 from transformers import AutoModel, AutoTokenizer
 
+from embeddings.batching import length_batches
+from embeddings.token_budget import CODE_MAX_TOKENS
+
 
 class CodeEmbedder:
     """
@@ -30,7 +34,18 @@ class CodeEmbedder:
             CodeEmbedder._model = AutoModel.from_pretrained(self._model_name)
             CodeEmbedder._model.eval()  # production best practice
 
-    def embed(self, texts: List[str]) -> List[list[float]]:
+    @property
+    def cache_key(self) -> str:
+        """Identifies this embedder's vectors in the embedding cache."""
+        # pooling is part of the key: vectors from before padding was
+        # masked out are not reused
+        return f"{CodeEmbedder._model_name}:masked-mean"
+
+    @property
+    def dimension(self) -> int:
+        return CodeEmbedder._model.config.d_model
+
+    def embed(self, texts: List[str]) -> np.ndarray:
         """
         Embed a list of code strings into vector representations.
 
@@ -38,26 +53,40 @@ class CodeEmbedder:
             texts: List of source code snippets.
 
         Returns:
-            List of embedding vectors (as Python lists of floats).
+            Contiguous float32 array of shape (len(texts), dimension), one
+            row per text.
         """
         assert CodeEmbedder._tokenizer is not None, "Code tokenizer not initialized"
         assert CodeEmbedder._model is not None, "Code model not initialized"
 
-        inputs = CodeEmbedder._tokenizer(
-            texts,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=512,
-        )
-
-        with torch.no_grad():
-            encoder_outputs = CodeEmbedder._model.encoder(
-                input_ids=inputs["input_ids"],
-                attention_mask=inputs["attention_mask"],
+        tokenizer, model = CodeEmbedder._tokenizer, CodeEmbedder._model
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return vectors
+
+        encoded = tokenizer(texts, truncation=True, max_length=CODE_MAX_TOKENS)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+        # similar lengths share a batch: bounded tensors, little padding
+        for batch in length_batches(lengths):
+            inputs = tokenizer.pad(
+                {key: [encoded[key][i] for i in batch] for key in ("input_ids", "attention_mask")},
+                return_tensors="pt",
             )
 
-        # Mean pooling over token dimension
-        embeddings = encoder_outputs.last_hidden_state.mean(dim=1)
+            with torch.no_grad():
+                encoder_outputs = model.encoder(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                )
+
+            # Mean pooling over the real tokens (padding is masked out, so a
+            # text gets the same vector whatever it is batched with)
+            mask = inputs["attention_mask"].unsqueeze(-1).to(encoder_outputs.last_hidden_state.dtype)
+            summed = (encoder_outputs.last_hidden_state * mask).sum(dim=1)
+            embeddings = summed / mask.sum(dim=1).clamp(min=1)
+
+            # rows go straight into the output array, never through Python floats
+            vectors[batch] = embeddings.cpu().numpy()
 
-        return embeddings.cpu().tolist()
+        return vectors
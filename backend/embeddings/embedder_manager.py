@@ -5,8 +5,12 @@ Ensures models are loaded exactly once and reused across all requests.
 This manager supports both:
 1. Dual-model approach (CodeT5 + MiniLM) - current implementation
 2. Single-model approach (future optimization)
+
+The models run on eager PyTorch by default; GITSAGE_EMBEDDING_BACKEND=onnx
+or onnx-int8 runs them with ONNX Runtime instead (see onnx_backend).
 """
 from typing import Optional
+from config import EMBEDDING_BACKEND
 from embeddings.code_embedder_new import CodeEmbedder
 from embeddings.sentence_embedder import SentenceEmbedder
 
@@ -33,11 +37,28 @@ class EmbedderManager:
         """
         if not self._initialized:
             print("[EmbedderManager] Initializing models (one-time operation)...")
-            self._code_embedder = CodeEmbedder()
-            self._text_embedder = SentenceEmbedder()
+            if EMBEDDING_BACKEND != "torch":
+                self._initialize_onnx(EMBEDDING_BACKEND)
+            if self._code_embedder is None:
+                self._code_embedder = CodeEmbedder()
+                self._text_embedder = SentenceEmbedder()
             self._initialized = True
             print("[EmbedderManager] ✓ Models loaded and ready")
 
+    def _initialize_onnx(self, backend: str):
+        try:
+            from embeddings.onnx_backend import OnnxEmbedder
+
+            code_embedder = OnnxEmbedder("code", backend)
+            text_embedder = OnnxEmbedder("text", backend)
+        except Exception as e:
+            # onnxruntime missing, export failed or failed the parity check
+            print(f"[EmbedderManager] {backend} backend unavailable ({e}); using torch")
+            return
+        self._code_embedder = code_embedder
+        self._text_embedder = text_embedder
+        print(f"[EmbedderManager] Using the {backend} backend")
+
     @property
     def code_embedder(self) -> CodeEmbedder:
         if not self._initialized:
@@ -73,6 +94,21 @@ def get_embedder():
     return _embedder_manager.text_embedder
 
 
+def create_embedder(route: str):
+    """
+    Create a new embedder for one route ("code" or "text") on the configured
+    backend, for processes that only need that model (embedding workers).
+    """
+    if EMBEDDING_BACKEND != "torch":
+        try:
+            from embeddings.onnx_backend import OnnxEmbedder
+
+            return OnnxEmbedder(route, EMBEDDING_BACKEND)
+        except Exception as e:
+            print(f"[EmbedderManager] {EMBEDDING_BACKEND} backend unavailable ({e}); using torch")
+    return CodeEmbedder() if route == "code" else SentenceEmbedder()
+
+
 def initialize_embedders():
     """
     Pre-initialize all embedders.
@@ -0,0 +1,189 @@
+"""
+On-disk cache of chunk embeddings, shared by every repo ingested on this
+machine.
+
+Vectors are stored as float32 blobs in a SQLite database keyed by the
+embedding model and a hash of the normalized chunk text, so a chunk that
+was embedded before (an unchanged file of a re-ingested repo, a fork, a
+vendored library seen in another repo) skips model inference. Entries carry
+their last use time and the least recently used ones are evicted once the
+cache grows past its size limit.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from config import EMBEDDING_CACHE_MAX_BYTES, EMBEDDING_CACHE_PATH
+
+# evict down to this share of the limit so we do not evict on every write
+EVICT_TARGET_RATIO = 0.9
+
+# keys per SQL statement (SQLite limits the number of bound parameters)
+_QUERY_BATCH = 500
+
+# bytes an entry costs beyond its vector (key, row and index overhead)
+_ROW_OVERHEAD = 96
+
+
+def normalize_text(text: str) -> str:
+    """
+    The text a cache key is computed from: line endings and trailing
+    whitespace do not change what a chunk means, so they do not split the
+    cache.
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def cache_key(model_key: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_key}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    SQLite table of (key, vector, size, last_used) rows.
+
+    Safe to use from several threads (one connection behind a lock) and
+    several processes (WAL journal). `hits` and `misses` count lookups
+    over the life of the instance.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key BLOB PRIMARY KEY, vector BLOB NOT NULL,"
+                " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._connection = connection
+        return self._connection
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get_many(self, model_key: str, texts: Sequence[str]) -> Dict[int, np.ndarray]:
+        """
+        Cached vectors of `texts` embedded by the model `model_key`.
+
+        Returns:
+            {index into texts: float32 vector} for the texts that are cached
+            (read-only views of the stored bytes)
+        """
+        if not self.enabled or not texts:
+            return {}
+
+        keys = [cache_key(model_key, text) for text in texts]
+        rows: Dict[bytes, bytes] = {}
+        try:
+            with self._lock:
+                connection = self._connect()
+                unique = list(dict.fromkeys(keys))
+                for start in range(0, len(unique), _QUERY_BATCH):
+                    batch = unique[start:start + _QUERY_BATCH]
+                    marks = ",".join("?" * len(batch))
+                    rows.update(connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch,
+                    ).fetchall())
+                    connection.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [time.time(), *batch],
+                    )
+                connection.commit()
+        except sqlite3.Error as e:
+            print(f"[EmbeddingCache] Lookup failed: {e}")
+            rows = {}
+
+        found = {
+            index: np.frombuffer(rows[key], dtype=np.float32)
+            for index, key in enumerate(keys) if key in rows
+        }
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    # ------------------------------------------------------------------
+    # Writes / eviction
+    # ------------------------------------------------------------------
+    def put_many(self, model_key: str, texts: Sequence[str], vectors: np.ndarray) -> None:
+        if not self.enabled or not texts:
+            return
+
+        now = time.time()
+        rows = {}
+        for text, vector in zip(texts, np.ascontiguousarray(vectors, dtype=np.float32)):
+            blob = vector.tobytes()
+            rows[cache_key(model_key, text)] = (blob, len(blob) + _ROW_OVERHEAD, now)
+
+        try:
+            with self._lock:
+                connection = self._connect()
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, blob, size, used) for key, (blob, size, used) in rows.items()],
+                )
+                connection.commit()
+                if connection.total_changes > before:
+                    self._size = self._current_size(connection) + sum(size for _, size, _ in rows.values())
+                    if self._size > self.max_bytes:
+                        self._evict(connection)
+        except sqlite3.Error as e:
+            print(f"[EmbeddingCache] Write failed: {e}")
+
+    def _current_size(self, connection: sqlite3.Connection) -> int:
+        if self._size is None:
+            self._size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        return self._size
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        # recount instead of trusting the running total: other processes on
+        # the node write into the same database
+        size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        if size > target:
+            # last_used of the newest row that has to go
+            cutoff = connection.execute(
+                "SELECT last_used FROM (SELECT last_used, SUM(size) OVER (ORDER BY last_used) AS freed"
+                " FROM embeddings) WHERE freed >= ? ORDER BY last_used LIMIT 1",
+                (size - target,),
+            ).fetchone()
+            if cutoff is not None:
+                connection.execute("DELETE FROM embeddings WHERE last_used <= ?", cutoff)
+                connection.commit()
+                size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        self._size = size
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the node-wide embedding cache instance."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -24,12 +24,14 @@ class EmbeddingPipeline:
                           it is stored so we can skip re-embedding unchanged
                           repositories on subsequent ingestions.
         """
-        print(f"Embedding {len(chunks)} chunks...")
-
-        embedded_chunks = self.router.route_and_embed(chunks)
-
-        print("Storing in ChromaDB...")
-        self.store.add_embeddings(embedded_chunks, repo_url)
+        # chunks may be a generator: they are embedded and stored one batch
+        # at a time, so memory does not grow with the size of the repo
+        print("Embedding and storing chunks in ChromaDB...")
+        stored = 0
+        for embedded_chunks in self.router.iter_embedded(chunks):
+            self.store.add_embeddings(embedded_chunks, repo_url)
+            stored += len(embedded_chunks)
+        print(f"Stored {stored} chunks.")
 
         if repo_version:
             # Mark this repo/version as fully ingested so future runs can
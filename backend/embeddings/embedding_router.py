@@ -1,12 +1,34 @@
-from typing import Any, List
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from config import INGEST_EMBED_BATCH_SIZE
 from embeddings.embedder_manager import get_code_embedder, get_text_embedder
+from embeddings.embedding_cache import EmbeddingCache, get_embedding_cache
+from embeddings.worker_pool import PooledEmbedder, embed_workers, get_pooled_embedder
+
+# the in-process models embed one batch at a time
+_inline_lock = threading.Lock()
+
+
+def model_key(embedder) -> str:
+    """Model name plus anything else that changes an embedder's vectors."""
+    return getattr(embedder, "cache_key", None) or type(embedder).__name__
 
 
 class EmbeddingRouter:
-    def __init__(self):
-        # Use shared singleton instances instead of creating new ones
-        self.text_embedder = get_text_embedder()
-        self.code_embedder = get_code_embedder()
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        # Use shared singleton instances instead of creating new ones; a
+        # route with embedding workers (GITSAGE_EMBED_*_WORKERS) uses its pool
+        self.text_embedder = get_pooled_embedder("text") or get_text_embedder()
+        self.code_embedder = get_pooled_embedder("code") or get_code_embedder()
+        # batches worth embedding at once: enough to keep every worker busy
+        self.parallelism = max(1, embed_workers("code") + embed_workers("text"))
+        # vectors of texts embedded before (by any repo) are not recomputed
+        self.cache = cache or get_embedding_cache()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     @staticmethod
     def _normalize_text(value: Any) -> str:
@@ -21,13 +43,27 @@ class EmbeddingRouter:
             return "\n".join(str(v) for v in value)
         return str(value)
 
-    def route_and_embed(self, chunks: List[dict]):
+    def model_keys(self) -> Dict[str, str]:
+        """{route: model key} of the embedders, as stored with every chunk."""
+        return {"code": model_key(self.code_embedder), "text": model_key(self.text_embedder)}
+
+    def route_and_embed(self, chunks: Iterable[dict]) -> List[dict]:
+        """
+        Embed a batch of chunks with the embedder of their route.
+
+        The chunks are not copied: their text is normalized and their
+        "vector" (a float32 array) and "embedder" (the model key, see
+        model_keys) set in place, so a batch costs no more than its vectors.
+        Chunks without a "code" / "text" type are left out.
+
+        Returns:
+            The embedded chunks, text chunks first
+        """
         doc_chunks: List[dict] = []
         code_chunks: List[dict] = []
 
         # Normalize text and separate code vs text chunks
         for c in chunks:
-            c = dict(c)  # shallow copy in case callers reuse dicts
             c["text"] = self._normalize_text(c.get("text", ""))
 
             if c.get("type") == "code":
@@ -35,20 +71,85 @@ class EmbeddingRouter:
             elif c.get("type") == "text":
                 doc_chunks.append(c)
 
-        # Batch embed all chunks at once
-        doc_vectors = (
-            self.text_embedder.embed([c["text"] for c in doc_chunks]) if doc_chunks else []
-        )
-        code_vectors = (
-            self.code_embedder.embed([c["text"] for c in code_chunks]) if code_chunks else []
-        )
+        # Batch embed all chunks at once (cached vectors are looked up)
+        doc_vectors = self._embed_cached(self.text_embedder, [c["text"] for c in doc_chunks])
+        code_vectors = self._embed_cached(self.code_embedder, [c["text"] for c in code_chunks])
 
-        embedded: List[dict] = []
+        # every chunk's vector is a row (a view) of its route's float32 matrix
+        if doc_chunks:
+            text_key = model_key(self.text_embedder)
+            for chunk, vector in zip(doc_chunks, doc_vectors):
+                chunk["vector"] = vector
+                chunk["embedder"] = text_key
 
-        for chunk, vector in zip(doc_chunks, doc_vectors):
-            embedded.append({**chunk, "vector": vector})
+        if code_chunks:
+            code_key = model_key(self.code_embedder)
+            for chunk, vector in zip(code_chunks, code_vectors):
+                chunk["vector"] = vector
+                chunk["embedder"] = code_key
+
+        return doc_chunks + code_chunks
+
+    def _embed_cached(self, embedder, texts: List[str]) -> np.ndarray:
+        """float32 matrix of the vectors of texts, one row per text."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        key = model_key(embedder)
+        cached = self.cache.get_many(key, texts)
+
+        missing = [index for index in range(len(texts)) if index not in cached]
+        self.cache_hits += len(cached)
+        self.cache_misses += len(missing)
+        if missing:
+            # a text repeated within the batch is embedded once
+            unique = list(dict.fromkeys(texts[index] for index in missing))
+            if isinstance(embedder, PooledEmbedder):
+                embedded = embedder.embed(unique)
+            else:
+                with _inline_lock:
+                    embedded = embedder.embed(unique)
+            self.cache.put_many(key, unique, embedded)
+            if not cached and len(unique) == len(texts):
+                return embedded
+            row = {text: position for position, text in enumerate(unique)}
+            dimension = embedded.shape[1]
+        else:
+            dimension = len(next(iter(cached.values())))
+
+        vectors = np.empty((len(texts), dimension), dtype=np.float32)
+        for index, vector in cached.items():
+            vectors[index] = vector
+        if missing:
+            vectors[missing] = embedded[[row[texts[index]] for index in missing]]
+        return vectors
+
+    def cache_stats(self) -> dict:
+        """Embedding cache lookups of this router's chunks."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def iter_embedded(self, chunks: Iterable[dict], batch_size: int = INGEST_EMBED_BATCH_SIZE) -> Iterator[List[dict]]:
+        """
+        Embed a stream of chunks (e.g. chunker_new.iter_chunks) batch by
+        batch, yielding each embedded batch; only one batch is held at once.
+        """
+        for batch in _batched(chunks, batch_size):
+            embedded = self.route_and_embed(batch)
+            if embedded:
+                yield embedded
 
-        for chunk, vector in zip(code_chunks, code_vectors):
-            embedded.append({**chunk, "vector": vector})
 
-        return embedded
\ No newline at end of file
+def _batched(items: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch: List[dict] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
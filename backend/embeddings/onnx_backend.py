@@ -0,0 +1,230 @@
+"""
+ONNX Runtime backend for the embedding models.
+
+The CodeT5 encoder and MiniLM are exported to ONNX once (optionally with
+int8 dynamic quantization of their weights) into ONNX_MODEL_DIR and run
+with ONNX Runtime on CPU, which is considerably faster than eager PyTorch
+for both ingest batches and single `/ask` queries. Pooling matches the
+torch embedders (masked mean, plus L2 normalization for MiniLM), and every
+export is checked against the torch model on a set of probe texts: an
+export whose vectors drift too far (cosine below MIN_PARITY_COSINE) is
+discarded and the torch backend is used instead.
+
+Needs `onnxruntime` (and torch + transformers for the one-time export).
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Sequence
+
+import numpy as np
+
+from config import ONNX_MODEL_DIR
+from embeddings.batching import length_batches
+from embeddings.token_budget import EMBEDDING_MODELS
+
+BACKENDS = ("onnx", "onnx-int8")
+
+# lowest cosine similarity to the torch vectors accepted on the probe texts
+MIN_PARITY_COSINE = {"onnx": 0.999, "onnx-int8": 0.97}
+
+PARITY_PROBES = [
+    "def add(a, b):\n    return a + b",
+    "for (int i = 0; i < n; i++) {\n    total += values[i];\n}",
+    "class UserRepository:\n    def find(self, user_id):\n        return self.db.get(user_id)",
+    "func (s *Server) ServeHTTP(w http.ResponseWriter, r *http.Request) {\n\ts.mux.ServeHTTP(w, r)\n}",
+    "## Installation\n\nRun `pip install -r requirements.txt` and start the server with uvicorn.",
+    "How does the ingestion pipeline handle rate limits?",
+    "This project embeds repositories and answers questions about their code.",
+    "x",
+]
+
+# only one thread exports a model at a time
+_export_lock = threading.Lock()
+
+
+def _model_dir(model_name: str) -> str:
+    return os.path.join(ONNX_MODEL_DIR, re.sub(r"[^\w.-]+", "--", model_name))
+
+
+def pool(hidden: np.ndarray, mask: np.ndarray, normalize: bool) -> np.ndarray:
+    """Mean of the hidden states of the real (unmasked) tokens."""
+    mask = mask[..., None].astype(hidden.dtype)
+    pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+    if normalize:
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return pooled
+
+
+def cosine_parity(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each reference vector with its candidate."""
+    dots = (reference * candidate).sum(axis=1)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return dots / np.maximum(norms, 1e-12)
+
+
+def export_model(route: str, backend: str) -> str:
+    """
+    Export the encoder of a route's model to ONNX (once) and check it.
+
+    Args:
+        route: "code" (CodeT5 encoder) or "text" (MiniLM)
+        backend: "onnx" or "onnx-int8"
+
+    Returns:
+        Path of the .onnx file
+
+    Raises:
+        RuntimeError if the exported model fails the parity check
+    """
+    model_name, max_tokens = EMBEDDING_MODELS[route]
+    directory = _model_dir(model_name)
+    path = os.path.join(directory, f"{backend}.onnx")
+    report_path = os.path.join(directory, f"{backend}.parity.json")
+
+    with _export_lock:
+        if os.path.exists(path) and os.path.exists(report_path):
+            return path
+
+        import onnxruntime
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        print(f"[ONNX] Exporting {model_name} ({backend}), one-time operation...")
+        os.makedirs(directory, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        # CodeT5 is an encoder-decoder; only its encoder embeds
+        encoder = model.encoder if route == "code" else model
+
+        class LastHiddenState(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.encoder = encoder
+
+            def forward(self, input_ids, attention_mask):
+                return self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+        fp32_path = os.path.join(directory, "onnx.onnx")
+        sample = tokenizer(PARITY_PROBES[:2], padding=True, return_tensors="pt")
+        if not os.path.exists(fp32_path):
+            tmp_path = f"{fp32_path}.{threading.get_ident()}.tmp"
+            torch.onnx.export(
+                LastHiddenState(), (sample["input_ids"], sample["attention_mask"]), tmp_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=14,
+            )
+            os.replace(tmp_path, fp32_path)
+
+        if backend == "onnx-int8":
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, path)
+
+        # parity with the torch model on the probe texts
+        inputs = tokenizer(PARITY_PROBES, padding=True, truncation=True,
+                           max_length=max_tokens, return_tensors="np")
+        with torch.no_grad():
+            reference = LastHiddenState()(
+                torch.from_numpy(inputs["input_ids"]), torch.from_numpy(inputs["attention_mask"]),
+            ).numpy()
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        candidate = session.run(None, {
+            "input_ids": inputs["input_ids"].astype(np.int64),
+            "attention_mask": inputs["attention_mask"].astype(np.int64),
+        })[0]
+        normalize = route == "text"
+        cosines = cosine_parity(pool(reference, inputs["attention_mask"], normalize),
+                                pool(candidate, inputs["attention_mask"], normalize))
+
+        min_cosine = float(cosines.min())
+        print(f"[ONNX] {model_name} ({backend}): min cosine to torch {min_cosine:.5f}")
+        if min_cosine < MIN_PARITY_COSINE[backend]:
+            os.remove(path)
+            raise RuntimeError(
+                f"{backend} export of {model_name} failed the parity check "
+                f"(min cosine {min_cosine:.5f} < {MIN_PARITY_COSINE[backend]})"
+            )
+
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"min_cosine": min_cosine, "probes": len(PARITY_PROBES)}, f)
+        return path
+
+
+class OnnxEmbedder:
+    """
+    Embeds texts of one route ("code" or "text") with an exported model.
+
+    Drop-in replacement for CodeEmbedder / SentenceEmbedder: same `embed`
+    signature and pooling, inputs length-bucketed the same way.
+    """
+
+    def __init__(self, route: str, backend: str = "onnx"):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown ONNX backend {backend!r}")
+
+        self.model_name, self.max_tokens = EMBEDDING_MODELS[route]
+        self.backend = backend
+        # the sentence-transformers MiniLM pipeline ends with a Normalize layer
+        self.normalize = route == "text"
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+
+        path = export_model(route, backend)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies this embedder's vectors in the embedding cache."""
+        return f"{self.model_name}:masked-mean:{self.backend}"
+
+    @property
+    def dimension(self) -> int:
+        # last_hidden_state is [batch, sequence, hidden]; hidden is static
+        return self.session.get_outputs()[0].shape[2]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a list of strings into vector representations.
+
+        Args:
+            texts: List of input strings.
+
+        Returns:
+            Contiguous float32 array of shape (len(texts), dimension), one
+            row per text.
+        """
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return vectors
+
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_tokens)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+        for batch in length_batches(lengths):
+            inputs = self.tokenizer.pad(
+                {key: [encoded[key][i] for i in batch] for key in ("input_ids", "attention_mask")},
+                return_tensors="np",
+            )
+            mask = inputs["attention_mask"].astype(np.int64)
+            hidden = self.session.run(None, {
+                "input_ids": inputs["input_ids"].astype(np.int64),
+                "attention_mask": mask,
+            })[0]
+            vectors[batch] = pool(hidden, mask, self.normalize)
+        return vectors
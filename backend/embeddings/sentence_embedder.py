@@ -1,6 +1,9 @@
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from typing import List
 
+from embeddings.batching import length_batches
+
 
 class SentenceEmbedder:
     """
@@ -24,7 +27,16 @@ class SentenceEmbedder:
         if SentenceEmbedder._model is None:
             SentenceEmbedder._model = SentenceTransformer(self._model_name)
 
-    def embed(self, texts: List[str]) -> List[list[float]]:
+    @property
+    def cache_key(self) -> str:
+        """Identifies this embedder's vectors in the embedding cache."""
+        return SentenceEmbedder._model_name
+
+    @property
+    def dimension(self) -> int:
+        return SentenceEmbedder._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
         """
         Embed a list of strings into vector representations.
 
@@ -32,7 +44,24 @@ class SentenceEmbedder:
             texts: List of input strings.
 
         Returns:
-            List of embedding vectors (as Python lists of floats).
+            Contiguous float32 array of shape (len(texts), dimension), one
+            row per text.
         """
         assert SentenceEmbedder._model is not None, "SentenceTransformer model not initialized"
-        return SentenceEmbedder._model.encode(texts, convert_to_numpy=True).tolist()
\ No newline at end of file
+        model = SentenceEmbedder._model
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return vectors
+
+        lengths = [
+            len(ids) for ids in model.tokenizer(
+                texts, truncation=True, max_length=model.max_seq_length,
+            )["input_ids"]
+        ]
+
+        # similar lengths share a batch: bounded tensors, little padding
+        for batch in length_batches(lengths):
+            vectors[batch] = model.encode(
+                [texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True,
+            )
+        return vectors
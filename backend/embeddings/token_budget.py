@@ -0,0 +1,139 @@
+"""
+Token budgets of the two embedding routes.
+
+Chunks are sized in the tokens of the model that will embed them (CodeT5's
+BPE for code, MiniLM's word pieces for text), so they can be packed up to
+the model's input limit without anything being cut off. Tokenizers are
+loaded lazily, once per process (chunking runs in worker processes). When
+a tokenizer cannot be loaded (transformers missing, model not cached and
+no network) counts fall back to a conservative characters-per-token
+estimate and reports are flagged as estimated.
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional
+
+# route -> (tokenizer of the embedding model, model input limit in tokens)
+EMBEDDING_MODELS = {
+    "code": ("Salesforce/codet5-base", 512),
+    "text": ("sentence-transformers/all-MiniLM-L6-v2", 256),
+}
+
+CODE_MAX_TOKENS = EMBEDDING_MODELS["code"][1]
+
+# characters per token assumed without a tokenizer; on the low side of what
+# the real tokenizers produce, so estimated chunks stay within the limit
+FALLBACK_CHARS_PER_TOKEN = {"code": 2.5, "text": 3.5}
+
+# lines tokenized per tokenizer call
+_LINE_BATCH = 1024
+
+
+class TokenCounter:
+    """
+    Counts tokens the way one embedding route's tokenizer does.
+
+    `limit` is the number of content tokens a chunk may have (the model's
+    input limit minus the special tokens the tokenizer adds).
+    """
+
+    def __init__(self, route: str):
+        model_name, max_tokens = EMBEDDING_MODELS[route]
+        self.route = route
+        self.tokenizer = _load_tokenizer(model_name)
+        self.exact = self.tokenizer is not None
+
+        special = self.tokenizer.num_special_tokens_to_add() if self.exact else 2
+        self.limit = max_tokens - special
+        self._chars_per_token = FALLBACK_CHARS_PER_TOKEN[route]
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Content tokens (no special tokens) of each text."""
+        if not self.exact:
+            return [math.ceil(len(text) / self._chars_per_token) for text in texts]
+
+        counts: List[int] = []
+        for start in range(0, len(texts), _LINE_BATCH):
+            encoded = self.tokenizer(
+                texts[start:start + _LINE_BATCH],
+                add_special_tokens=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                verbose=False,
+            )
+            counts.extend(len(ids) for ids in encoded["input_ids"])
+        return counts
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def line_costs(self, lines: List[str]) -> List[int]:
+        """
+        Tokens of each line including its line break; their sum over a range
+        of lines is close to the token count of the joined text.
+        """
+        return self.count_many([line + "\n" for line in lines])
+
+
+def _load_tokenizer(model_name: str):
+    try:
+        from transformers import AutoTokenizer
+        from transformers.utils import logging as transformers_logging
+
+        # chunks longer than the model limit are expected here; they are
+        # counted, not encoded for the model
+        transformers_logging.set_verbosity_error()
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        print(f"[TokenBudget] Tokenizer {model_name} unavailable ({e}); estimating token counts")
+        return None
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(route: str) -> TokenCounter:
+    """Shared TokenCounter of a route ("code" or "text") for this process."""
+    counter = _counters.get(route)
+    if counter is None:
+        # chunking threads of the API process must not load it twice
+        with _counters_lock:
+            counter = _counters.get(route)
+            if counter is None:
+                counter = _counters[route] = TokenCounter(route)
+    return counter
+
+
+class TokenReport:
+    """
+    Per-ingest totals of the tokens sent to each embedding route, and of the
+    tokens the models will cut off (chunks over the limit that could not be
+    split, e.g. a single very long line). Built from the token fields that
+    chunk_file puts on every chunk, so no tokenizer is needed here.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, int]] = {}
+        self.estimated = False
+
+    def add(self, chunk: dict) -> None:
+        tokens = chunk.get("token_count")
+        if tokens is None:
+            return
+
+        totals = self.routes.setdefault(chunk["type"], {
+            "chunks": 0, "tokens": 0, "truncated_chunks": 0, "truncated_tokens": 0,
+        })
+        totals["chunks"] += 1
+        totals["tokens"] += tokens
+        if chunk.get("truncated_tokens"):
+            totals["truncated_chunks"] += 1
+            totals["truncated_tokens"] += chunk["truncated_tokens"]
+        self.estimated = self.estimated or chunk.get("token_estimate", False)
+
+    def as_dict(self) -> Optional[dict]:
+        if not self.routes:
+            return None
+        return {**self.routes, "estimated": self.estimated}
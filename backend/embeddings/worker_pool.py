@@ -0,0 +1,188 @@
+# pools of embedding worker processes, one pool per route. every worker
+# loads its own copy of the route's model (CodeT5 or MiniLM) and takes
+# batches of texts off its pool's shared work queue, so concurrent ingests
+# spread over the workers instead of queueing behind (or fighting over the
+# intra-op threads of) the single model in the API process. the routes are
+# sized separately: CodeT5 is several times slower per chunk than MiniLM.
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import EMBED_CODE_WORKERS, EMBED_TEXT_WORKERS
+
+# a call is split into at most one task per worker, but never into tasks
+# smaller than this (per-task overhead: pickling, one forward pass)
+MIN_TEXTS_PER_TASK = 8
+
+# the embedder of this worker process (set by _init_worker)
+_worker_embedder = None
+
+
+def embed_workers(route: str) -> int:
+    """Number of worker processes of a route (0 when it embeds in-process)."""
+    return max(0, EMBED_CODE_WORKERS if route == "code" else EMBED_TEXT_WORKERS)
+
+
+def _init_worker(route: str, threads: int) -> None:
+    global _worker_embedder
+    # split the cores between the workers of both pools instead of every
+    # worker starting one intra-op thread per core
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from embeddings.embedder_manager import create_embedder
+    _worker_embedder = create_embedder(route)
+
+
+def _embed(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.embed(texts)
+
+
+def _cache_key() -> str:
+    return getattr(_worker_embedder, "cache_key", None) or type(_worker_embedder).__name__
+
+
+def _dimension() -> int:
+    return _worker_embedder.dimension
+
+
+class PooledEmbedder:
+    """
+    Embeds the texts of one route on a pool of worker processes.
+
+    Same `embed` and `cache_key` as the in-process embedders. Thread-safe:
+    calls from several threads (concurrent ingests, batches in flight) share
+    the pool's work queue.
+    """
+
+    def __init__(self, route: str, workers: int, threads: Optional[int] = None):
+        self.route = route
+        self.workers = workers
+        # intra-op threads per worker (default: the cores split between the
+        # workers of both routes)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // max(1, embed_workers("code") + embed_workers("text")))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache_key: Optional[str] = None
+        self._dimension: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the API process holds model weights and threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.route, self.threads),
+                )
+                print(f"[EmbedWorkers] Started {self.workers} {self.route} embedding workers "
+                      f"({self.threads} threads each)")
+            return self._pool
+
+    def _run(self, fn, *args):
+        pool = self._get_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        # a worker died (e.g. out of memory): the next call starts a new pool
+        print(f"[EmbedWorkers] {self.route} worker pool broke; restarting it on next use")
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies the workers' vectors in the embedding cache."""
+        if self._cache_key is None:
+            self._cache_key = self._run(_cache_key)
+        return self._cache_key
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = self._run(_dimension)
+        return self._dimension
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a list of strings into vector representations.
+
+        Args:
+            texts: List of input strings.
+
+        Returns:
+            Contiguous float32 array of shape (len(texts), dimension), one
+            row per text.
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        # longest first, dealt out round-robin: every task gets a similar
+        # share of the tokens, and each worker still buckets its own by length
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        tasks = max(1, min(self.workers, math.ceil(len(texts) / MIN_TEXTS_PER_TASK)))
+        parts = [order[start::tasks] for start in range(tasks)]
+
+        pool = self._get_pool()
+        futures = [pool.submit(_embed, [texts[i] for i in part]) for part in parts]
+        vectors = None
+        try:
+            # results come back as float32 arrays (pickled as one buffer each)
+            for part, future in zip(parts, futures):
+                result = future.result()
+                if vectors is None:
+                    vectors = np.empty((len(texts), result.shape[1]), dtype=np.float32)
+                vectors[part] = result
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+        return vectors
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+
+_pooled_embedders: Dict[str, PooledEmbedder] = {}
+
+
+def get_pooled_embedder(route: str) -> Optional[PooledEmbedder]:
+    """
+    Get the application-wide worker pool of a route, or None when
+    GITSAGE_EMBED_CODE_WORKERS / GITSAGE_EMBED_TEXT_WORKERS is 0 and the
+    route embeds in-process.
+    """
+    if embed_workers(route) == 0:
+        return None
+    if route not in _pooled_embedders:
+        _pooled_embedders[route] = PooledEmbedder(route, embed_workers(route))
+    return _pooled_embedders[route]
+
+
+def shutdown_embedding_pools() -> None:
+    """Stop the embedding workers. Call this at application shutdown."""
+    for embedder in _pooled_embedders.values():
+        embedder.shutdown()
+    _pooled_embedders.clear()
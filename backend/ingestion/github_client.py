@@ -2,6 +2,9 @@ import requests
 import os
 from urllib.parse import urlparse
 
+from config import GITHUB_API_URL
+
+
 def fetch_repo_metadata(repo_url: str) -> dict:
     token = os.getenv("GITHUB_TOKEN")
 
@@ -14,7 +17,7 @@ def fetch_repo_metadata(repo_url: str) -> dict:
 
     owner, repo = parts[0], parts[1]
 
-    api_url = f"https://api.github.com/repos/{owner}/{repo}"
+    api_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
 
     print("FINAL API URL:", api_url)
 
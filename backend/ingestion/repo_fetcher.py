@@ -8,12 +8,18 @@ from embeddings.embedder import embed_texts
 from embeddings.chunker import chunk_text
 from vectorstore.chroma_client import store_embeddings
 from ingestion.repo_summary import extract_repo_summary
+from repo_ingestion.local_source import resolve_local_source, local_repo_url
 
 
 # ---------------------------------------------------------
 # Repo URL normalization
 # ---------------------------------------------------------
 def normalize_repo_url(url: str) -> str:
+    # local sources (directories, bare repos, file:// URLs) keep their path,
+    # including a ".git" suffix, as an absolute file:// URL
+    local_path = resolve_local_source(url)
+    if local_path:
+        return local_repo_url(local_path)
     return url.rstrip("/").removesuffix(".git")
 
 
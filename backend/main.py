@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -6,7 +7,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from embeddings.embedder_manager import initialize_embedders
+from embeddings.worker_pool import shutdown_embedding_pools
 from repo_ingestion.unified_pipeline import ingest_repository, get_retriever
+from repo_ingestion.github_client import close_github_client
+from repo_ingestion.local_source import LocalSourceError
+from repo_ingestion.process_pool import shutdown_process_pool
 from qa.qa_engine import answer_question
 from docs.doc_generator import generate_documentation
 
@@ -41,6 +46,9 @@ async def lifespan(app: FastAPI):
     print("✅ Models loaded and ready!")
     yield
     print("👋 Shutting down GitSage API...")
+    await close_github_client()
+    shutdown_process_pool()
+    shutdown_embedding_pools()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -89,6 +97,8 @@ async def health():
 async def ingest(request: IngestRequest):
     try:
         return await ingest_repository(request.repo_url)
+    except LocalSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Error in /ingest endpoint")
         raise HTTPException(status_code=500, detail=str(e))
@@ -100,13 +110,17 @@ async def ask(request: QuestionRequest):
         # 🔒 HARD BLOCK
         ensure_repo_is_ingested(request.repo_url)
 
-        answer = answer_question(request.repo_url, request.question)
+        # sync GitHub / model / LLM calls: keep them off the event loop
+        answer = await asyncio.to_thread(answer_question, request.repo_url, request.question)
         logger.info("[/ask] answer length: %s", len(answer))
         return {"answer": answer}
 
     except HTTPException:
         raise
 
+    except LocalSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     except Exception as e:
         logger.exception("Error in /ask endpoint")
         raise HTTPException(status_code=500, detail=str(e))
@@ -119,7 +133,9 @@ async def generate_docs(request: DocumentationRequest):
         ensure_repo_is_ingested(request.repo_url)
 
         retriever = get_retriever()
-        documentation = generate_documentation(request.repo_url, retriever)
+        documentation = await asyncio.to_thread(
+            generate_documentation, request.repo_url, retriever
+        )
         return {
             "status": "success",
             "sections": documentation
@@ -128,6 +144,9 @@ async def generate_docs(request: DocumentationRequest):
     except HTTPException:
         raise
 
+    except LocalSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     except Exception as e:
         logger.exception("Error in /generate-docs endpoint")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,240 @@
+import asyncio
+import concurrent.futures
+import tarfile
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import aiohttp
+
+from repo_ingestion.before_file_download_filter import is_file_valuable
+from repo_ingestion.tree_state import git_blob_sha
+from repo_ingestion.github_client import API_BASE, GitHubClient, get_github_client
+
+# size of each network read and how many of them may sit between the
+# socket and the tar reader before the download waits
+ARCHIVE_READ_SIZE = 256 * 1024
+ARCHIVE_QUEUE_DEPTH = 16
+
+
+class _StreamClosed(Exception):
+    """The download was abandoned while the reader thread waited on it."""
+
+
+class _AsyncStreamReader:
+    """
+    Blocking file-like view over an asyncio.Queue of byte chunks.
+
+    tarfile's streaming mode needs a plain `read(n)` object. The reader runs
+    in a worker thread and pulls chunks that the event loop pushes from the
+    HTTP response, so only a few chunks are ever held in memory.
+
+    Every coroutine the thread waits on (the next chunk, an `on_file` call)
+    goes through `run`, so `close` can cancel them all and the thread exits
+    instead of blocking forever once the download is gone.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self._queue = queue
+        self._loop = loop
+        self._buffer = bytearray()
+        self._eof = False
+        self._closed = False
+        self._pending: Set[concurrent.futures.Future] = set()
+        self._lock = threading.Lock()
+
+    def run(self, coro: Awaitable):
+        """Run a coroutine on the event loop and wait for its result."""
+        with self._lock:
+            if self._closed:
+                coro.close()
+                raise _StreamClosed()
+            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+            self._pending.add(future)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise _StreamClosed() from None
+        finally:
+            with self._lock:
+                self._pending.discard(future)
+
+    def close(self) -> None:
+        """Cancel what the thread waits on; every later `run` fails."""
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self.run(self._queue.get())
+            if not chunk:
+                self._eof = True
+                break
+            self._buffer.extend(chunk)
+
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+
+async def _feed(queue: asyncio.Queue, chunk: bytes, extract_task: asyncio.Future) -> bool:
+    """
+    Queue a chunk for the reader thread, unless the thread exits first
+    (corrupt archive, failing `on_file`) and would never take it.
+
+    Returns:
+        True if the chunk was queued
+    """
+    if extract_task.done():
+        return False
+    put = asyncio.ensure_future(queue.put(chunk))
+    try:
+        await asyncio.wait({put, extract_task}, return_when=asyncio.FIRST_COMPLETED)
+        return put.done() and not put.cancelled()
+    finally:
+        if not put.done():
+            put.cancel()
+
+
+def _strip_archive_root(name: str) -> str | None:
+    """
+    GitHub tarballs wrap everything in a `{owner}-{repo}-{sha}/` folder.
+    Return the repo-relative path, or None for the root folder itself.
+    """
+    parts = name.split("/", 1)
+    if len(parts) < 2 or not parts[1]:
+        return None
+    return parts[1]
+
+
+def _extract_archive(stream: _AsyncStreamReader, wanted_paths: Optional[set],
+                     known_blobs: Optional[Dict[str, str]],
+                     blob_shas: Dict[str, str],
+                     on_file: Optional[Callable[[str, str], Awaitable[None]]] = None) -> Dict[str, str]:
+    """
+    Walk the tar stream member by member and keep the files worth ingesting.
+    Every selected entry's blob sha is recorded in `blob_shas`; entries whose
+    sha matches `known_blobs` are not decoded or returned. With `on_file`,
+    files are handed to the event loop one at a time instead of collected.
+    Runs in a worker thread.
+    """
+    extracted: Dict[str, str] = {}
+
+    with tarfile.open(fileobj=stream, mode="r|gz") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+
+            path = _strip_archive_root(member.name)
+            if path is None:
+                continue
+
+            if wanted_paths is not None:
+                if path not in wanted_paths:
+                    continue
+            elif not is_file_valuable(path, member.size):
+                continue
+
+            handle = archive.extractfile(member)
+            if handle is None:
+                continue
+
+            data = handle.read()
+            sha = git_blob_sha(data)
+            blob_shas[path] = sha
+            if known_blobs is not None and known_blobs.get(path) == sha:
+                continue
+
+            try:
+                content = data.decode("utf-8")
+            except UnicodeDecodeError:
+                print(f"Skipping non UTF-8 file from archive: {path}")
+                continue
+
+            if on_file is None:
+                extracted[path] = content
+            else:
+                # blocks this thread while the consumer is busy (backpressure)
+                stream.run(on_file(path, content))
+
+    # drain anything left after the end-of-archive marker so the producer
+    # never blocks on a full queue
+    while stream.read(ARCHIVE_READ_SIZE):
+        pass
+
+    return extracted
+
+
+async def download_repo_archive_async(owner: str, repo: str, ref: str,
+                                      wanted_paths: Optional[set] = None,
+                                      known_blobs: Optional[Dict[str, str]] = None,
+                                      blob_shas: Optional[Dict[str, str]] = None,
+                                      client: Optional[GitHubClient] = None,
+                                      on_file: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                                      ) -> Dict[str, str]:
+    """
+    Download a repository as a single tarball and stream-decompress it.
+
+    Entries are filtered with `is_file_valuable` as they come off the wire
+    (or against `wanted_paths` when the caller already picked the files), so
+    memory stays flat regardless of repository size.
+
+    Args:
+        owner: GitHub repository owner
+        repo: Repository name
+        ref: Branch, tag or commit to download
+        wanted_paths: Optional set of repo-relative paths to keep
+        known_blobs: Optional {path: blob_sha} of an earlier ingest; files
+                     that are unchanged are skipped
+        blob_shas: Optional dict that receives {path: blob_sha} for every
+                   selected entry (changed or not)
+        client: Optional GitHubClient (defaults to the application-wide one)
+        on_file: Optional async callback receiving (path, content) for each
+                 extracted file; files are then not collected
+
+    Returns:
+        Dict mapping file_path to file_content (empty when `on_file` is used)
+    """
+    url = f"{API_BASE}/repos/{owner}/{repo}/tarball/{ref}"
+    session = await (client or get_github_client()).session()
+
+    if blob_shas is None:
+        blob_shas = {}
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=ARCHIVE_QUEUE_DEPTH)
+    stream = _AsyncStreamReader(queue, loop)
+    extract_task = asyncio.ensure_future(
+        asyncio.to_thread(
+            _extract_archive, stream, wanted_paths, known_blobs, blob_shas, on_file
+        )
+    )
+
+    try:
+        # no total timeout: large archives legitimately take minutes,
+        # but a stalled socket should still fail
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+        async with session.get(url, timeout=timeout) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(ARCHIVE_READ_SIZE):
+                if not await _feed(queue, chunk, extract_task):
+                    break
+        # an empty chunk marks end of stream for the reader thread
+        await _feed(queue, b"", extract_task)
+    except BaseException:
+        # failed or cancelled download: release the reader thread (and the
+        # on_file call it may be waiting on) and wait for it to exit
+        stream.close()
+        await asyncio.gather(extract_task, return_exceptions=True)
+        raise
+
+    downloaded_files = await extract_task
+
+    print(f"✓ Extracted {len(blob_shas)} files from archive")
+    return downloaded_files
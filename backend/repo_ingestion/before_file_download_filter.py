@@ -1,6 +1,71 @@
 import os
 
-def filter_repo_tree(tree_structure):
+from config import INGEST_MAX_FILES, INGEST_MAX_TOTAL_BYTES
+
+JUNK_DIRS = {
+    'node_modules', '.git', '.github', '__pycache__',
+    'venv', 'env', 'dist', 'build', 'target', '.vscode', '.idea',
+    '.mvn', '.gradle', 'bower_components'
+}
+
+JUNK_EXT = {
+    '.png','.jpg','.jpeg','.gif','.ico','.svg',
+    '.mp4','.mov','.mp3',
+    '.pdf','.zip','.tar','.gz','.7z',
+    '.exe','.bin','.dll','.pyc','.o','.so',
+    '.ttf','.woff','.woff2',
+    '.lock','.db','.sqlite','.mv.db',
+    '.p12','.pem','.crt','.key'
+}
+
+DOC_KEYWORDS = ('readme', 'architecture', 'contributing')
+CONFIG_EXT = {'.yaml', '.yml', '.toml', '.json'}
+
+# ---------------------------------------------------------
+# Ranking (used when a repo does not fit the ingest budget)
+# ---------------------------------------------------------
+SOURCE_EXT = {
+    '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.go', '.rs', '.c', '.h',
+    '.cpp', '.cc', '.hpp', '.cs', '.rb', '.php', '.kt', '.scala', '.swift',
+    '.m', '.sh', '.sql', '.vue', '.svelte'
+}
+
+DOC_EXT = {'.md', '.rst', '.txt', '.adoc'}
+
+ENTRY_POINT_NAMES = {
+    'main', 'app', 'index', 'server', 'cli', 'manage', '__main__', 'lib', 'mod'
+}
+
+PROJECT_FILES = {
+    'package.json', 'requirements.txt', 'pyproject.toml', 'setup.py', 'setup.cfg',
+    'cargo.toml', 'go.mod', 'pom.xml', 'build.gradle', 'dockerfile', 'makefile'
+}
+
+LOW_VALUE_DIRS = {
+    'test', 'tests', '__tests__', 'spec', 'specs', 'testdata', 'fixtures',
+    'fixture', 'mocks', '__mocks__', 'examples', 'example', 'samples',
+    'benchmarks', 'vendor', 'third_party', 'migrations', 'generated'
+}
+
+LOW_VALUE_SUFFIXES = ('.min.js', '.min.css', '.map', '.snap', '_pb2.py', '.pb.go', '.generated.ts')
+
+# cap on the cut paths listed in a report; the counts are always complete
+MAX_REPORTED_CUTS = 100
+
+
+def filter_repo_tree(tree_structure, max_total_bytes=INGEST_MAX_TOTAL_BYTES,
+                     max_files=INGEST_MAX_FILES, report=None):
+    """
+    Select the files worth ingesting.
+
+    Every blob that passes `is_file_valuable` is kept while the repo fits
+    the budget. Otherwise files are ranked with `score_file` and taken best
+    first until `max_total_bytes` / `max_files` is reached (0 disables a
+    limit); the rest is recorded in `report["selection"]`.
+
+    Returns:
+        List of {"path", "size", "sha"} in tree order
+    """
     valuable_files = []
 
     for item in tree_structure:
@@ -11,9 +76,93 @@ def filter_repo_tree(tree_structure):
             if is_file_valuable(path, size):
                 valuable_files.append({
                     "path" : path,
-                    "size" : size
+                    "size" : size,
+                    "sha" : item.get("sha")
                 })
-    return valuable_files  
+
+    selected = _apply_budget(valuable_files, max_total_bytes, max_files)
+
+    if report is not None:
+        selected_paths = {f["path"] for f in selected}
+        cut = [f for f in valuable_files if f["path"] not in selected_paths]
+        cut.sort(key=lambda f: score_file(f["path"], f["size"]), reverse=True)
+        report["selection"] = {
+            "selected_files": len(selected),
+            "selected_bytes": sum(f["size"] for f in selected),
+            "cut_files": len(cut),
+            "cut_bytes": sum(f["size"] for f in cut),
+            "cut_paths": [f["path"] for f in cut[:MAX_REPORTED_CUTS]],
+        }
+        if cut:
+            print(f"[FILTER] Budget kept {len(selected)} of {len(valuable_files)} files; "
+                  f"cut {len(cut)} ({report['selection']['cut_bytes']} bytes)")
+
+    return selected
+
+
+def _apply_budget(files, max_total_bytes, max_files):
+    total_bytes = sum(f["size"] for f in files)
+    within_bytes = not max_total_bytes or total_bytes <= max_total_bytes
+    within_files = not max_files or len(files) <= max_files
+    if within_bytes and within_files:
+        return files
+
+    ranked = sorted(files, key=lambda f: (-score_file(f["path"], f["size"]), f["path"]))
+    chosen = set()
+    used_bytes = 0
+
+    for f in ranked:
+        if max_files and len(chosen) >= max_files:
+            break
+        if max_total_bytes and used_bytes + f["size"] > max_total_bytes:
+            # a smaller, lower-ranked file may still fit
+            continue
+        chosen.add(f["path"])
+        used_bytes += f["size"]
+
+    return [f for f in files if f["path"] in chosen]
+
+
+def score_file(path, size_in_bytes):
+    """
+    Estimate how much a file helps answer questions about the repo.
+    Higher is better; only the ordering matters.
+    """
+    path_parts = path.lower().split('/')
+    filename = path_parts[-1]
+    stem, extension = os.path.splitext(filename)
+    dirs = path_parts[:-1]
+
+    score = 0.0
+
+    if any(keyword in filename for keyword in DOC_KEYWORDS):
+        # the root README is the single most useful file
+        score += 10.0 if not dirs else 6.0
+    elif filename in PROJECT_FILES:
+        score += 6.0
+    elif extension in SOURCE_EXT:
+        score += 4.0
+        if stem in ENTRY_POINT_NAMES:
+            score += 3.0
+    elif extension in DOC_EXT:
+        score += 2.5
+    elif extension in CONFIG_EXT:
+        score += 1.0
+
+    if any(part in LOW_VALUE_DIRS for part in dirs):
+        score -= 4.0
+    if stem.startswith('test_') or stem.endswith(('_test', '.test', '.spec', '_spec')):
+        score -= 3.0
+    if filename.endswith(LOW_VALUE_SUFFIXES):
+        score -= 5.0
+
+    # shallow paths describe the project, deep ones its details
+    score -= 0.5 * len(dirs)
+
+    # prefer files that are cheap to embed: -1 per 100 KB
+    score -= size_in_bytes / 100_000
+
+    return score
 
 
 def is_file_valuable(path, size_in_bytes):
@@ -21,33 +170,19 @@ def is_file_valuable(path, size_in_bytes):
     filename = path_parts[-1]
     extension = os.path.splitext(filename)[1]
 
-    JUNK_DIRS = {
-        'node_modules', '.git', '.github', '__pycache__', 
-        'venv', 'env', 'dist', 'build', 'target', '.vscode', '.idea',
-        '.mvn', '.gradle', 'bower_components'
-    }
     if any(part in JUNK_DIRS for part in path_parts):
         return False
 
-    JUNK_EXT = {
-        '.png','.jpg','.jpeg','.gif','.ico','.svg',
-        '.mp4','.mov','.mp3',
-        '.pdf','.zip','.tar','.gz','.7z',
-        '.exe','.bin','.dll','.pyc','.o','.so',
-        '.ttf','.woff','.woff2',
-        '.lock','.db','.sqlite','.mv.db',
-        '.p12','.pem','.crt','.key'
-    }
     if extension in JUNK_EXT:
         return False
 
     if filename.startswith('.env'):
         return False
 
-    if any(keyword in filename.lower() for keyword in ['readme','architecture','contributing']):
+    if any(keyword in filename for keyword in DOC_KEYWORDS):
         return size_in_bytes < 2_000_000
 
-    if extension in ['.yaml','.yml','.toml','.json']:
+    if extension in CONFIG_EXT:
         return size_in_bytes < 500_000
 
     return size_in_bytes < 300_000
@@ -0,0 +1,149 @@
+# on-disk, content-addressed cache of file contents keyed by git blob sha.
+# shared by every repo ingested on this machine: forks, branches and
+# re-ingests of the same file contents hit the disk instead of GitHub.
+
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, Optional
+
+from config import BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES
+from repo_ingestion.tree_state import git_blob_sha
+
+# evict down to this share of the limit so we do not rescan on every write
+EVICT_TARGET_RATIO = 0.9
+
+
+class BlobCache:
+    """
+    zlib-compressed blobs stored as `<root>/<sha[:2]>/<sha[2:]>`.
+
+    Entries are verified against their git blob sha before being written, so
+    a hit is always byte-identical to what GitHub would serve. File mtimes
+    are bumped on every hit and the least recently used blobs are evicted
+    once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, root: str = BLOB_CACHE_DIR, max_bytes: int = BLOB_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha[2:])
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get(self, sha: str) -> Optional[bytes]:
+        if not self.enabled or not sha:
+            return None
+
+        path = self._path(sha)
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+            os.utime(path)
+        except (OSError, zlib.error):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def get_many(self, shas: Iterable[str]) -> Dict[str, bytes]:
+        found = {}
+        for sha in shas:
+            data = self.get(sha)
+            if data is not None:
+                found[sha] = data
+        return found
+
+    # ------------------------------------------------------------------
+    # Writes / eviction
+    # ------------------------------------------------------------------
+    def put(self, sha: str, data: bytes) -> bool:
+        """
+        Store a blob. Returns False if the content does not match the sha
+        (e.g. it was re-encoded on the way) and nothing was written.
+        """
+        if not self.enabled or not sha or git_blob_sha(data) != sha:
+            return False
+
+        path = self._path(sha)
+        if os.path.exists(path):
+            return True
+
+        compressed = zlib.compress(data, 6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[BlobCache] Could not write {sha}: {e}")
+            return False
+
+        with self._lock:
+            self._size = self._current_size() + len(compressed)
+            if self._size > self.max_bytes:
+                self._evict()
+        return True
+
+    def put_many(self, blobs: Dict[str, bytes]) -> int:
+        return sum(1 for sha, data in blobs.items() if self.put(sha, data))
+
+    def _evict(self) -> None:
+        # rescan instead of trusting the running total: other workers on the
+        # node write into the same directory
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        size = sum(e[1] for e in entries)
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+            except OSError:
+                continue
+
+        self._size = size
+
+
+_blob_cache: Optional[BlobCache] = None
+
+
+def get_blob_cache() -> BlobCache:
+    """Get the node-wide blob cache instance."""
+    global _blob_cache
+    if _blob_cache is None:
+        _blob_cache = BlobCache()
+    return _blob_cache
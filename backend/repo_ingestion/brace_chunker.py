@@ -0,0 +1,272 @@
+# structural chunking of brace languages (go, rust, java, c, c++). one regex
+# pass finds the braces that are not inside strings, character literals or
+# comments and matches them into a tree of blocks; a top-level block together
+# with the lines before it (signature, doc comment, annotations) is a unit.
+# units are packed into chunks up to the token budget, so small functions
+# share a chunk instead of each getting a half-empty one; a unit over the
+# budget is split at its inner blocks (methods of a class / impl, functions
+# of a namespace), and only a block without inner blocks is cut between
+# lines, filling the chunks around it. every line ends up in exactly one
+# chunk.
+
+import re
+from typing import List, Optional, Sequence
+
+# budget per chunk, in the units of the per-line costs (characters by default)
+BRACE_CHUNK_MAX_COST = 1500
+
+_LINE_COMMENT = r"//[^\n]*"
+_BLOCK_COMMENT = r"/\*.*?\*/"
+_STRING = r'"(?:\\.|[^"\\\n])*"'
+_CHAR = r"'(?:\\[^'\n]{1,10}|[^'\\\n])'"
+
+# alternatives that hide braces, tried before the brace itself
+_HIDING = {
+    "c": [r"^[ \t]*#[^\n]*(?:\\\n[^\n]*)*", _LINE_COMMENT, _BLOCK_COMMENT, _STRING, _CHAR],
+    "cpp": [r"^[ \t]*#[^\n]*(?:\\\n[^\n]*)*", r'R"([^()\\\s]{0,16})\(.*?\)\1"',
+            _LINE_COMMENT, _BLOCK_COMMENT, _STRING, _CHAR],
+    "java": [_LINE_COMMENT, _BLOCK_COMMENT, r'""".*?"""', _STRING, _CHAR],
+    "go": [_LINE_COMMENT, _BLOCK_COMMENT, r"`[^`]*`", _STRING, _CHAR],
+    # a lifetime ('a) has no closing quote, so it is not taken for a char
+    "rust": [_LINE_COMMENT, _BLOCK_COMMENT, r'\bb?r(#*)".*?"\1', _STRING, _CHAR],
+}
+
+_SCANNERS = {
+    language: re.compile("|".join(f"(?:{p})" for p in patterns) + r"|(\{)|(\})", re.DOTALL | re.MULTILINE)
+    for language, patterns in _HIDING.items()
+}
+
+BRACE_LANGUAGES = frozenset(_SCANNERS)
+
+# tail of a unit's header searched for the block's name
+MAX_HEADER_CHARS = 400
+
+# (kind, pattern) per language; the match that starts last in a unit's
+# header names it. the name is the last non-empty group.
+_NAMES = {
+    "go": [
+        ("method", re.compile(r"\bfunc\s*\(\s*\w*\s*\*?\s*(\w+)[^)]*\)\s*(\w+)")),
+        ("function", re.compile(r"\bfunc\s+(\w+)")),
+        ("type", re.compile(r"\btype\s+(\w+)")),
+    ],
+    "rust": [
+        # at the start of a line: `impl Trait` in argument position is a type
+        ("impl", re.compile(r"^\s*(?:unsafe\s+)?impl\b(?:\s*<[^{]*?>)?\s+(?:[\w:]+(?:<[^{]*?>)?\s+for\s+)?([\w:]+)",
+                            re.MULTILINE)),
+        ("function", re.compile(r"\bfn\s+(\w+)")),
+        ("type", re.compile(r"\b(?:struct|enum|trait|union)\s+(\w+)")),
+        ("module", re.compile(r"\bmod\s+(\w+)")),
+    ],
+    "java": [
+        ("type", re.compile(r"\b(?:class|interface|enum|record)\s+(\w+)")),
+        ("function", re.compile(r"(\w+)\s*\([^;{]*\)\s*(?:throws\s[^{]*)?$")),
+    ],
+    "c": [
+        ("type", re.compile(r"\b(?:struct|union|enum)\s+(\w+)")),
+        ("function", re.compile(r"(\w+)\s*\([^;{]*\)\s*$")),
+    ],
+    "cpp": [
+        ("module", re.compile(r"\bnamespace\s+([\w:]+)")),
+        ("type", re.compile(r"\b(?:class|struct|union|enum)\s+(?:class\s+)?(\w+)")),
+        ("function", re.compile(r"([~\w:]+)\s*\([^;{]*\)(?:\s|const|noexcept|override|final)*(?:->[^{]*)?$")),
+    ],
+}
+
+# keywords that look like a call in a header but do not name a block
+_CONTROL = {"if", "for", "while", "switch", "catch", "return", "sizeof", "defined"}
+
+
+class _Block:
+    __slots__ = ("open_line", "close_line", "children")
+
+    def __init__(self, open_line: int):
+        self.open_line = open_line
+        self.close_line = open_line
+        self.children: List["_Block"] = []
+
+
+def scan_blocks(text: str, language: str) -> List[_Block]:
+    """
+    Top-level brace blocks of `text` (lines separated by "\\n"), with
+    1-based line numbers and their nested blocks. Braces in strings,
+    character literals, comments and preprocessor lines are ignored; an
+    unmatched "}" is dropped and unclosed blocks end at the last line.
+    """
+    top: List[_Block] = []
+    stack: List[_Block] = []
+    line, position = 1, 0
+
+    for match in _SCANNERS[language].finditer(text):
+        opening, closing = match.group(match.re.groups - 1), match.group(match.re.groups)
+        if opening is None and closing is None:
+            continue
+
+        start = match.start()
+        line += text.count("\n", position, start)
+        position = start
+
+        if opening is not None:
+            block = _Block(line)
+            (stack[-1].children if stack else top).append(block)
+            stack.append(block)
+        elif stack:
+            stack.pop().close_line = line
+
+    last_line = text.count("\n") + 1
+    for block in stack:
+        block.close_line = last_line
+    return top
+
+
+class _Chunker:
+    def __init__(self, lines: List[str], line_costs: Sequence[int], max_cost: int, language: str):
+        self.lines = lines
+        self.max_cost = max_cost
+        self.names = _NAMES[language]
+        self.prefix = [0]
+        for cost in line_costs:
+            self.prefix.append(self.prefix[-1] + cost)
+        self.pieces: List[dict] = []
+        # [start, end, kinds, symbols] of the chunk being filled
+        self.pending = None
+
+    def cost(self, start: int, end: int) -> int:
+        return self.prefix[end] - self.prefix[start - 1]
+
+    def name(self, start: int, open_line: int, parent: Optional[str]):
+        """(kind, symbol) of the block whose header spans start..open_line."""
+        header = "\n".join(self.lines[start - 1:open_line])
+        header = re.sub(_LINE_COMMENT, "", header.split("{", 1)[0])
+        # only the declaration right before the brace names the block
+        header = header[max(header.rfind(";"), header.rfind("}")) + 1:][-MAX_HEADER_CHARS:]
+
+        best = None
+        for kind, pattern in self.names:
+            for match in pattern.finditer(header):
+                name = [group for group in match.groups() if group][-1]
+                if name in _CONTROL:
+                    continue
+                if best is None or match.start() > best[0]:
+                    receiver = match.group(1) if kind == "method" else None
+                    best = (match.start(), kind, f"{receiver}.{name}" if receiver else name)
+
+        if best is None:
+            return "block", parent
+        kind, symbol = best[1], best[2]
+        if parent and kind == "function":
+            kind = "method"
+        return kind, f"{parent}.{symbol}" if parent else symbol
+
+    def units(self, start: int, end: int, blocks: List[_Block], parent: Optional[str]):
+        """
+        Split lines start..end at the blocks that close in it: every unit
+        ends with a block's closing line, the rest goes into a last unit.
+        Returns [(start, end, block or None, kind, symbol)].
+        """
+        units = []
+        position = start
+        for block in blocks:
+            if block.close_line < position:
+                continue  # closes on a line an earlier unit already ends on
+            if block.open_line < position and units:
+                # opens on the line the previous unit closes on: same unit
+                previous = units[-1]
+                units[-1] = (previous[0], block.close_line, None, previous[3], previous[4])
+            else:
+                kind, symbol = self.name(position, block.open_line, parent)
+                units.append((position, block.close_line, block, kind, symbol))
+            position = block.close_line + 1
+
+        if position <= end:
+            units.append((position, end, None, "block", parent))
+        return units
+
+    def pack(self, units) -> None:
+        for unit in units:
+            start, end, block, kind, symbol = unit
+            if self.cost(start, end) <= self.max_cost:
+                if self.pending and self.cost(self.pending[0], end) > self.max_cost:
+                    self.flush()
+                self.add(start, end, kind, symbol)
+            elif block is not None and block.children:
+                # header up to the opening brace, then the inner blocks
+                inner = self.units(block.open_line + 1, end, block.children, symbol)
+                self.pack([(start, block.open_line, None, kind, symbol)] + inner)
+            elif block is not None and self.cost(block.open_line, end) <= self.max_cost:
+                # the lines before the block (long comment, code between
+                # definitions) push it over: they go on their own
+                self.pack([(start, block.open_line - 1, None, "block", symbol),
+                           (block.open_line, end, block, kind, symbol)])
+            else:
+                # nothing inside to split on: fill chunks line by line
+                for line in range(start, end + 1):
+                    if self.pending and self.cost(self.pending[0], line) > self.max_cost:
+                        self.flush()
+                    self.add(line, line, kind, symbol)
+
+    def add(self, start: int, end: int, kind: str, symbol: Optional[str]) -> None:
+        if self.pending is None:
+            self.pending = [start, end, {}, {}]
+        self.pending[1] = end
+        self.pending[2][kind] = None
+        if symbol:
+            self.pending[3][symbol] = None
+
+    def flush(self) -> None:
+        if self.pending:
+            start, end, kinds, symbols = self.pending
+            self.emit(start, end, next(iter(kinds)) if len(kinds) == 1 else "mixed",
+                      ", ".join(symbols) or None)
+            self.pending = None
+
+    def emit(self, start: int, end: int, kind: str, symbol: Optional[str]) -> None:
+        # leading/trailing blank lines belong to no chunk
+        while start <= end and not self.lines[start - 1].strip():
+            start += 1
+        while end >= start and not self.lines[end - 1].strip():
+            end -= 1
+        if start > end:
+            return
+
+        piece = {
+            "text": "\n".join(self.lines[start - 1:end]),
+            "start_line": start,
+            "end_line": end,
+            "kind": kind,
+        }
+        if symbol:
+            piece["symbol"] = symbol
+        self.pieces.append(piece)
+
+
+def chunk_braces(content: str, language: str, max_cost: int = BRACE_CHUNK_MAX_COST,
+                 line_costs: Optional[Sequence[int]] = None) -> List[dict]:
+    """
+    Split Go / Rust / Java / C / C++ source at function, type and impl
+    boundaries.
+
+    Args:
+        content: Cleaned file content
+        language: One of BRACE_LANGUAGES
+        max_cost: Budget per chunk
+        line_costs: Cost of every line of content.splitlines() (default:
+                    its length plus one for the newline)
+
+    Returns:
+        List of {"text", "start_line", "end_line", "kind", "symbol"} dicts
+        in source order. kind is "function", "method", "type", "impl",
+        "module", "block" (code between definitions) or "mixed" for a chunk
+        packing several units; symbol lists the names of the definitions in
+        the chunk (absent if there are none)
+    """
+    lines = content.splitlines()
+    if line_costs is None:
+        line_costs = [len(line) + 1 for line in lines]
+
+    # scan exactly the lines that are chunked so line numbers match them
+    blocks = scan_blocks("\n".join(lines), language)
+
+    chunker = _Chunker(lines, line_costs, max_cost, language)
+    chunker.pack(chunker.units(1, len(lines), blocks, None))
+    chunker.flush()
+    return chunker.pieces
@@ -1,6 +1,10 @@
 import os
 import re
-import uuid
+
+from embeddings.token_budget import get_token_counter
+from repo_ingestion.brace_chunker import BRACE_LANGUAGES, chunk_braces
+from repo_ingestion.markdown_chunker import chunk_markdown_sections
+from repo_ingestion.python_chunker import chunk_python_ast
 
 # language detection
 def detect_language(file_path):
@@ -30,52 +34,64 @@ def detect_language(file_path):
 
 # markdown chunking 
 
-def chunk_markdown(content):
-    lines = content.splitlines()
-
-    current = []
-    chunks = []
-
-    for line in lines:
-        if line.startswith("#"):
-            if current:
-                chunks.append(current)
-                current = []
-        
-        current.append(line)
-
-    if current:
-        chunks.append("\n".join(current))
-
-    return chunks
+def chunk_markdown(content, counter=None):
+    """
+    Split markdown at its headings into sections that carry their heading
+    path (see markdown_chunker): small sections are merged, large ones
+    split between paragraphs, within the text embedder's token limit.
+    """
+    counter = counter or get_token_counter("text")
+    return chunk_markdown_sections(
+        content, max_cost=counter.limit,
+        line_costs=counter.line_costs(content.splitlines()),
+    )
 
 # python chunking
-def chunk_python(content):
+def chunk_python(content, counter=None):
+    """
+    Split Python source into module header, class, method and function
+    chunks with line ranges (see python_chunker), sized in the code
+    embedder's tokens. Files that do not parse fall back to splitting on
+    top-level class/def lines.
+    """
+    counter = counter or get_token_counter("code")
+    try:
+        return chunk_python_ast(
+            content, max_cost=counter.limit,
+            line_costs=counter.line_costs(content.splitlines()),
+        )
+    except (SyntaxError, ValueError, RecursionError):
+        pass
+
+    return fit_to_budget(chunk_python_regex(content), counter)
+
+
+def chunk_python_regex(content):
     pattern = re.compile(r"^(class|def)\s+", re.MULTILINE)
     matches = list(pattern.finditer(content))
 
     if not matches:
         return [content]
 
-    chunks = []
+    # imports / constants before the first def
+    chunks = [content[:matches[0].start()].strip()]
 
     for i, match in enumerate(matches):
         start = match.start()
         end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
-        chunk = content[start:end].strip()
-        if len(chunk) > 0:
-            chunks.append(chunk)
+        chunks.append(content[start:end].strip())
 
-    return chunks
+    return [chunk for chunk in chunks if len(chunk) > 0]
 
 
 # JS/TS chunking
-def chunk_javascript(content):
+def chunk_javascript(content, counter=None):
+    counter = counter or get_token_counter("code")
     pattern = re.compile(r"(function\s+\w+|const\s+\w+\s*=\s*\(|class\s+\w+)", re.MULTILINE)
     matches = list(pattern.finditer(content))
 
     if not matches:
-        return [content]
+        return chunk_by_size(content, counter)
 
     chunks = []
 
@@ -86,31 +102,86 @@ def chunk_javascript(content):
         if len(chunk) > 0:
             chunks.append(chunk)
 
-    return chunks
+    return fit_to_budget(chunks, counter)
+
+# go / rust / java / c / c++ chunking
+def chunk_brace_language(content, language, counter=None):
+    """
+    Split brace-delimited source at function, type and impl boundaries
+    (see brace_chunker), packing small definitions together up to the
+    code embedder's token limit.
+    """
+    counter = counter or get_token_counter("code")
+    return chunk_braces(
+        content, language, max_cost=counter.limit,
+        line_costs=counter.line_costs(content.splitlines()),
+    )
+
+# size based chunking: windows of whole lines packed up to the embedder's
+# token limit, each window repeating the tail of the previous one
+def chunk_by_size(content, counter=None, overlap_ratio=0.1):
+    counter = counter or get_token_counter("code")
+    lines = content.splitlines()
+    costs = counter.line_costs(lines)
 
-# In chunker.py, add overlap to chunk_by_size
-def chunk_by_size(content, max_chars=1500, overlap=150):
     chunks = []
-    lines = content.splitlines()
-    current = []
-    size = 0
-    
-    for line in lines:
-        size += len(line)
-        current.append(line)
-        
-        if size >= max_chars:
-            chunks.append("\n".join(current))
-            # Keep last few lines for overlap
-            overlap_lines = current[-(overlap//20):] if len(current) > 5 else current[-2:]
-            current = overlap_lines
-            size = sum(len(l) for l in current)
-    
-    if current:
-        chunks.append("\n".join(current))
-    
+    for start, end in pack_lines(costs, counter.limit, int(counter.limit * overlap_ratio)):
+        chunks.append("\n".join(lines[start:end]))
     return chunks
 
+
+def pack_lines(costs, limit, overlap=0):
+    """
+    Group lines into windows whose summed cost stays within `limit`.
+
+    Args:
+        costs: Cost (tokens) of every line
+        limit: Budget per window
+        overlap: Budget of trailing lines repeated at the start of the next
+                 window
+
+    Returns:
+        List of (start, end) line index ranges (end exclusive); a single line
+        over the limit gets a window of its own
+    """
+    windows = []
+    start = 0
+    total = 0
+
+    for index, cost in enumerate(costs):
+        if index > start and total + cost > limit:
+            windows.append((start, index))
+
+            # carry over as many trailing lines as fit the overlap budget,
+            # leaving room for the line that did not fit
+            new_start, carried = index, 0
+            while (new_start - 1 > start
+                   and carried + costs[new_start - 1] <= overlap
+                   and carried + costs[new_start - 1] + cost <= limit):
+                new_start -= 1
+                carried += costs[new_start]
+            start, total = new_start, carried
+
+        total += cost
+
+    if start < len(costs):
+        windows.append((start, len(costs)))
+    return windows
+
+
+def fit_to_budget(chunks, counter):
+    """
+    Split the chunks that are over the token limit into windows of lines.
+    """
+    fitted = []
+    for chunk in chunks:
+        # a character is at most 4 bytes, i.e. at most 4 byte-level tokens
+        if len(chunk) <= counter.limit // 4 or counter.count(chunk) <= counter.limit:
+            fitted.append(chunk)
+        else:
+            fitted.extend(chunk_by_size(chunk, counter))
+    return fitted
+
 # actuall chunking
 def determine_chunk_type(language, path):
     if language in ["markdown", "text"]:
@@ -121,34 +192,60 @@ def determine_chunk_type(language, path):
 def chunk_file(path, content):
 
     language = detect_language(path)
+    chunk_type = determine_chunk_type(language, path)
+    # chunks are sized in the tokens of the embedder of their route
+    counter = get_token_counter(chunk_type)
 
     if language == "markdown":
-        raw_chunks = chunk_markdown(content)
+        raw_chunks = chunk_markdown(content, counter)
     elif language == "python":
-        raw_chunks = chunk_python(content)
+        raw_chunks = chunk_python(content, counter)
     elif language in ["javascript", "typescript"]:
-        raw_chunks = chunk_javascript(content)
+        raw_chunks = chunk_javascript(content, counter)
+    elif language in BRACE_LANGUAGES:
+        raw_chunks = chunk_brace_language(content, language, counter)
     else:
-        raw_chunks = chunk_by_size(content)
+        raw_chunks = chunk_by_size(content, counter)
+
+    # structured chunkers return dicts with line ranges / symbols; a text
+    # repeated within the file is kept once (stored chunk ids derive from
+    # repo, path and text, see ChromaStore.chunk_id)
+    pieces = []
+    seen = set()
+    for chunk in raw_chunks:
+        piece = chunk if isinstance(chunk, dict) else {"text": chunk}
+        if piece["text"] not in seen:
+            seen.add(piece["text"])
+            pieces.append(piece)
+    token_counts = counter.count_many([piece["text"] for piece in pieces])
 
     chunk_objects = []
 
-    for chunk in raw_chunks:
-        chunk_objects.append({
-            "id": str(uuid.uuid4()),
+    for piece, token_count in zip(pieces, token_counts):
+        chunk = {
             "path": path,
             "language": language,
-            "type": determine_chunk_type(language, path),
-            "text": chunk,
-            "size": len(chunk)
-        })
+            "type": chunk_type,
+            **piece,
+            "size": len(piece["text"]),
+            "token_count": token_count,
+            # what the embedder will cut off (a single line over the limit)
+            "truncated_tokens": max(0, token_count - counter.limit),
+        }
+        if not counter.exact:
+            chunk["token_estimate"] = True
+        chunk_objects.append(chunk)
     
     return chunk_objects
 
-def chunk_files(cleaned_files):
-    all_chunks = []
+def iter_chunks(cleaned_files):
+    """
+    Chunks of {path: cleaned content}, one file at a time, so callers can
+    embed and store them without holding every chunk of the repo.
+    """
+    for path, content in cleaned_files.items():
+        yield from chunk_file(path, content)
+
 
-    for path,content  in cleaned_files.items():
-        file_chunks = chunk_file(path,content)
-        all_chunks.extend(file_chunks)
-    return all_chunks
\ No newline at end of file
+def chunk_files(cleaned_files):
+    return list(iter_chunks(cleaned_files))
@@ -0,0 +1,221 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from config import DOWNLOAD_MAX_CONCURRENCY, DOWNLOAD_MAX_RETRIES
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# when fewer than this share of the hourly quota is left, stop growing the
+# window so a large ingest does not burn the rest of it in one burst
+LOW_QUOTA_RATIO = 0.1
+
+
+class DownloadScheduler:
+    """
+    Bounded-concurrency fetcher for GitHub downloads.
+
+    The number of requests in flight is an adaptive window: it grows by
+    roughly one slot per window of successful requests and halves whenever
+    GitHub signals throttling (429, 403 with an exhausted quota, or a
+    `Retry-After` header). While throttled, every worker waits until the
+    advertised reset time instead of hammering the API.
+
+    Failed requests are retried with jittered exponential backoff; files that
+    still fail are recorded in `failures` instead of being silently dropped.
+    """
+
+    def __init__(self, max_concurrency: int = DOWNLOAD_MAX_CONCURRENCY,
+                 max_retries: int = DOWNLOAD_MAX_RETRIES,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 min_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.window = float(self.max_concurrency)
+        self.failures: List[dict] = []
+        self.retries = 0
+        self.throttle_events = 0
+
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+
+    # ------------------------------------------------------------------
+    # Concurrency window
+    # ------------------------------------------------------------------
+    async def _acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._cond:
+            while True:
+                pause = self._paused_until - loop.time()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if self._in_flight < int(self.window):
+                    self._in_flight += 1
+                    return
+
+                await self._cond.wait()
+
+    async def _release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self, quota_low: bool) -> None:
+        if quota_low:
+            return
+        self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+
+    def _on_throttle(self, delay: float) -> None:
+        self.throttle_events += 1
+        self.window = max(float(self.min_concurrency), self.window / 2)
+        resume_at = asyncio.get_running_loop().time() + delay
+        self._paused_until = max(self._paused_until, resume_at)
+
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": spreads retries out so workers do not retry in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    # ------------------------------------------------------------------
+    # Rate-limit headers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _quota(response: aiohttp.ClientResponse) -> Tuple[Optional[int], Optional[int]]:
+        try:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            limit = int(response.headers.get("X-RateLimit-Limit", 0)) or None
+            return remaining, limit
+        except (KeyError, ValueError):
+            return None, None
+
+    def _throttle_delay(self, response: aiohttp.ClientResponse) -> Optional[float]:
+        """
+        Return how long to pause if this response is a throttling signal,
+        otherwise None.
+        """
+        retry_after = self._retry_after(response)
+        remaining, _ = self._quota(response)
+
+        if response.status == 429 or (response.status == 403 and (retry_after is not None or remaining == 0)):
+            if retry_after is not None:
+                return retry_after
+            if remaining == 0:
+                try:
+                    reset_at = float(response.headers["X-RateLimit-Reset"])
+                    return max(1.0, reset_at - time.time())
+                except (KeyError, ValueError):
+                    pass
+            # secondary rate limits without hints: GitHub asks for >= 60s
+            return 60.0
+
+        return None
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+    async def fetch_text(self, session: aiohttp.ClientSession, path: str,
+                         url: str) -> Tuple[str, Optional[str]]:
+        """
+        Fetch a single URL as text, retrying transient failures.
+
+        Returns:
+            Tuple of (path, content) or (path, None) once retries are exhausted
+        """
+        error = ""
+        attempt = 0
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+
+            await self._acquire()
+            retryable = True
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    if response.status == 200:
+                        content = await response.text()
+                        remaining, limit = self._quota(response)
+                        self._on_success(
+                            remaining is not None and limit is not None
+                            and remaining < limit * LOW_QUOTA_RATIO
+                        )
+                        return (path, content)
+
+                    error = f"HTTP {response.status}"
+                    delay = self._throttle_delay(response)
+                    if delay is not None:
+                        self._on_throttle(delay)
+                    elif response.status not in RETRYABLE_STATUSES:
+                        retryable = False
+            except UnicodeDecodeError:
+                error = "not valid UTF-8"
+                retryable = False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            finally:
+                await self._release()
+
+            if not retryable:
+                break
+
+        self.failures.append({"path": path, "error": error, "attempts": attempt + 1})
+        print(f"Failed to download: {path} ({error}, {attempt + 1} attempts)")
+        return (path, None)
+
+    async def run(self, session: aiohttp.ClientSession,
+                  jobs: Iterable[Tuple[str, str]],
+                  on_result: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                  ) -> List[Tuple[str, Optional[str]]]:
+        """
+        Fetch every (path, url) job with at most `max_concurrency` workers.
+
+        If `on_result` is given, each successful download is handed to it as
+        soon as it arrives instead of being collected; a slow consumer
+        naturally slows the workers down.
+
+        Returns:
+            List of (path, content-or-None) in completion order (empty when
+            `on_result` is used)
+        """
+        self._cond = asyncio.Condition()
+        pending = iter(jobs)
+        results: List[Tuple[str, Optional[str]]] = []
+
+        async def worker():
+            for path, url in pending:
+                result = await self.fetch_text(session, path, url)
+                if on_result is None:
+                    results.append(result)
+                elif result[1] is not None:
+                    await on_result(*result)
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+        return results
@@ -1,67 +1,112 @@
 import asyncio
-import aiohttp
-from typing import Dict, List
-from config import GITHUB_PAT
+from typing import Awaitable, Callable, Dict, List, Optional
+from repo_ingestion.download_scheduler import DownloadScheduler
+from repo_ingestion.blob_cache import BlobCache, get_blob_cache
+from repo_ingestion.github_client import GitHubClient, get_github_client
+from config import GITHUB_RAW_URL
 
+# blobs looked up in the local cache per disk round
+CACHE_LOOKUP_BATCH = 64
 
-async def download_file(session: aiohttp.ClientSession, owner: str, repo: str, 
-                       branch: str, file: dict) -> tuple:
-    """
-    Download a single file asynchronously.
-    
-    Returns:
-        Tuple of (file_path, content) or (file_path, None) on failure
-    """
-    file_path = file["path"]
-    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{file_path}"
-    
-    try:
-        async with session.get(raw_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-            if response.status == 200:
-                content = await response.text()
-                return (file_path, content)
-            else:
-                print(f"Failed to download: {file_path} (status: {response.status})")
-                return (file_path, None)
-    except Exception as e:
-        print(f"Error downloading {file_path}: {e}")
-        return (file_path, None)
+
+def _raw_url(owner: str, repo: str, branch: str, file_path: str) -> str:
+    return f"{GITHUB_RAW_URL}/{owner}/{repo}/{branch}/{file_path}"
 
 
 async def download_files_async(owner: str, repo: str, branch: str, 
-                               filtered_files: List[dict]) -> Dict[str, str]:
+                               filtered_files: List[dict],
+                               report: Optional[dict] = None,
+                               scheduler: Optional[DownloadScheduler] = None,
+                               blob_cache: Optional[BlobCache] = None,
+                               client: Optional[GitHubClient] = None,
+                               on_file: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                               ) -> Dict[str, str]:
     """
-    Download multiple files concurrently using async HTTP.
+    Download multiple files through a bounded, rate-limit-aware scheduler.
+
+    Files whose blob sha is already in the local blob cache are read from
+    disk; everything downloaded is added to the cache for the next ingest.
     
     Args:
         owner: GitHub repository owner
         repo: Repository name
         branch: Branch name
         filtered_files: List of file dicts with 'path' key
+        report: Optional dict; receives `failed_files` (path, error, attempts)
+                for files that could not be downloaded
+        scheduler: Optional DownloadScheduler (defaults to config values)
+        blob_cache: Optional BlobCache (defaults to the node-wide cache)
+        client: Optional GitHubClient whose session is used (defaults to
+                the application-wide client)
+        on_file: Optional async callback receiving (path, content) for each
+                 file as soon as it is available; files are then not
+                 collected in the returned dict
     
     Returns:
-        Dict mapping file_path to file_content
+        Dict mapping file_path to file_content (empty when `on_file` is used)
     """
-    headers = {"Authorization": f"Bearer {GITHUB_PAT}"}
-    
-    async with aiohttp.ClientSession(headers=headers) as session:
-        # Create tasks for all files
-        tasks = [
-            download_file(session, owner, repo, branch, file)
-            for file in filtered_files
-        ]
-        
-        # Download all files concurrently
-        results = await asyncio.gather(*tasks)
-    
-    # Filter out failed downloads
-    downloaded_files = {
-        path: content 
-        for path, content in results 
-        if content is not None
-    }
+    scheduler = scheduler or DownloadScheduler()
+    blob_cache = blob_cache or get_blob_cache()
+
+    downloaded_files: Dict[str, str] = {}
+    delivered = 0
+    cache_hits = 0
+
+    async def deliver(path: str, content: str) -> None:
+        nonlocal delivered
+        delivered += 1
+        if on_file is None:
+            downloaded_files[path] = content
+        else:
+            await on_file(path, content)
+
+    # serve what we can from the blob cache, a group at a time so a
+    # streaming consumer never has the whole repo in memory
+    to_fetch = []
+    for start in range(0, len(filtered_files), CACHE_LOOKUP_BATCH):
+        group = filtered_files[start:start + CACHE_LOOKUP_BATCH]
+        shas = {f["sha"] for f in group if f.get("sha")}
+        cached = (
+            await asyncio.to_thread(blob_cache.get_many, shas)
+            if blob_cache.enabled and shas else {}
+        )
+
+        for file in group:
+            data = cached.get(file.get("sha"))
+            try:
+                content = data.decode("utf-8") if data is not None else None
+            except UnicodeDecodeError:
+                content = None
+
+            if content is None:
+                to_fetch.append(file)
+            else:
+                cache_hits += 1
+                await deliver(file["path"], content)
+
+    sha_by_path = {f["path"]: f.get("sha") for f in to_fetch if f.get("sha")}
+
+    async def on_result(path: str, content: str) -> None:
+        sha = sha_by_path.get(path)
+        if blob_cache.enabled and sha:
+            await asyncio.to_thread(blob_cache.put, sha, content.encode("utf-8"))
+        await deliver(path, content)
+
+    if to_fetch:
+        session = await (client or get_github_client()).session()
+        jobs = (
+            (file["path"], _raw_url(owner, repo, branch, file["path"]))
+            for file in to_fetch
+        )
+        await scheduler.run(session, jobs, on_result=on_result)
+
+    if report is not None:
+        report.setdefault("failed_files", []).extend(scheduler.failures)
+        report["blob_cache_hits"] = report.get("blob_cache_hits", 0) + cache_hits
     
-    print(f"✓ Downloaded {len(downloaded_files)}/{len(filtered_files)} files")
+    print(f"✓ Downloaded {delivered}/{len(filtered_files)} files "
+          f"({cache_hits} from blob cache, {scheduler.retries} retries, "
+          f"{scheduler.throttle_events} throttles)")
     return downloaded_files
 
 
@@ -71,13 +116,16 @@ def download_selected_files(owner: str, repo: str, branch: str,
     Synchronous wrapper for async download function.
     Creates a new event loop to avoid conflicts with FastAPI's loop.
     """
-    # Create a fresh event loop (won't conflict with FastAPI's loop)
+    # Create a fresh event loop (won't conflict with FastAPI's loop); it
+    # gets its own client since sessions are bound to the loop they run on
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
+    client = GitHubClient()
     try:
         result = loop.run_until_complete(
-            download_files_async(owner, repo, branch, filtered_files)
+            download_files_async(owner, repo, branch, filtered_files, client=client)
         )
         return result
     finally:
+        loop.run_until_complete(client.close())
         loop.close()
\ No newline at end of file
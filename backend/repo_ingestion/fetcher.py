@@ -1,6 +1,9 @@
+import asyncio
 import re
 import requests
-from config import GITHUB_PAT
+from config import GITHUB_PAT, GITHUB_API_URL
+from repo_ingestion.github_client import GitHubClient, get_github_client
+from repo_ingestion.http_cache import cached_get_json
 
 # fetching 
 def get_repo_details(url):
@@ -12,28 +15,50 @@ def get_repo_details(url):
         
     return None
  
+def _headers():
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_PAT:
+        headers["Authorization"] = f"Bearer {GITHUB_PAT}"
+    return headers
+
+
 def fetch_meta_repodata(owner, repo):
-    url = f"https://api.github.com/repos/{owner}/{repo}"
-    headers = {
-        "Authorization": f"Bearer {GITHUB_PAT}",
-        "Accept": "application/vnd.github+json"
-    }
-    response = requests.get(url, headers=headers, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
+    return cached_get_json(url, headers=_headers(), timeout=30)
 
 
 def fetch_repo_tree(owner, repo, branch):
-    url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
-    headers = {
-        "Authorization": f"Bearer {GITHUB_PAT}",
-        "Accept": "application/vnd.github+json"
-    }
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
+    headers = _headers()
+
+    try:
+        data = cached_get_json(url, headers=headers, timeout=30)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404 and branch == "main":
+            return fetch_repo_tree(owner, repo, "master")
+        raise
+
+    if data.get("truncated"):
+        return _walk_truncated_tree(owner, repo, data["sha"])
+    return data["tree"]
+
+
+def _walk_truncated_tree(owner, repo, tree_sha):
+    # the subtree walk is concurrent, so it runs on its own loop and client
+    loop = asyncio.new_event_loop()
+    client = GitHubClient()
+    try:
+        return loop.run_until_complete(client.walk_truncated_tree(owner, repo, tree_sha))
+    finally:
+        loop.run_until_complete(client.close())
+        loop.close()
+
 
-    response = requests.get(url, headers=headers, timeout=30)
+# async versions: same data, fetched through the shared GitHub session so
+# nothing blocks the event loop
+async def fetch_meta_repodata_async(owner, repo):
+    return await get_github_client().fetch_repo_metadata(owner, repo)
 
-    if response.status_code == 404 and branch == "main":
-        return fetch_repo_tree(owner, repo, "master")
 
-    response.raise_for_status()
-    return response.json()["tree"]
+async def fetch_repo_tree_async(owner, repo, branch):
+    return await get_github_client().fetch_repo_tree(owner, repo, branch)
@@ -3,7 +3,15 @@
 
 
 from repo_ingestion.file_cleaner import clean_file_content
-from repo_ingestion.chunker_new import chunk_files
+from repo_ingestion.validation_engine import validate_and_clean
+from repo_ingestion.chunker_new import chunk_files, chunk_file
+from repo_ingestion.process_pool import get_process_pool
+from repo_ingestion.near_duplicates import NearDuplicateIndex, fingerprint
+from repo_ingestion.before_file_download_filter import score_file
+from config import DEDUP_THRESHOLD
+
+# files sent to a worker process per round trip by iter_processed_files
+PROCESS_MAP_CHUNKSIZE = 8
 
 # function declarations (jaroori to clean before we chunk and embedd)
 
@@ -49,36 +57,108 @@ def validate_files(downloaded_files):
     processed_files = {}
 
     for path,content in  downloaded_files.items():
-        if not is_valid_text(content):
-            continue
-        
-        if is_binary(content):
-            continue
-        
-        if is_minified(content):
-            continue
+        # is_valid_text / is_binary / is_minified / is_too_small followed by
+        # clean_file_content, done in one pass (same decisions, C-level scans)
+        cleaned = validate_and_clean(content)
 
-        if is_too_small(content):
-            continue
-        
-
-        cleaned = clean_file_content(content)
-        
         if not cleaned:
-            continue 
+            continue
         processed_files[path] = cleaned
 
     return processed_files
 
 
+def process_file(path, content):
+    """
+    Validate, clean and chunk a single downloaded file.
+    Returns the file's chunks (empty if the file is rejected).
+    """
+    cleaned = validate_files({path: content}).get(path)
+    if not cleaned:
+        return []
+    return chunk_file(path, cleaned)
+
+
+def process_file_fingerprinted(path, content):
+    """
+    process_file plus the near-duplicate fingerprint of the cleaned text.
+    Returns (fingerprint, chunks); fingerprint is None if the file is rejected.
+    """
+    cleaned = validate_files({path: content}).get(path)
+    if not cleaned:
+        return None, []
+    return fingerprint(cleaned), chunk_file(path, cleaned)
+
+
+def drop_duplicate(index, path, result, score=None):
+    """
+    Register a process_file_fingerprinted result with a NearDuplicateIndex.
+    Returns the file's chunks, or [] if it is a near-duplicate of a file
+    already in the index that stays its cluster's representative (it is
+    then recorded as an alias). With a `score` (see score_file), a file that
+    outranks the representative replaces it (see NearDuplicateIndex.demoted).
+    """
+    file_fingerprint, chunks = result
+    if file_fingerprint is not None and index.add(path, *file_fingerprint, score=score) is not None:
+        return []
+    return chunks
+
+
 from repo_ingestion.step1_pipeline import run_step1
 
-def run_step2_validation(downloaded_files):
+def iter_processed_files(downloaded_files, index=None):
+    """
+    Validate, clean and chunk files across the process pool.
+    Yields (path, chunks) in input order as results come back.
+
+    With a NearDuplicateIndex, near-duplicates of earlier files are yielded
+    with no chunks and recorded in index.aliases.
+    """
+    paths = list(downloaded_files)
+    pool = get_process_pool()
+    worker = process_file if index is None else process_file_fingerprinted
+
+    if pool is None:
+        results = (worker(path, downloaded_files[path]) for path in paths)
+    else:
+        contents = (downloaded_files[path] for path in paths)
+        results = pool.map(worker, paths, contents, chunksize=PROCESS_MAP_CHUNKSIZE)
+
+    for path, result in zip(paths, results):
+        yield path, (result if index is None else drop_duplicate(index, path, result))
+
+
+def format_aliases(paths):
+    """Alias paths as stored in chunk metadata (a single string)."""
+    return ", ".join(sorted(paths))
+
+
+def run_step2_validation(downloaded_files, duplicates=None):
     """
     Input: dict[path -> file_content]
     Output: list of validated + chunked objects
+
+    Near-duplicate files are skipped; each cluster keeps its highest-ranked
+    file (see score_file), whose chunks list the others in "aliases". Pass a
+    dict as `duplicates` to receive {representative: [alias paths]}.
     """
-    cleaned_files = validate_files(downloaded_files)
-    chunks = chunk_files(cleaned_files)
+    index = NearDuplicateIndex() if DEDUP_THRESHOLD > 0 else None
+    if index is not None:
+        # best representatives first, so they are the ones that get kept
+        downloaded_files = dict(sorted(
+            downloaded_files.items(),
+            key=lambda item: -score_file(item[0], len(item[1])),
+        ))
+
+    chunks = []
+    for _, file_chunks in iter_processed_files(downloaded_files, index=index):
+        chunks.extend(file_chunks)
+
+    if index is not None and index.aliases:
+        for chunk in chunks:
+            if chunk["path"] in index.aliases:
+                chunk["aliases"] = format_aliases(index.aliases[chunk["path"]])
+        print(f"[INGEST] Skipped {index.duplicate_count} near-duplicate files")
+        if duplicates is not None:
+            duplicates.update(index.aliases)
     return chunks
-
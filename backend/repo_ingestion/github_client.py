@@ -0,0 +1,176 @@
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+from config import GITHUB_PAT, GITHUB_API_URL, DOWNLOAD_MAX_CONCURRENCY
+from repo_ingestion.http_cache import ETagCache, get_etag_cache
+
+API_BASE = GITHUB_API_URL
+
+# node-wide socket cap; per-host cap keeps several concurrent ingests from
+# opening more raw-file connections than GitHub tolerates
+MAX_CONNECTIONS = 100
+MAX_CONNECTIONS_PER_HOST = DOWNLOAD_MAX_CONCURRENCY * 2
+
+# concurrent subtree requests when a recursive tree comes back truncated
+TREE_FETCH_CONCURRENCY = 8
+
+
+class TreeTruncatedError(Exception):
+    """A tree listing GitHub truncated that cannot be fetched in parts."""
+
+
+class GitHubClient:
+    """
+    Async GitHub client backed by one long-lived aiohttp session.
+
+    The session (and its keep-alive connection pool) is created lazily on
+    the running event loop and reused for metadata, tree and file requests
+    until `close()` is called at application shutdown. JSON API calls are
+    revalidated against the on-disk ETag cache, so unchanged metadata and
+    trees come back as free 304s.
+    """
+
+    def __init__(self, token: str | None = GITHUB_PAT, etag_cache: ETagCache | None = None):
+        self.token = token
+        self.etag_cache = etag_cache or get_etag_cache()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def headers(self) -> dict:
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    async def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=MAX_CONNECTIONS,
+                limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    # API helpers
+    # ------------------------------------------------------------------
+    async def get_json(self, url: str) -> dict:
+        authorization = self.headers.get("Authorization")
+        cached = await asyncio.to_thread(self.etag_cache.load, url, authorization)
+        headers = {"If-None-Match": cached[0]} if cached is not None else None
+
+        session = await self.session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                return cached[1]
+            response.raise_for_status()
+            body = await response.json()
+            etag = response.headers.get("ETag")
+
+        await asyncio.to_thread(self.etag_cache.store, url, etag, body, authorization)
+        return body
+
+    async def fetch_repo_metadata(self, owner: str, repo: str) -> dict:
+        return await self.get_json(f"{API_BASE}/repos/{owner}/{repo}")
+
+    async def _get_tree(self, owner: str, repo: str, tree_sha: str, recursive: bool) -> dict:
+        url = f"{API_BASE}/repos/{owner}/{repo}/git/trees/{tree_sha}"
+        return await self.get_json(f"{url}?recursive=1" if recursive else url)
+
+    async def fetch_repo_tree(self, owner: str, repo: str, branch: str) -> list:
+        try:
+            data = await self._get_tree(owner, repo, branch, recursive=True)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404 and branch == "main":
+                return await self.fetch_repo_tree(owner, repo, "master")
+            raise
+
+        if not data.get("truncated"):
+            return data["tree"]
+
+        print(f"[GitHub] Tree of {owner}/{repo} is truncated; fetching subtrees")
+        tree = await self.walk_truncated_tree(owner, repo, data["sha"])
+        print(f"✓ Merged {len(tree)} tree entries from subtrees")
+        return tree
+
+    async def walk_truncated_tree(self, owner: str, repo: str, tree_sha: str,
+                                  max_concurrency: int = TREE_FETCH_CONCURRENCY) -> list:
+        """
+        Rebuild a recursive tree listing that GitHub truncated.
+
+        The tree is listed one level at a time and every subdirectory is
+        fetched recursively in parallel (at most `max_concurrency` requests
+        in flight); only subtrees that are themselves truncated are split
+        further. Entries are returned with full paths, like `?recursive=1`.
+
+        Raises:
+            TreeTruncatedError if a single directory has more entries than
+            one listing returns
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        entries: list = []
+
+        async def get_tree(sha: str, recursive: bool) -> dict:
+            async with semaphore:
+                return await self._get_tree(owner, repo, sha, recursive)
+
+        async def expand(sha: str, prefix: str) -> None:
+            data = await get_tree(sha, recursive=False)
+            if data.get("truncated"):
+                # one directory over the API's limit: its listing cannot be
+                # split any further, and the rest of it would be dropped
+                raise TreeTruncatedError(
+                    f"Tree listing of {owner}/{repo}:{prefix or '/'} is truncated "
+                    f"({len(data['tree'])} entries returned)"
+                )
+            subtrees = []
+            for entry in data["tree"]:
+                path = prefix + entry["path"]
+                entries.append({**entry, "path": path})
+                if entry["type"] == "tree":
+                    subtrees.append(walk(entry["sha"], path + "/"))
+            await asyncio.gather(*subtrees)
+
+        async def walk(sha: str, prefix: str) -> None:
+            data = await get_tree(sha, recursive=True)
+            if data.get("truncated"):
+                await expand(sha, prefix)
+                return
+            entries.extend({**entry, "path": prefix + entry["path"]} for entry in data["tree"])
+
+        await expand(tree_sha, "")
+        return entries
+
+
+_github_client: Optional[GitHubClient] = None
+
+
+def get_github_client() -> GitHubClient:
+    """Get the application-wide GitHub client."""
+    global _github_client
+    if _github_client is None:
+        _github_client = GitHubClient()
+    return _github_client
+
+
+async def close_github_client() -> None:
+    """Close the shared session. Call this at application shutdown."""
+    if _github_client is not None:
+        await _github_client.close()
@@ -0,0 +1,94 @@
+# persistent ETag cache for GitHub API GETs. Responses are stored with their
+# ETag and revalidated with If-None-Match; a 304 is served from disk and does
+# not count against the API rate limit.
+
+import hashlib
+import json
+import os
+from typing import Any, Optional, Tuple
+
+import requests
+
+from config import HTTP_CACHE_DIR
+
+
+class ETagCache:
+    """
+    One JSON file per (url, credentials) pair holding the ETag and body of
+    the last 200 response.
+    """
+
+    def __init__(self, root: str = HTTP_CACHE_DIR):
+        self.root = root
+
+    def _path(self, url: str, authorization: str | None) -> str:
+        # keyed on credentials too: different tokens may see different data
+        key = hashlib.sha256(f"{authorization or ''}\n{url}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def load(self, url: str, authorization: str | None = None) -> Optional[Tuple[str, Any]]:
+        """
+        Return (etag, body) of the cached response, or None.
+        """
+        try:
+            with open(self._path(url, authorization), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("url") != url or not entry.get("etag"):
+            return None
+        return entry["etag"], entry["body"]
+
+    def store(self, url: str, etag: str | None, body: Any,
+              authorization: str | None = None) -> None:
+        if not etag:
+            return
+
+        path = self._path(url, authorization)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"url": url, "etag": etag, "body": body}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[ETagCache] Could not write cache entry for {url}: {e}")
+
+
+_etag_cache: Optional[ETagCache] = None
+
+
+def get_etag_cache() -> ETagCache:
+    """Get the shared on-disk ETag cache."""
+    global _etag_cache
+    if _etag_cache is None:
+        _etag_cache = ETagCache()
+    return _etag_cache
+
+
+def cached_get_json(url: str, headers: dict | None = None, timeout: int = 30) -> Any:
+    """
+    `requests.get(url).json()` with conditional revalidation.
+
+    Raises:
+        requests.HTTPError for non-success responses, like raise_for_status()
+    """
+    headers = dict(headers or {})
+    authorization = headers.get("Authorization")
+    cache = get_etag_cache()
+
+    cached = cache.load(url, authorization)
+    if cached is not None:
+        headers["If-None-Match"] = cached[0]
+
+    response = requests.get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and cached is not None:
+        return cached[1]
+
+    response.raise_for_status()
+    body = response.json()
+    cache.store(url, response.headers.get("ETag"), body, authorization)
+    return body
@@ -0,0 +1,245 @@
+# local ingestion source: a directory, a file:// URL or a bare git repo.
+# produces the same tree entries and {path: content} stream as the GitHub
+# fetchers, so filter -> clean -> chunk -> embed runs without any network.
+
+import asyncio
+import hashlib
+import os
+import subprocess
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+from config import LOCAL_SOURCE_ROOTS, LOCAL_SOURCES_ENABLED
+from repo_ingestion.before_file_download_filter import filter_repo_tree
+from repo_ingestion.tree_state import diff_tree_states, git_blob_sha
+
+# git modes that are not regular file contents (symlinks, submodules)
+_SKIPPED_MODES = {"120000", "160000"}
+
+
+class LocalSourceError(ValueError):
+    """A local source that may not be ingested (disabled or not allowed)."""
+
+
+def _looks_local(repo_link: str) -> bool:
+    # what can only be meant as a path on this machine
+    return repo_link.startswith(("file://", "/", "~", "./", "../")) or repo_link in (".", "..")
+
+
+def _is_allowed(path: str) -> bool:
+    real = os.path.realpath(path)
+    return any(os.path.commonpath([root, real]) == root for root in LOCAL_SOURCE_ROOTS)
+
+
+def resolve_local_source(repo_link: str) -> Optional[str]:
+    """
+    Return the absolute directory for a local source, or None if
+    `repo_link` is not local (e.g. a GitHub URL).
+
+    Local sources are only read when GITSAGE_LOCAL_SOURCES is on, and only
+    under GITSAGE_LOCAL_SOURCE_ROOTS; while it is off the filesystem is not
+    looked at.
+
+    Raises:
+        LocalSourceError if `repo_link` is a local path that may not be
+        ingested
+    """
+    if not LOCAL_SOURCES_ENABLED:
+        if _looks_local(repo_link):
+            raise LocalSourceError(
+                f"Local sources are disabled (set GITSAGE_LOCAL_SOURCES): {repo_link}"
+            )
+        return None
+
+    if repo_link.startswith("file://"):
+        path = unquote(urlparse(repo_link).path)
+    elif "://" in repo_link or repo_link.startswith("git@"):
+        return None
+    else:
+        path = os.path.expanduser(repo_link)
+
+    if not os.path.isdir(path):
+        if _looks_local(repo_link):
+            raise LocalSourceError(f"Not a directory: {repo_link}")
+        return None
+    if not _is_allowed(path):
+        raise LocalSourceError(
+            f"{repo_link} is not under an allowed local source root (GITSAGE_LOCAL_SOURCE_ROOTS)"
+        )
+    return os.path.abspath(path)
+
+
+def local_repo_url(path: str) -> str:
+    """Canonical repo_url under which a local source is stored."""
+    return "file://" + os.path.abspath(path).rstrip("/")
+
+
+def _git(path: str, *args: str, data: bytes | None = None) -> bytes:
+    return subprocess.run(
+        ["git", "-C", path, *args],
+        input=data,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    ).stdout
+
+
+def is_bare_repo(path: str) -> bool:
+    try:
+        return _git(path, "rev-parse", "--is-bare-repository").strip() == b"true"
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+# ---------------------------------------------------------
+# Trees
+# ---------------------------------------------------------
+def _bare_repo_tree(path: str, ref: str = "HEAD") -> List[dict]:
+    tree = []
+    output = _git(path, "ls-tree", "-r", "-l", "-z", ref)
+
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, file_path = record.split(b"\t", 1)
+        mode, kind, sha, size = meta.decode().split()
+        if kind != "blob" or mode in _SKIPPED_MODES:
+            continue
+        tree.append({
+            "path": file_path.decode("utf-8", errors="replace"),
+            "type": "blob",
+            "sha": sha,
+            "size": int(size),
+        })
+    return tree
+
+
+def _directory_tree(path: str) -> List[dict]:
+    tree = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for name in files:
+            full_path = os.path.join(root, name)
+            if os.path.islink(full_path):
+                continue
+            try:
+                size = os.path.getsize(full_path)
+            except OSError:
+                continue
+            rel_path = os.path.relpath(full_path, path).replace(os.sep, "/")
+            tree.append({"path": rel_path, "type": "blob", "size": size})
+    return tree
+
+
+def local_repo_version(path: str) -> str:
+    """
+    Version string for a local source: the HEAD commit of a bare repo, or a
+    fingerprint of file names, sizes and mtimes for a directory.
+    """
+    if is_bare_repo(path):
+        return _git(path, "rev-parse", "HEAD").decode().strip()
+
+    digest = hashlib.sha1()
+    for entry in sorted(_directory_tree(path), key=lambda e: e["path"]):
+        mtime = os.stat(os.path.join(path, entry["path"])).st_mtime_ns
+        digest.update(f"{entry['path']}\0{entry['size']}\0{mtime}\n".encode("utf-8"))
+    return f"dir:{digest.hexdigest()}"
+
+
+# ---------------------------------------------------------
+# Reading files
+# ---------------------------------------------------------
+def _read_bare_blobs(path: str, files: List[dict], deliver: Callable[[str, bytes], None]) -> None:
+    """
+    Stream blob contents out of `git cat-file --batch`, one at a time.
+    """
+    process = subprocess.Popen(
+        ["git", "-C", path, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        for file in files:
+            process.stdin.write(f"{file['sha']}\n".encode("ascii"))
+            process.stdin.flush()
+
+            header = process.stdout.readline().split()
+            if len(header) < 3 or header[1] != b"blob":
+                continue
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)  # trailing newline
+            deliver(file["path"], data)
+    finally:
+        process.stdin.close()
+        process.wait()
+
+
+def _read_directory_files(path: str, files: List[dict], deliver: Callable[[str, bytes], None]) -> None:
+    for file in files:
+        try:
+            with open(os.path.join(path, file["path"]), "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Failed to read {file['path']}: {e}")
+            continue
+        deliver(file["path"], data)
+
+
+async def fetch_local_files_async(path: str, report: Optional[dict] = None,
+                                  previous_tree: Optional[Dict[str, str]] = None,
+                                  on_file: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                                  ) -> Dict[str, str]:
+    """
+    Local counterpart of step 1: list, filter and read a local source.
+
+    Fills `report` the same way run_step1_async does (`tree`, `selection`,
+    and `changed_paths` / `removed_paths` when `previous_tree` is given).
+
+    Returns:
+        Dict mapping file_path to file_content (empty when `on_file` is used)
+    """
+    if report is None:
+        report = {}
+
+    bare = await asyncio.to_thread(is_bare_repo, path)
+    tree = await asyncio.to_thread(_bare_repo_tree if bare else _directory_tree, path)
+    important_files = filter_repo_tree(tree, report=report)
+
+    loop = asyncio.get_running_loop()
+    current_tree: Dict[str, str] = {}
+    collected: Dict[str, str] = {}
+
+    if bare:
+        current_tree = {f["path"]: f["sha"] for f in important_files}
+        if previous_tree is not None:
+            changed, _ = diff_tree_states(previous_tree, current_tree)
+            changed = set(changed)
+            important_files = [f for f in important_files if f["path"] in changed]
+
+    def deliver(file_path: str, data: bytes) -> None:
+        # runs in the reader thread
+        sha = git_blob_sha(data)
+        current_tree[file_path] = sha
+        if previous_tree is not None and previous_tree.get(file_path) == sha:
+            return
+        try:
+            content = data.decode("utf-8")
+        except UnicodeDecodeError:
+            return
+
+        if on_file is None:
+            collected[file_path] = content
+        else:
+            asyncio.run_coroutine_threadsafe(on_file(file_path, content), loop).result()
+
+    reader = _read_bare_blobs if bare else _read_directory_files
+    await asyncio.to_thread(reader, path, important_files, deliver)
+
+    report["tree"] = current_tree
+    if previous_tree is not None:
+        changed, removed = diff_tree_states(previous_tree, current_tree)
+        report["changed_paths"] = changed
+        report["removed_paths"] = removed
+
+    print(f"✓ Read {len(current_tree)} files from local source {path}")
+    return collected
@@ -0,0 +1,194 @@
+# structural chunking of markdown. the document is split into sections at its
+# headings (atx "## title" and setext "title\n-----", not inside fenced code),
+# and every section knows its heading path ("Install > From source > Linux").
+# runs of small sections are merged up to the token budget; a section over
+# the budget is split between paragraphs (a fenced code block counts as one),
+# and only a paragraph over the budget is cut between lines. every non-blank
+# line ends up in exactly one chunk.
+
+import re
+from typing import List, Optional, Sequence
+
+# budget per chunk, in the units of the per-line costs (characters by default)
+MARKDOWN_CHUNK_MAX_COST = 1000
+
+# sections below this share of the budget are merged with their neighbours
+MERGE_BELOW = 0.25
+
+_ATX = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_SETEXT = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_LIST_ITEM = re.compile(r"^ {0,3}(?:[-*+]|\d+[.)])[ \t]")
+
+PATH_SEPARATOR = " > "
+
+
+class _Section:
+    __slots__ = ("start", "end", "path")
+
+    def __init__(self, start: int, path: List[str]):
+        self.start = start
+        self.end = start
+        self.path = path
+
+
+def _scan(lines: List[str]):
+    """
+    Sections of the document and the paragraph starts in it.
+
+    Returns:
+        (sections, breaks): sections in order with 1-based line ranges and
+        heading paths (the part before the first heading has an empty
+        path), and the set of lines a paragraph starts on
+    """
+    sections = [_Section(1, [])]
+    stack: List[tuple] = []  # (level, title) of the enclosing headings
+    breaks = set()
+    fence = None
+    previous_blank = True
+
+    def open_section(start: int, level: int, title: str):
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        sections[-1].end = start - 1
+        sections.append(_Section(start, [t for _, t in stack]))
+
+    for number, line in enumerate(lines, 1):
+        blank = not line.strip()
+        fence_match = _FENCE.match(line)
+
+        if fence is not None:
+            # inside a fenced block nothing is a heading or a paragraph break
+            if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence):
+                fence = None
+            previous_blank = blank
+            continue
+
+        if fence_match:
+            fence = fence_match.group(1)
+            breaks.add(number)
+        elif blank:
+            pass
+        elif _ATX.match(line):
+            match = _ATX.match(line)
+            open_section(number, len(match.group(1)), (match.group(2) or "").strip())
+            breaks.add(number)
+        elif (_SETEXT.match(line) and number - 1 in breaks and not previous_blank
+              and sections[-1].start != number - 1 and not _FENCE.match(lines[number - 2])
+              and not _LIST_ITEM.match(lines[number - 2])):
+            # "title\n=====" under a one-line paragraph: that line is the heading
+            open_section(number - 1, 1 if line.strip()[0] == "=" else 2, lines[number - 2].strip())
+        elif previous_blank:
+            breaks.add(number)
+
+        previous_blank = blank
+
+    sections[-1].end = len(lines)
+    return [s for s in sections if s.start <= s.end], breaks
+
+
+class _Chunker:
+    def __init__(self, lines: List[str], line_costs: Sequence[int], max_cost: int):
+        self.lines = lines
+        self.max_cost = max_cost
+        self.prefix = [0]
+        for cost in line_costs:
+            self.prefix.append(self.prefix[-1] + cost)
+        self.pieces: List[dict] = []
+
+    def cost(self, start: int, end: int) -> int:
+        return self.prefix[end] - self.prefix[start - 1]
+
+    def emit(self, start: int, end: int, paths: List[List[str]]) -> None:
+        # leading/trailing blank lines belong to no chunk
+        while start <= end and not self.lines[start - 1].strip():
+            start += 1
+        while end >= start and not self.lines[end - 1].strip():
+            end -= 1
+        if start > end:
+            return
+
+        # a section whose parent is in the same chunk is covered by it
+        kept = []
+        for path in paths:
+            if path and not any(path[:len(other)] == other for other in kept):
+                kept.append(path)
+
+        piece = {
+            "text": "\n".join(self.lines[start - 1:end]),
+            "start_line": start,
+            "end_line": end,
+            "kind": "section",
+        }
+        if kept:
+            piece["symbol"] = ", ".join(PATH_SEPARATOR.join(path) for path in kept)
+        self.pieces.append(piece)
+
+    def sections(self, sections: List[_Section], breaks: set) -> None:
+        merge_below = self.max_cost * MERGE_BELOW
+        pending = None  # (start, end, paths) of sections being merged
+
+        for section in sections:
+            cost = self.cost(section.start, section.end)
+            if pending is not None:
+                pending_cost = self.cost(pending[0], pending[1])
+                if (pending_cost + cost <= self.max_cost
+                        and (pending_cost < merge_below or cost < merge_below)):
+                    pending = (pending[0], section.end, pending[2] + [section.path])
+                    continue
+                self.emit(*pending)
+                pending = None
+
+            if cost > self.max_cost:
+                self.paragraphs(section, breaks)
+            else:
+                pending = (section.start, section.end, [section.path])
+
+        if pending is not None:
+            self.emit(*pending)
+
+    def paragraphs(self, section: _Section, breaks: set) -> None:
+        starts = [line for line in range(section.start, section.end + 1)
+                  if line == section.start or line in breaks]
+        window_start = section.start
+        for index, start in enumerate(starts):
+            end = starts[index + 1] - 1 if index + 1 < len(starts) else section.end
+            if start > window_start and self.cost(window_start, end) > self.max_cost:
+                self.emit(window_start, start - 1, [section.path])
+                window_start = start
+            if self.cost(start, end) > self.max_cost:
+                # a paragraph (or code block) over the budget on its own
+                for line in range(start, end + 1):
+                    if line > window_start and self.cost(window_start, line) > self.max_cost:
+                        self.emit(window_start, line - 1, [section.path])
+                        window_start = line
+        self.emit(window_start, section.end, [section.path])
+
+
+def chunk_markdown_sections(content: str, max_cost: int = MARKDOWN_CHUNK_MAX_COST,
+                            line_costs: Optional[Sequence[int]] = None) -> List[dict]:
+    """
+    Split a markdown document at its headings.
+
+    Args:
+        content: Cleaned file content
+        max_cost: Budget per chunk
+        line_costs: Cost of every line of content.splitlines() (default:
+                    its length plus one for the newline)
+
+    Returns:
+        List of {"text", "start_line", "end_line", "kind", "symbol"} dicts
+        in source order. kind is "section"; symbol is the heading path of
+        the chunk's section ("Usage > Options"), or the paths of the
+        top-most sections of a merged chunk joined by ", " (absent for
+        text before the first heading)
+    """
+    lines = content.splitlines()
+    if line_costs is None:
+        line_costs = [len(line) + 1 for line in lines]
+
+    sections, breaks = _scan(lines)
+    chunker = _Chunker(lines, line_costs, max_cost)
+    chunker.sections(sections, breaks)
+    return chunker.pieces
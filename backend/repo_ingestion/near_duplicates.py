@@ -0,0 +1,187 @@
+# near-duplicate detection for cleaned files (vendored libraries, copied
+# examples, generated clients...). every file gets a MinHash signature of
+# its token shingles; signatures are bucketed with LSH so a new file is only
+# compared with the few files that share a band, and a file whose estimated
+# Jaccard similarity with an earlier one reaches the threshold becomes an
+# alias of it (or, when it ranks higher, takes its place) instead of being
+# chunked and embedded again.
+
+import hashlib
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import DEDUP_THRESHOLD
+
+# signature length and LSH banding (BANDS * ROWS == NUM_PERM). a pair with
+# Jaccard similarity s becomes a candidate with probability
+# 1 - (1 - s**ROWS)**BANDS: ~0.95 at 0.8, >0.999 at 0.9
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# tokens per shingle; files with fewer tokens are only matched exactly
+SHINGLE_SIZE = 5
+
+# shingles hashed per numpy block (bounds the NUM_PERM x block temporary)
+SIGNATURE_BLOCK = 4096
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(0x6175)
+# fixed seed: signatures computed in different worker processes must agree
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+_SHINGLE_BASE = np.uint64(1_000_003)
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> Optional[np.ndarray]:
+    """
+    Unique 32-bit hashes of the text's SHINGLE_SIZE-token shingles, or None
+    if the text is too short to have any.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    if len(tokens) < SHINGLE_SIZE:
+        return None
+
+    # crc32 is stable across processes (str hashes are salted per process)
+    cache: Dict[str, int] = {}
+    token_hashes = np.fromiter(
+        (cache.get(t) or cache.setdefault(t, zlib.crc32(t.encode("utf-8"))) for t in tokens),
+        dtype=np.uint64, count=len(tokens),
+    )
+
+    # polynomial hash of each window of SHINGLE_SIZE tokens
+    count = len(tokens) - SHINGLE_SIZE + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        shingles = (shingles * _SHINGLE_BASE + token_hashes[offset:offset + count]) & _MASK_32
+    return np.unique(shingles)
+
+
+def fingerprint(text: str) -> Tuple[str, Optional[bytes]]:
+    """
+    Fingerprint one cleaned file.
+
+    Returns:
+        (digest, signature): sha1 of the text for exact matches and the
+        MinHash signature (NUM_PERM uint32 values as bytes, so it pickles
+        cheaply out of worker processes), or None for very short files
+    """
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    shingles = _shingle_hashes(text)
+    if shingles is None:
+        return digest, None
+
+    # min over shingles of (a * x + b) mod p for every permutation; a < 2**31
+    # and x < 2**32 keep the products inside uint64
+    signature = np.full(NUM_PERM, _MERSENNE_PRIME, dtype=np.uint64)
+    for start in range(0, len(shingles), SIGNATURE_BLOCK):
+        block = shingles[start:start + SIGNATURE_BLOCK]
+        hashed = (np.outer(_PERM_A, block) + _PERM_B[:, None]) % _MERSENNE_PRIME
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return digest, signature.astype(np.uint32).tobytes()
+
+
+class NearDuplicateIndex:
+    """
+    Files seen so far in one ingest, grouped into near-duplicate clusters.
+
+    Each cluster has one representative; the other members are recorded in
+    `aliases` ({representative path: [alias paths]}). Files added with a
+    score keep the best-scored file as representative: a later file that
+    scores higher takes over its cluster, and the file it replaces is
+    listed in `demoted` (its chunks were already kept). Without scores the
+    first file of a cluster stays its representative. Only files with the
+    same extension are compared, so an alias always has the
+    representative's language.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.aliases: Dict[str, List[str]] = {}
+        self.demoted: List[str] = []
+        self._exact: Dict[Tuple[str, str], str] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[str, int, bytes], List[str]] = {}
+        self._scores: Dict[str, float] = {}
+
+    @property
+    def duplicate_count(self) -> int:
+        return sum(len(paths) for paths in self.aliases.values())
+
+    def add(self, path: str, digest: str, signature: Optional[bytes],
+            score: Optional[float] = None) -> Optional[str]:
+        """
+        Register a file.
+
+        Args:
+            path: Path of the file
+            digest, signature: Its fingerprint (see fingerprint)
+            score: Optional rank of the file (see score_file); higher wins
+
+        Returns:
+            The representative's path if the file duplicates a file that
+            stays the representative of their cluster (the file is then
+            recorded as an alias), otherwise None
+        """
+        extension = os.path.splitext(path)[1].lower()
+        values = np.frombuffer(signature, dtype=np.uint32) if signature is not None else None
+
+        representative = self._exact.get((extension, digest))
+        if representative is None and values is not None:
+            representative = self._closest(extension, values)
+
+        if representative is not None:
+            previous_score = self._scores.get(representative)
+            if score is None or previous_score is None or score <= previous_score:
+                self.aliases.setdefault(representative, []).append(path)
+                return representative
+            # the better file takes over the cluster
+            self._demote(representative, extension, path)
+
+        self._exact[(extension, digest)] = path
+        if score is not None:
+            self._scores[path] = score
+        if values is not None:
+            self._signatures[path] = values
+            for key in self._band_keys(extension, values):
+                self._buckets.setdefault(key, []).append(path)
+        return None
+
+    def _demote(self, representative: str, extension: str, path: str) -> None:
+        for key, member in list(self._exact.items()):
+            if member == representative:
+                self._exact[key] = path
+        values = self._signatures.pop(representative, None)
+        if values is not None:
+            for key in self._band_keys(extension, values):
+                self._buckets[key].remove(representative)
+        self._scores.pop(representative, None)
+        self.aliases[path] = self.aliases.pop(representative, []) + [representative]
+        self.demoted.append(representative)
+
+    def _closest(self, extension: str, values: np.ndarray) -> Optional[str]:
+        candidates: Dict[str, None] = {}
+        for key in self._band_keys(extension, values):
+            candidates.update(dict.fromkeys(self._buckets.get(key, ())))
+
+        best_path, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = float(np.count_nonzero(self._signatures[candidate] == values)) / NUM_PERM
+            # strict comparison: ties go to the earlier representative
+            if similarity > best_similarity:
+                best_path, best_similarity = candidate, similarity
+
+        return best_path if best_similarity >= self.threshold else None
+
+    @staticmethod
+    def _band_keys(extension: str, values: np.ndarray):
+        for band in range(BANDS):
+            yield extension, band, values[band * ROWS:(band + 1) * ROWS].tobytes()
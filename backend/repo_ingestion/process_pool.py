@@ -0,0 +1,43 @@
+# shared process pool for the CPU-bound part of ingestion (validate, clean,
+# chunk). Work submitted here runs outside the API process's GIL, so large
+# ingests use every core and the event loop stays responsive.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from config import INGEST_PROCESS_WORKERS
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool_size() -> int:
+    """Number of worker processes (0 when the pool is disabled)."""
+    return max(0, INGEST_PROCESS_WORKERS)
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the application-wide process pool, or None when
+    GITSAGE_PROCESS_WORKERS is 0 and callers should run work inline.
+    """
+    global _pool
+    if process_pool_size() == 0:
+        return None
+    if _pool is None:
+        # spawn, not fork: the API process holds model weights and threads
+        # that must not be duplicated into the workers
+        _pool = ProcessPoolExecutor(
+            max_workers=process_pool_size(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        print(f"[ProcessPool] Started {process_pool_size()} ingestion workers")
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the worker processes. Call this at application shutdown."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
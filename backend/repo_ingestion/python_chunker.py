@@ -0,0 +1,198 @@
+# ast-driven chunking of python files. emits the module header (imports,
+# constants, top-level code), classes, methods and functions with their
+# decorators and line ranges. a node that is larger than the chunk budget is
+# split along its own statements (recursively), so no chunk is cut off by
+# the embedder's input limit. every line of the file ends up in one chunk.
+
+import ast
+from typing import List, Optional, Sequence
+
+# budget per chunk, in the units of the per-line costs (characters by
+# default; a line costs len(line) + 1 for its newline)
+PYTHON_CHUNK_MAX_COST = 1500
+
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class _Chunker:
+    def __init__(self, lines: List[str], line_costs: Sequence[int], max_cost: int):
+        self.lines = lines
+        self.max_cost = max_cost
+        # prefix[i] = cost of lines 1..i
+        self.prefix = [0]
+        for cost in line_costs:
+            self.prefix.append(self.prefix[-1] + cost)
+        self.pieces: List[dict] = []
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def cost(self, start: int, end: int) -> int:
+        return self.prefix[end] - self.prefix[start - 1]
+
+    def emit(self, start: int, end: int, kind: str, symbol: Optional[str]) -> None:
+        # leading/trailing blank lines belong to no chunk
+        while start <= end and not self.lines[start - 1].strip():
+            start += 1
+        while end >= start and not self.lines[end - 1].strip():
+            end -= 1
+        if start > end:
+            return
+
+        piece = {
+            "text": "\n".join(self.lines[start - 1:end]),
+            "start_line": start,
+            "end_line": end,
+            "kind": kind,
+        }
+        if symbol:
+            piece["symbol"] = symbol
+        self.pieces.append(piece)
+
+    def emit_windows(self, start: int, end: int, kind: str, symbol: Optional[str]) -> None:
+        # line windows for a range without statements to split on
+        window_start = start
+        for line in range(start, end + 1):
+            if line > window_start and self.cost(window_start, line) > self.max_cost:
+                self.emit(window_start, line - 1, kind, symbol)
+                window_start = line
+        self.emit(window_start, end, kind, symbol)
+
+    @staticmethod
+    def node_start(node: ast.AST) -> int:
+        decorators = getattr(node, "decorator_list", None) or []
+        return min([node.lineno] + [d.lineno for d in decorators])
+
+    @staticmethod
+    def child_statements(node: ast.AST) -> List[ast.stmt]:
+        # statements of every block of a compound statement, in source order
+        children: List[ast.stmt] = []
+        for field in ("body", "orelse", "finalbody"):
+            children.extend(getattr(node, field, None) or [])
+        for handler in getattr(node, "handlers", None) or []:
+            children.extend(handler.body)
+        for case in getattr(node, "cases", None) or []:
+            children.extend(case.body)
+        return sorted(children, key=lambda stmt: stmt.lineno)
+
+    # ------------------------------------------------------------------
+    # Chunking
+    # ------------------------------------------------------------------
+    def block(self, statements: List[ast.stmt], start: int, end: int,
+              kind: str, symbol: Optional[str], class_name: Optional[str] = None) -> None:
+        """
+        Chunk lines start..end, which hold `statements` (plus whatever
+        precedes the first one, e.g. a def line). Definitions get chunks of
+        their own; everything else is packed into windows within budget.
+        """
+        window = None  # (start, end) of the pending window
+
+        def flush():
+            nonlocal window
+            if window is not None:
+                self.emit(window[0], window[1], kind, symbol)
+                window = None
+
+        def extend(range_start, range_end):
+            nonlocal window
+            if window is not None and self.cost(window[0], range_end) <= self.max_cost:
+                window = (window[0], range_end)
+                return
+            flush()
+            if self.cost(range_start, range_end) > self.max_cost:
+                # long comment block / header
+                self.emit_windows(range_start, range_end, kind, symbol)
+                return
+            window = (range_start, range_end)
+
+        position = start
+        for index, stmt in enumerate(statements):
+            stmt_start = self.node_start(stmt)
+            if index == 0:
+                # def line / block header / leading comments open the window
+                if start < stmt_start:
+                    extend(start, stmt_start - 1)
+                span_start = stmt_start
+            else:
+                # comments and blank lines before a statement travel with it
+                span_start = position
+            stmt_end = stmt.end_lineno
+
+            if span_start < stmt_start and self.cost(span_start, stmt_end) > self.max_cost:
+                # comments that would push the statement over budget go first
+                extend(span_start, stmt_start - 1)
+                span_start = stmt_start
+
+            if isinstance(stmt, _DEFS):
+                flush()
+                self.definition(stmt, span_start, stmt_end, symbol, class_name is not None)
+            elif self.cost(span_start, stmt_end) > self.max_cost:
+                flush()
+                self.oversized(stmt, span_start, stmt_end, kind, symbol)
+            else:
+                extend(span_start, stmt_end)
+            position = stmt_end + 1
+
+        if position <= end:
+            extend(position, end)
+        flush()
+
+    def definition(self, node: ast.AST, start: int, end: int,
+                   parent: Optional[str], in_class: bool) -> None:
+        symbol = f"{parent}.{node.name}" if parent else node.name
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        else:
+            kind = "method" if in_class else "function"
+
+        if self.cost(start, end) <= self.max_cost:
+            self.emit(start, end, kind, symbol)
+            return
+
+        body = list(node.body)
+        self.block(body, start, end, kind, symbol,
+                   class_name=symbol if isinstance(node, ast.ClassDef) else None)
+
+    def oversized(self, stmt: ast.stmt, start: int, end: int,
+                  kind: str, symbol: Optional[str]) -> None:
+        children = self.child_statements(stmt)
+        if not children:
+            # e.g. a huge literal: nothing to split on but lines
+            self.emit_windows(start, end, kind, symbol)
+            return
+        self.block(children, start, end, kind, symbol)
+
+    def module(self, tree: ast.Module) -> None:
+        self.block(list(tree.body), 1, len(self.lines), "module", None)
+
+
+def chunk_python_ast(content: str, max_cost: int = PYTHON_CHUNK_MAX_COST,
+                     line_costs: Optional[Sequence[int]] = None) -> List[dict]:
+    """
+    Split Python source along its syntax tree.
+
+    Args:
+        content: Cleaned file content
+        max_cost: Budget per chunk
+        line_costs: Cost of every line of content.splitlines() (default:
+                    its length plus one for the newline)
+
+    Returns:
+        List of {"text", "start_line", "end_line", "kind", "symbol"} dicts
+        in source order; kind is "module", "class", "method" or "function",
+        symbol the qualified name of the enclosing definition (absent for
+        module-level code)
+
+    Raises:
+        SyntaxError / ValueError if the content does not parse
+    """
+    # parse exactly the lines that are chunked, so ast line numbers match
+    # them even for files with \r or other separators
+    lines = content.splitlines()
+    tree = ast.parse("\n".join(lines))
+    if line_costs is None:
+        line_costs = [len(line) + 1 for line in lines]
+
+    chunker = _Chunker(lines, line_costs, max_cost)
+    chunker.module(tree)
+    return chunker.pieces
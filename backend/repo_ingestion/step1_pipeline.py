@@ -4,27 +4,109 @@
 
 from repo_ingestion.fetcher import get_repo_details
 from repo_ingestion.fetcher import fetch_meta_repodata, fetch_repo_tree
+from repo_ingestion.fetcher import fetch_meta_repodata_async, fetch_repo_tree_async
 from repo_ingestion.before_file_download_filter import filter_repo_tree
 from repo_ingestion.downloader import download_files_async, download_selected_files
+from repo_ingestion.archive_downloader import download_repo_archive_async
+from repo_ingestion.github_client import TreeTruncatedError
 from repo_ingestion.repo_summary_new import extract_repo_summary
+from repo_ingestion.tree_state import diff_tree_states
+from repo_ingestion.local_source import resolve_local_source, fetch_local_files_async
+from config import INGEST_MODE, INGEST_MAX_TOTAL_BYTES, INGEST_MAX_FILES
 
 
-async def run_step1_async(repo_link):
+async def run_step1_async(repo_link, mode=None, report=None, previous_tree=None,
+                          metadata=None, on_file=None):
     """
     Async version of step1 pipeline.
     Use this when called from async contexts (FastAPI endpoints).
+
+    Args:
+        repo_link: GitHub repository URL, or a local directory / file:// URL /
+                   bare repo (read from disk, no network)
+        mode: "files" (one request per file) or "archive" (one tarball
+              request per repo). Defaults to GITSAGE_INGEST_MODE.
+        report: Optional dict collecting per-file download failures, the
+                selected tree (`tree`: path -> blob sha), the files cut by
+                the ingest budget (`selection`), `tree_truncated` when the
+                tree listing was incomplete and the archive was used
+                instead, and, on re-ingest, `changed_paths` / `removed_paths`
+        previous_tree: Optional {path: blob_sha} from the last ingest; only
+                       added or modified files are downloaded
+        metadata: Optional repo metadata the caller already fetched, so it
+                  is not requested twice per ingest
+        on_file: Optional async callback receiving (path, content) as each
+                 file arrives (streaming ingest); nothing is collected and
+                 the repo summary is left to the caller
     """
+    mode = mode or INGEST_MODE
+    if report is None:
+        report = {}
+
+    local_path = resolve_local_source(repo_link)
+    if local_path:
+        downloaded_files = await fetch_local_files_async(
+            local_path, report=report, previous_tree=previous_tree, on_file=on_file
+        )
+        if previous_tree is None and on_file is None:
+            extract_repo_summary(repo_link, downloaded_files)
+        return downloaded_files
+
     owner, repo = get_repo_details(repo_link)
-    metadata = fetch_meta_repodata(owner, repo)
+    if metadata is None:
+        metadata = await fetch_meta_repodata_async(owner, repo)
     branch = metadata["default_branch"]
 
-    tree = fetch_repo_tree(owner, repo, branch)
-    important_files = filter_repo_tree(tree)
-    
-    # Use async download directly
-    downloaded_files = await download_files_async(owner, repo, branch, important_files)
+    if mode not in ("archive", "files"):
+        raise ValueError(f"Unknown ingest mode: {mode!r}")
 
-    extract_repo_summary(repo_link, downloaded_files)
+    # ranking files against the budget needs the whole listing, so archive
+    # mode fetches the tree too unless the budget is disabled
+    tree = None
+    if mode == "files" or INGEST_MAX_TOTAL_BYTES or INGEST_MAX_FILES:
+        try:
+            tree = await fetch_repo_tree_async(owner, repo, branch)
+        except TreeTruncatedError as e:
+            # the listing misses files; the tarball has all of them
+            print(f"[INGEST] {e}; downloading the repository archive instead "
+                  f"(the file budget is not applied)")
+            report["tree_truncated"] = True
+            mode = "archive"
+
+    if mode == "archive":
+        # filtering happens on the archive entries as they are streamed,
+        # blob shas are computed from the archive contents
+        wanted_paths = None
+        if tree is not None:
+            wanted_paths = {f["path"] for f in filter_repo_tree(tree, report=report)}
+
+        current_tree = {}
+        downloaded_files = await download_repo_archive_async(
+            owner, repo, branch, wanted_paths=wanted_paths, known_blobs=previous_tree,
+            blob_shas=current_tree, on_file=on_file
+        )
+    else:
+        important_files = filter_repo_tree(tree, report=report)
+        current_tree = {f["path"]: f["sha"] for f in important_files}
+
+        if previous_tree is not None:
+            changed, _ = diff_tree_states(previous_tree, current_tree)
+            changed = set(changed)
+            important_files = [f for f in important_files if f["path"] in changed]
+
+        # Use async download directly
+        downloaded_files = await download_files_async(
+            owner, repo, branch, important_files, report=report, on_file=on_file
+        )
+
+    report["tree"] = current_tree
+    if previous_tree is not None:
+        changed, removed = diff_tree_states(previous_tree, current_tree)
+        report["changed_paths"] = changed
+        report["removed_paths"] = removed
+    elif on_file is None:
+        # a partial download would give a misleading summary
+        extract_repo_summary(repo_link, downloaded_files)
 
     return downloaded_files
 
@@ -0,0 +1,510 @@
+"""
+Streaming ingestion: download -> validate/chunk -> embed -> store run as
+concurrent stages connected by bounded queues.
+
+Files are processed while the rest of the repo is still downloading, and
+the embedder works on micro-batches while the store persists the previous
+ones, so an ingest takes roughly as long as its slowest stage instead of
+the sum of all stages. A full queue makes the upstream stage wait, and the
+file contents and chunks in flight are held to a byte budget, which keeps
+memory bounded however large the repo; the time each stage spends waiting
+is reported.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import (
+    DEDUP_THRESHOLD,
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_MAX_INFLIGHT_BYTES,
+    INGEST_STORE_BATCH_SIZE,
+)
+from embeddings.embedding_router import EmbeddingRouter
+from embeddings.token_budget import TokenReport
+from repo_ingestion.before_file_download_filter import score_file
+from repo_ingestion.file_processor import drop_duplicate, process_file, process_file_fingerprinted
+from repo_ingestion.near_duplicates import NearDuplicateIndex
+from repo_ingestion.process_pool import get_process_pool, process_pool_size
+from vectorstore.chroma_store import ChromaStore, chunk_id
+
+# files waiting for validation/chunking, and batches waiting between the
+# embed and store stages
+FILE_QUEUE_SIZE = 64
+CHUNK_QUEUE_SIZE = 8 * INGEST_EMBED_BATCH_SIZE
+STORE_QUEUE_SIZE = 4
+
+# files being validated/chunked at once: enough to keep every worker
+# process busy while finished files are forwarded in order
+CHUNK_TASKS_PER_WORKER = 2
+
+# manifests kept for the repo summary; every other file only contributes its path
+SUMMARY_MANIFESTS = ("package.json", "requirements.txt")
+
+# a chunk's vector is a float32 row of its batch's matrix: 4 bytes per
+# dimension plus the array header
+VECTOR_BYTES = {"code": 768 * 4 + 112, "text": 384 * 4 + 112}
+
+_DONE = object()
+# sent down the stages when the byte budget is exhausted: every stage
+# passes on what it holds instead of waiting for a full batch
+_FLUSH = object()
+
+
+class ByteBudget:
+    """
+    Bytes of file contents and chunks an ingest holds between download and
+    store.
+
+    `acquire` waits until more bytes fit, after calling `on_wait` to make
+    the stages downstream pass on what they hold. While anyone waits
+    (`waiting`), a stage with nothing to read passes on what it holds too:
+    items charged by other producers after the flush would otherwise sit in
+    partial batches that are never released. A file only waits for room
+    while anything at all is in flight, the chunks of a file only while
+    chunks are, so a single item larger than the budget still gets through
+    and the chunk stage never waits on contents it has yet to chunk itself.
+    Bookings (`charge`) are released under their key.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = INGEST_MAX_INFLIGHT_BYTES if limit is None else limit
+        self.in_use = 0
+        self.chunks_in_use = 0
+        self.peak = 0
+        # acquire calls waiting for room
+        self.waiting = 0
+        self._held: Dict[object, tuple] = {}
+        self._released = asyncio.Event()
+
+    def _exhausted(self, size: int, chunks_only: bool) -> bool:
+        releasable = self.chunks_in_use if chunks_only else self.in_use
+        return self.limit > 0 and releasable > 0 and self.in_use + size > self.limit
+
+    async def acquire(self, size: int, on_wait: Callable[[], Awaitable[None]], chunks_only: bool = False) -> None:
+        if self._exhausted(size, chunks_only):
+            self.waiting += 1
+            try:
+                # the flush drains what is downstream of the caller now
+                self._released.clear()
+                await on_wait()
+                while self._exhausted(size, chunks_only):
+                    await self._released.wait()
+                    self._released.clear()
+            finally:
+                self.waiting -= 1
+
+    def charge(self, key, size: int, chunk: bool = False) -> None:
+        held, _ = self._held.get(key, (0, chunk))
+        self._held[key] = (held + size, chunk)
+        self.in_use += size
+        if chunk:
+            self.chunks_in_use += size
+        self.peak = max(self.peak, self.in_use)
+
+    def release(self, key) -> None:
+        size, chunk = self._held.pop(key, (0, False))
+        if size:
+            self.in_use -= size
+            if chunk:
+                self.chunks_in_use -= size
+            self._released.set()
+
+
+def chunk_bytes(chunk: dict) -> int:
+    """Approximate memory of a chunk once it carries its vector."""
+    return len(chunk.get("text") or "") + VECTOR_BYTES.get(chunk.get("type"), 0)
+
+
+class StageStats:
+    """
+    Per-stage counters.
+
+    `busy_s` is time spent doing the stage's own work, `starved_s` time
+    spent waiting for input from upstream and `blocked_s` time spent waiting
+    for room downstream (backpressure).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_s = 0.0
+        self.starved_s = 0.0
+        self.blocked_s = 0.0
+        self.max_queue_depth = 0
+
+    async def get(self, queue: asyncio.Queue):
+        started = time.perf_counter()
+        item = await queue.get()
+        self.starved_s += time.perf_counter() - started
+        return item
+
+    async def put(self, queue: asyncio.Queue, item) -> None:
+        started = time.perf_counter()
+        await queue.put(item)
+        self.blocked_s += time.perf_counter() - started
+        self.max_queue_depth = max(self.max_queue_depth, queue.qsize())
+
+    def as_dict(self) -> dict:
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_s": round(self.busy_s, 3),
+            "starved_s": round(self.starved_s, 3),
+            "blocked_s": round(self.blocked_s, 3),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+async def run_streaming_ingest(
+    repo_url: str,
+    produce: Callable[[Callable[[str, str], Awaitable[None]]], Awaitable[None]],
+    extra_chunks: Optional[Callable[[Dict[str, str]], List[dict]]] = None,
+    router: Optional[EmbeddingRouter] = None,
+    store: Optional[ChromaStore] = None,
+    token_report: Optional[TokenReport] = None,
+    reuse_existing: bool = False,
+) -> dict:
+    """
+    Run the ingestion stages concurrently.
+
+    Args:
+        repo_url: Normalized repository URL the chunks are stored under
+        produce: Coroutine function that downloads the repo and awaits the
+                 callback it is given once per (path, content)
+        extra_chunks: Optional function called once all files are chunked
+                      with {path: manifest content or ""}; the chunks it
+                      returns (e.g. the repo summary) are embedded last
+        router: Optional EmbeddingRouter (defaults to a new one)
+        store: Optional ChromaStore (defaults to a new one)
+        token_report: Optional TokenReport the chunks' token counts are
+                      added to (defaults to a new one)
+        reuse_existing: The store may already hold chunks of this repo:
+                        chunks whose id is stored with a vector of the
+                        current embedder are not embedded again (only
+                        their metadata is refreshed), and stored
+                        chunks of the processed files that are no longer
+                        produced are deleted at the end
+
+    Returns:
+        dict with `file_count`, `chunk_count`, `stored_count`, per-stage
+        `stages` statistics, the peak bytes held in flight
+        (`max_inflight_bytes`), the near-duplicate files that were not
+        embedded (`duplicates`, {representative path: [alias paths]}), the
+        tokens sent to / truncated by each embedder (`tokens`), the
+        embedding cache lookups (`embedding_cache`), and the chunks found
+        already stored (`reused_count`) or removed as stale (`deleted_count`)
+    """
+    router = router or EmbeddingRouter()
+    store = store or ChromaStore()
+    token_report = token_report if token_report is not None else TokenReport()
+
+    # files are deduplicated as they arrive: the best-ranked file of a
+    # cluster so far (see score_file) is embedded and the others become its
+    # aliases; a representative outranked by a later file is deleted again
+    # once everything is stored
+    index = NearDuplicateIndex() if DEDUP_THRESHOLD > 0 else None
+    worker = process_file if index is None else process_file_fingerprinted
+
+    file_queue: asyncio.Queue = asyncio.Queue(maxsize=FILE_QUEUE_SIZE)
+    chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=CHUNK_QUEUE_SIZE)
+    store_queue: asyncio.Queue = asyncio.Queue(maxsize=STORE_QUEUE_SIZE)
+
+    download = StageStats("download")
+    chunking = StageStats("chunk")
+    embedding = StageStats("embed")
+    storing = StageStats("store")
+    budget = ByteBudget()
+
+    # paths (and manifest contents) seen, for the repo summary
+    summary_inputs: Dict[str, str] = {}
+    # chunk ids every processed file has now, to find stale stored chunks
+    kept_ids: Dict[str, set] = {}
+    reused_count = 0
+    # {route: model key} of the router's embedders, looked up once
+    model_keys: Optional[Dict[str, str]] = None
+
+    async def request_flush() -> None:
+        await download.put(file_queue, _FLUSH)
+
+    async def on_file(path: str, content: str) -> None:
+        started = time.perf_counter()
+        await budget.acquire(len(content), request_flush)
+        budget.charge(path, len(content))
+        download.blocked_s += time.perf_counter() - started
+
+        download.items_out += 1
+        keep = path.lower().endswith(SUMMARY_MANIFESTS)
+        summary_inputs[path] = content if keep else ""
+        await download.put(file_queue, (path, content))
+
+    async def download_stage():
+        started = time.perf_counter()
+        try:
+            await produce(on_file)
+        finally:
+            download.busy_s = time.perf_counter() - started - download.blocked_s
+        # only once everything is downloaded: when a later stage fails, this
+        # task is cancelled and nothing reads the (possibly full) queue again
+        await file_queue.put(_DONE)
+
+    async def flush_chunks() -> None:
+        await chunking.put(chunk_queue, _FLUSH)
+
+    async def forward_chunks(path: str, task: asyncio.Future, score: float) -> None:
+        started = time.perf_counter()
+        chunks = await task
+        chunking.busy_s += time.perf_counter() - started
+        # the content is done with; its chunks are held until stored
+        budget.release(path)
+        if index is not None:
+            chunks = drop_duplicate(index, path, chunks, score=score)
+
+        ids = kept_ids.setdefault(path, set())
+        for chunk in chunks:
+            # same repo, path and text -> same id, across runs
+            chunk["id"] = chunk_id(repo_url, path, chunk["text"])
+            ids.add(chunk["id"])
+            size = chunk_bytes(chunk)
+            started = time.perf_counter()
+            await budget.acquire(size, flush_chunks, chunks_only=True)
+            chunking.blocked_s += time.perf_counter() - started
+            budget.charge(id(chunk), size, chunk=True)
+            chunking.items_out += 1
+            token_report.add(chunk)
+            await chunking.put(chunk_queue, chunk)
+
+    async def chunk_stage():
+        # files fan out over the process pool; results are forwarded in
+        # input order, so busy_s is the time spent waiting on workers
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        max_in_flight = max(1, process_pool_size()) * CHUNK_TASKS_PER_WORKER
+        pending: deque = deque()
+
+        try:
+            while True:
+                if pending and file_queue.empty() and budget.waiting:
+                    # room is waited for and no file is coming: pass the
+                    # chunks on instead of holding them for more files
+                    while pending:
+                        await forward_chunks(*pending.popleft())
+                item = await chunking.get(file_queue)
+                if item is _DONE:
+                    break
+                if item is _FLUSH:
+                    while pending:
+                        await forward_chunks(*pending.popleft())
+                    await flush_chunks()
+                    continue
+                chunking.items_in += 1
+
+                if pool is not None:
+                    task = loop.run_in_executor(pool, worker, *item)
+                else:
+                    task = asyncio.ensure_future(asyncio.to_thread(worker, *item))
+                # the content is released before its chunks come back
+                pending.append((item[0], task, score_file(item[0], len(item[1]))))
+
+                if len(pending) >= max_in_flight:
+                    await forward_chunks(*pending.popleft())
+
+            while pending:
+                await forward_chunks(*pending.popleft())
+        finally:
+            for _, task, _ in pending:
+                task.cancel()
+
+        if extra_chunks is not None:
+            for chunk in extra_chunks(summary_inputs):
+                budget.charge(id(chunk), chunk_bytes(chunk), chunk=True)
+                chunking.items_out += 1
+                await chunking.put(chunk_queue, chunk)
+
+        await chunk_queue.put(_DONE)
+
+    async def drop_stored(candidates: List[dict]) -> List[dict]:
+        # chunks whose id is already stored only get their metadata refreshed
+        # (unchanged text, but it may have moved within the file), unless
+        # their vector was made by another embedder or pooling
+        nonlocal reused_count, model_keys
+        if not reuse_existing or not candidates:
+            return candidates
+
+        started = time.perf_counter()
+        if model_keys is None:
+            # may start the embedding workers
+            model_keys = await asyncio.to_thread(router.model_keys)
+        stored = await asyncio.to_thread(
+            store.existing_ids, [c["id"] for c in candidates if c.get("id")], model_keys
+        )
+        if stored:
+            reused = [c for c in candidates if c.get("id") in stored]
+            for chunk in reused:
+                chunk["embedder"] = model_keys["code" if chunk.get("type") == "code" else "text"]
+            await asyncio.to_thread(store.update_metadata, reused, repo_url)
+            reused_count += len(reused)
+            for chunk in reused:
+                budget.release(id(chunk))
+            candidates = [c for c in candidates if c.get("id") not in stored]
+        embedding.busy_s += time.perf_counter() - started
+        return candidates
+
+    async def forward_embedded(batch: List[dict], task: asyncio.Future) -> None:
+        started = time.perf_counter()
+        embedded = await task
+        embedding.busy_s += time.perf_counter() - started
+        embedding.items_out += len(embedded)
+        if len(embedded) < len(batch):
+            # chunks without a route are not stored
+            kept = {id(chunk) for chunk in embedded}
+            for chunk in batch:
+                if id(chunk) not in kept:
+                    budget.release(id(chunk))
+        if embedded:
+            await embedding.put(store_queue, embedded)
+
+    async def embed_stage():
+        # chunks are checked against the store in groups, and the ones that
+        # need embedding are re-batched so the model still gets full batches.
+        # with embedding workers several batches are embedded at once and
+        # forwarded in order, so busy_s is the time spent waiting on them
+        max_in_flight = router.parallelism
+        pending: deque = deque()
+        candidates: List[dict] = []
+        batch: List[dict] = []
+
+        async def embed_batch(chunks: List[dict]) -> None:
+            pending.append((chunks, asyncio.ensure_future(asyncio.to_thread(router.route_and_embed, chunks))))
+            if len(pending) >= max_in_flight:
+                await forward_embedded(*pending.popleft())
+
+        async def embed_all(chunks: List[dict]) -> None:
+            for start in range(0, len(chunks), INGEST_EMBED_BATCH_SIZE):
+                await embed_batch(chunks[start:start + INGEST_EMBED_BATCH_SIZE])
+            while pending:
+                await forward_embedded(*pending.popleft())
+
+        try:
+            while True:
+                if (candidates or batch or pending) and chunk_queue.empty() and budget.waiting:
+                    # room is waited for and no chunk is coming: embed the
+                    # partial batch instead of waiting for it to fill
+                    batch.extend(await drop_stored(candidates))
+                    candidates = []
+                    await embed_all(batch)
+                    batch = []
+                item = await embedding.get(chunk_queue)
+                if item is _DONE:
+                    break
+                if item is _FLUSH:
+                    batch.extend(await drop_stored(candidates))
+                    candidates = []
+                    await embed_all(batch)
+                    batch = []
+                    await embedding.put(store_queue, _FLUSH)
+                    continue
+                embedding.items_in += 1
+                candidates.append(item)
+                if len(candidates) >= INGEST_EMBED_BATCH_SIZE:
+                    batch.extend(await drop_stored(candidates))
+                    candidates = []
+                while len(batch) >= INGEST_EMBED_BATCH_SIZE:
+                    await embed_batch(batch[:INGEST_EMBED_BATCH_SIZE])
+                    batch = batch[INGEST_EMBED_BATCH_SIZE:]
+
+            batch.extend(await drop_stored(candidates))
+            await embed_all(batch)
+        finally:
+            for _, task in pending:
+                task.cancel()
+        await store_queue.put(_DONE)
+
+    async def store_batch(batch: List[dict]) -> None:
+        started = time.perf_counter()
+        await asyncio.to_thread(store.add_embeddings, batch, repo_url)
+        storing.busy_s += time.perf_counter() - started
+        storing.items_out += len(batch)
+        for chunk in batch:
+            budget.release(id(chunk))
+
+    async def store_stage():
+        batch: List[dict] = []
+        while True:
+            if batch and store_queue.empty() and budget.waiting:
+                # room is waited for and no vector is coming: store them
+                await store_batch(batch)
+                batch = []
+            item = await storing.get(store_queue)
+            if item is _DONE:
+                break
+            if item is _FLUSH:
+                if batch:
+                    await store_batch(batch)
+                    batch = []
+                continue
+            storing.items_in += len(item)
+            batch.extend(item)
+            if len(batch) >= INGEST_STORE_BATCH_SIZE:
+                await store_batch(batch)
+                batch = []
+
+        if batch:
+            await store_batch(batch)
+
+    tasks = [
+        asyncio.ensure_future(stage())
+        for stage in (download_stage, chunk_stage, embed_stage, store_stage)
+    ]
+
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    deleted_count = 0
+    if index is not None and index.demoted:
+        # outranked representatives are aliases now; their chunks are gone
+        # from the store whether stored in this run or a previous one
+        for path in index.demoted:
+            kept_ids.pop(path, None)
+        await asyncio.to_thread(store.delete_paths, repo_url, index.demoted)
+        print(f"[INGEST] Replaced {len(index.demoted)} near-duplicate representatives "
+              f"with better-ranked files")
+    if reuse_existing and kept_ids:
+        deleted_count = await asyncio.to_thread(store.delete_stale_chunks, repo_url, kept_ids)
+
+    stages = {s.name: s.as_dict() for s in (download, chunking, embedding, storing)}
+    slowest = max(stages, key=lambda name: stages[name]["busy_s"])
+    print(f"✓ Streamed {download.items_out} files -> {chunking.items_out} chunks -> "
+          f"{storing.items_out} stored (slowest stage: {slowest})")
+    if index is not None and index.aliases:
+        print(f"[INGEST] Skipped {index.duplicate_count} near-duplicate files")
+    if reuse_existing:
+        print(f"[INGEST] {reused_count} chunks already stored, {deleted_count} stale chunks deleted")
+    cache_stats = router.cache_stats()
+    if cache_stats["hits"]:
+        print(f"[INGEST] {cache_stats['hits']} of {cache_stats['hits'] + cache_stats['misses']} "
+              f"embeddings found in the embedding cache")
+
+    return {
+        "file_count": download.items_out,
+        "chunk_count": chunking.items_out,
+        "stored_count": storing.items_out,
+        "stages": stages,
+        "max_inflight_bytes": budget.peak,
+        "duplicates": index.aliases if index is not None else {},
+        "tokens": token_report.as_dict(),
+        "embedding_cache": cache_stats,
+        "reused_count": reused_count,
+        "deleted_count": deleted_count,
+    }
@@ -0,0 +1,105 @@
+# keeps the last ingested tree of every repo (path -> git blob sha) so a
+# re-ingest only has to touch the files that actually changed
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from config import GITSAGE_DATA_DIR
+
+TREE_STATE_DIR = os.path.join(GITSAGE_DATA_DIR, "trees")
+
+
+def _state_path(repo_url: str) -> str:
+    key = hashlib.sha256(repo_url.encode("utf-8")).hexdigest()
+    return os.path.join(TREE_STATE_DIR, f"{key}.json")
+
+
+def _load_state(repo_url: str) -> Optional[dict]:
+    try:
+        with open(_state_path(repo_url), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if state.get("repo_url") != repo_url:
+        return None
+    return state
+
+
+def load_tree_state(repo_url: str) -> Optional[Dict[str, str]]:
+    """
+    Return the {path: blob_sha} mapping recorded by the last successful
+    ingest of this repo, or None if it was never ingested.
+    """
+    state = _load_state(repo_url)
+    if state is None:
+        return None
+    return state.get("blobs") or {}
+
+
+def load_tree_aliases(repo_url: str) -> Dict[str, List[str]]:
+    """
+    Return the near-duplicate clusters ({representative path: [alias paths]})
+    recorded by the last successful ingest of this repo.
+    """
+    state = _load_state(repo_url)
+    if state is None:
+        return {}
+    return state.get("aliases") or {}
+
+
+def load_tree_embedders(repo_url: str) -> Dict[str, str]:
+    """
+    Return the {route: model key} of the embedders the last successful
+    ingest of this repo used (empty for ingests that did not record them).
+    """
+    state = _load_state(repo_url)
+    if state is None:
+        return {}
+    return state.get("embedders") or {}
+
+
+def save_tree_state(repo_url: str, blobs: Dict[str, str],
+                    aliases: Optional[Dict[str, List[str]]] = None,
+                    embedders: Optional[Dict[str, str]] = None) -> None:
+    """
+    Atomically record the {path: blob_sha} mapping of a finished ingest,
+    the near-duplicate clusters whose aliases were not embedded and the
+    embedders its chunks were embedded with.
+    """
+    os.makedirs(TREE_STATE_DIR, exist_ok=True)
+    path = _state_path(repo_url)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "repo_url": repo_url,
+            "blobs": blobs,
+            "aliases": aliases or {},
+            "embedders": embedders or {},
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    SHA-1 git assigns to a blob with this content (same as `git hash-object`).
+    """
+    header = f"blob {len(data)}\0".encode("ascii")
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def diff_tree_states(previous: Dict[str, str],
+                     current: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    Compare two {path: blob_sha} mappings.
+
+    Returns:
+        (changed, removed): paths that are new or whose blob changed, and
+        paths that are no longer part of the tree
+    """
+    changed = [path for path, sha in current.items() if previous.get(path) != sha]
+    removed = [path for path in previous if path not in current]
+    return changed, removed
@@ -3,14 +3,22 @@ Unified ingestion pipeline that uses the improved GitHub-based downloader
 while maintaining compatibility with existing Q&A and Docs features.
 """
 
+import asyncio
+
 from repo_ingestion.step1_pipeline import run_step1, run_step1_async  # ← ADD run_step1_async import
-from repo_ingestion.file_processor import run_step2_validation
-from embeddings.embedding_pipeline import EmbeddingPipeline
+from repo_ingestion.streaming_pipeline import run_streaming_ingest
 from vectorstore.chroma_store import ChromaStore
 from ingestion.repo_fetcher import normalize_repo_url
-from repo_ingestion.fetcher import get_repo_details, fetch_meta_repodata
+from repo_ingestion.fetcher import get_repo_details, fetch_meta_repodata, fetch_meta_repodata_async
 
 from repo_ingestion.repo_summary_new import extract_repo_summary, get_repo_summary
+from repo_ingestion.tree_state import (
+    diff_tree_states, load_tree_aliases, load_tree_embedders, load_tree_state, save_tree_state,
+)
+from repo_ingestion.file_processor import format_aliases
+from embeddings.embedding_router import EmbeddingRouter
+from embeddings.token_budget import TokenReport
+from repo_ingestion.local_source import resolve_local_source, local_repo_version
 
 def _get_repo_version(repo_url: str) -> str | None:
     """
@@ -19,13 +27,19 @@ def _get_repo_version(repo_url: str) -> str | None:
 
     We intentionally avoid cloning/downloading the repo just to compute this.
     """
+    local_path = resolve_local_source(repo_url)
+    if local_path:
+        return local_repo_version(local_path)
+
     details = get_repo_details(repo_url)
     if not details:
         return None
 
     owner, repo = details
-    metadata = fetch_meta_repodata(owner, repo)
+    return _repo_version_from_metadata(fetch_meta_repodata(owner, repo))
+
 
+def _repo_version_from_metadata(metadata: dict) -> str:
     # Prefer pushed_at (last content update); fall back to updated_at or a
     # combination of default_branch + node_id as a stable-ish identifier.
     return (
@@ -35,76 +49,257 @@ def _get_repo_version(repo_url: str) -> str | None:
     )
 
 
+def _ingest_warnings(report: dict) -> list:
+    """Ways the ingest left files of the repo out, for the /ingest response."""
+    warnings = []
+    selection = report.get("selection") or {}
+    if selection.get("cut_files"):
+        total = selection["selected_files"] + selection["cut_files"]
+        warnings.append(
+            f"Partial ingest: the repo budget (GITSAGE_MAX_REPO_BYTES / GITSAGE_MAX_REPO_FILES) "
+            f"left out {selection['cut_files']} of {total} files ({selection['cut_bytes']} bytes); "
+            f"see `selection`"
+        )
+    if report.get("tree_truncated"):
+        warnings.append(
+            "The GitHub tree listing was truncated; the repository archive was ingested "
+            "instead, without the repo budget"
+        )
+    for warning in warnings:
+        print(f"[INGEST] WARNING: {warning}")
+    return warnings
+
+
 async def ingest_repository(repo_url: str) -> dict:
     """
     Complete repository ingestion pipeline (async version).
 
-    Steps:
-    1) Use GitHub APIs to discover and download only relevant files.
+    Steps (run concurrently as a streaming pipeline, see streaming_pipeline):
+    1) Use GitHub APIs (or a local checkout) to discover and read only
+       relevant files.
     2) Clean, validate, and chunk the downloaded files.
     3) Embed chunks and store them in persistent ChromaDB collections.
 
-    The pipeline is idempotent with respect to a (repo_url, repo_version)
-    pair: if the same repo at the same version has already been ingested,
-    ingestion is skipped to avoid redundant work.
+    Re-ingestion is incremental: the tree of the last successful ingest
+    (path -> blob sha) is kept on disk, so only added or modified files are
+    downloaded and chunked. Chunk ids derive from (repo, path, text), so
+    chunks that are already stored are not embedded again, and chunks that
+    removed or modified files no longer have are deleted. A repo whose
+    selected files did not change is skipped, unless the embedders (model
+    or pooling) changed since: then every chunk stored with a vector of the
+    old embedder is embedded again.
+
+    Near-duplicate files (vendored or copied code) are not embedded; the
+    chunks of the file kept for a cluster list the others as `aliases`.
+    When that file changes or disappears, its unchanged aliases are
+    ingested again in the same run.
 
     Args:
-        repo_url: GitHub repository URL
+        repo_url: GitHub repository URL, or a local directory, file:// URL or
+                  bare git repo (ingested without network access)
 
     Returns:
-        dict: Status and chunk count / skip information.
+        dict: Status and chunk count / skip information, plus the files that
+        could not be downloaded (`failed_files`), the files left out by the
+        ingest budget (`selection`, also summarized in `warnings` with
+        anything else that made the ingest partial), per-stage timings and
+        backpressure
+        (`stages`), the near-duplicate files that were not embedded
+        (`duplicates`), the tokens embedded and truncated per embedder
+        (`tokens`), the chunks that were already stored and not embedded
+        again (`reused_chunks`) and the number of changed / removed files
+        on incremental runs.
     """
 
     normalized_repo = normalize_repo_url(repo_url)
-    repo_version = _get_repo_version(normalized_repo)
+    local_path = resolve_local_source(normalized_repo)
+
+    if local_path:
+        metadata = None
+        repo_version = await asyncio.to_thread(local_repo_version, local_path)
+    else:
+        details = get_repo_details(normalized_repo)
+        if not details:
+            raise ValueError(f"Not a GitHub repository URL or local path: {repo_url}")
+
+        # fetched once and shared with step 1
+        metadata = await fetch_meta_repodata_async(*details)
+        repo_version = _repo_version_from_metadata(metadata)
 
     store = ChromaStore()
-    #if store.is_repo_ingested(normalized_repo, repo_version):
-    if False:
-        msg = f"Repository already ingested for version {repo_version}; skipping re-embedding."
+    router = EmbeddingRouter()
+    model_keys = await asyncio.to_thread(router.model_keys)
+
+    previous_tree = load_tree_state(normalized_repo)
+    # last ingested tree of a repo that is re-embedded in full
+    reembedded_tree = None
+    # chunks already stored (same repo, path and text, same embedder) are
+    # not embedded again
+    has_chunks = store.has_repo_chunks(normalized_repo)
+    if previous_tree is not None and not has_chunks:
+        # vector store was reset since the last ingest; start over
+        previous_tree = None
+    elif previous_tree is not None and load_tree_embedders(normalized_repo) != model_keys:
+        # the model or its pooling changed: every file is processed again
+        # and chunks stored with the old vectors are re-embedded
+        print(f"[INGEST] Embedders changed since the last ingest; re-embedding {normalized_repo}")
+        reembedded_tree = previous_tree
+        previous_tree = None
+
+    incremental = previous_tree is not None
+    previous_aliases = load_tree_aliases(normalized_repo) if incremental else {}
+    report = {"failed_files": []}
+
+    def producer(known_tree, run_report):
+        # a modified file's chunks are diffed by id: unchanged ones are kept,
+        # stale ones deleted once the new ones are stored
+        async def produce(on_file):
+            await run_step1_async(
+                normalized_repo, report=run_report, previous_tree=known_tree,
+                metadata=metadata, on_file=on_file,
+            )
+        return produce
+
+    def summary_chunks(summary_inputs):
+        if incremental:
+            return []
+        extract_repo_summary(normalized_repo, summary_inputs)
+        summary_text = get_repo_summary(normalized_repo)
+        if not summary_text:
+            return []
+        return [{
+            "content": summary_text,
+            "language": "text",
+            "metadata": {
+                "repo_url": normalized_repo,
+                "path": "__REPO_SUMMARY__",
+                "type": "repo_summary"
+            }
+        }]
+
+    print(f"[INGEST] Streaming download -> chunk -> embed -> store...")
+    # Download, validate/chunk, embed and store run concurrently with
+    # bounded queues between them
+    token_report = TokenReport()
+    stats = await run_streaming_ingest(
+        normalized_repo, producer(previous_tree, report), extra_chunks=summary_chunks,
+        router=router, token_report=token_report, reuse_existing=has_chunks,
+    )
+    duplicates = dict(stats["duplicates"])
+
+    changed_paths = report.get("changed_paths", [])
+    removed_paths = report.get("removed_paths", [])
+    failed_paths = {f["path"] for f in report["failed_files"]}
+    warnings = _ingest_warnings(report)
+
+    if incremental and not changed_paths and not removed_paths:
+        msg = "Repository files unchanged since last ingest; skipping re-embedding."
         print(f"[INGEST] {msg}")
+        store.mark_repo_ingested(normalized_repo, repo_version)
         return {
             "status": "success",
             "message": msg,
             "chunk_count": 0,
             "skipped": True,
+            "failed_files": [],
+            "selection": report.get("selection"),
+            "warnings": warnings,
         }
 
-    print(f"[1/3] Fetching and downloading repository files...")
-    # Step 1: Fetch from GitHub API, filter, download (async version)
-    downloaded_files = await run_step1_async(normalized_repo)
-    print(f"✓ Downloaded {len(downloaded_files)} files")
-
-    extract_repo_summary(normalized_repo, downloaded_files)
-    summary_text = get_repo_summary(normalized_repo)
-
-    print(f"[2/3] Cleaning, validating, and chunking...")
-    # Step 2: Clean, validate, and chunk with language-specific logic
-    chunks = run_step2_validation(downloaded_files)
-    if summary_text:
-      chunks.append({
-        "content": summary_text,
-        "language": "text",
-        "metadata": {
-            "repo_url": normalized_repo,
-            "path": "__REPO_SUMMARY__",
-            "type": "repo_summary"
-        }
-    })
-    print(f"✓ Created {len(chunks)} chunks")
+    if incremental:
+        print(f"[INGEST] Incremental: {len(changed_paths)} changed, "
+              f"{len(removed_paths)} removed files")
+        # modified files that failed to download lose their stale chunks too
+        stale_paths = removed_paths + [p for p in failed_paths if p in previous_tree]
+        await asyncio.to_thread(store.delete_paths, normalized_repo, stale_paths)
+    elif reembedded_tree is not None:
+        # the full run only rewrote the files the repo has now; chunks of
+        # files deleted since the last ingest are still stored
+        _, removed_paths = diff_tree_states(reembedded_tree, report["tree"])
+        if removed_paths:
+            print(f"[INGEST] Removing chunks of {len(removed_paths)} files deleted since the last ingest")
+            await asyncio.to_thread(store.delete_paths, normalized_repo, removed_paths)
+
+    chunk_count = stats["chunk_count"]
+    reused_count = stats["reused_count"]
+    embedding_cache = dict(stats["embedding_cache"])
+
+    # clusters of unchanged files carry over; aliases whose representative
+    # changed or went away were never embedded, so they are ingested now
+    touched = set(changed_paths) | set(removed_paths) | failed_paths
+    orphans = set()
+    for representative, alias_paths in previous_aliases.items():
+        kept = [p for p in alias_paths if p not in touched and p in report["tree"]]
+        if representative in touched:
+            orphans.update(kept)
+        elif kept:
+            duplicates.setdefault(representative, []).extend(kept)
+
+    if orphans:
+        print(f"[INGEST] Re-ingesting {len(orphans)} aliases of changed files")
+        orphan_report = {"failed_files": []}
+        known_tree = {p: sha for p, sha in report["tree"].items() if p not in orphans}
+        orphan_stats = await run_streaming_ingest(
+            normalized_repo, producer(known_tree, orphan_report), router=router,
+            token_report=token_report, reuse_existing=True,
+        )
+        chunk_count += orphan_stats["chunk_count"]
+        reused_count += orphan_stats["reused_count"]
+        for key in ("hits", "misses"):
+            embedding_cache[key] += orphan_stats["embedding_cache"][key]
+        lookups = embedding_cache["hits"] + embedding_cache["misses"]
+        embedding_cache["hit_rate"] = round(embedding_cache["hits"] / lookups, 3) if lookups else 0.0
+        for representative, alias_paths in orphan_stats["duplicates"].items():
+            duplicates.setdefault(representative, []).extend(alias_paths)
+        report["failed_files"].extend(orphan_report["failed_files"])
+        failed_paths.update(f["path"] for f in orphan_report["failed_files"])
+
+    # alias metadata of every representative whose cluster changed or whose
+    # chunks were rewritten in this run
+    alias_updates = {
+        representative: format_aliases(duplicates.get(representative, []))
+        for representative in set(duplicates) | set(previous_aliases)
+        if representative not in removed_paths
+        and (representative in touched or not incremental
+             or sorted(duplicates.get(representative, [])) != sorted(previous_aliases.get(representative, [])))
+    }
+    if alias_updates:
+        await asyncio.to_thread(store.set_path_aliases, normalized_repo, alias_updates)
+
+    tokens = token_report.as_dict()
+    for route, totals in (tokens or {}).items():
+        if route != "estimated":
+            print(f"[INGEST] {route}: {totals['tokens']} tokens in {totals['chunks']} chunks, "
+                  f"{totals['truncated_tokens']} truncated by the embedder")
+
+    store.mark_repo_ingested(normalized_repo, repo_version)
 
-    print(f"[3/3] Embedding and storing in ChromaDB...")
-    # Step 3: Route to appropriate embedders and store
-    pipeline = EmbeddingPipeline()
-    pipeline.run(chunks, normalized_repo, repo_version=repo_version)
-    print("✓ Stored embeddings")
+    # failed files stay out of the recorded tree so the next run retries them
+    save_tree_state(normalized_repo, {
+        path: sha for path, sha in report["tree"].items()
+        if path not in failed_paths
+    }, aliases=duplicates, embedders=model_keys)
 
-    return {
+    result = {
         "status": "success",
-        "message": f"Successfully ingested {len(chunks)} chunks",
-        "chunk_count": len(chunks),
+        "message": f"Successfully ingested {chunk_count} chunks",
+        "chunk_count": chunk_count,
+        "reused_chunks": reused_count,
         "skipped": False,
+        "failed_files": report["failed_files"],
+        "selection": report.get("selection"),
+        "warnings": warnings,
+        "stages": stats["stages"],
+        "max_inflight_bytes": stats["max_inflight_bytes"],
+        "duplicates": duplicates,
+        "tokens": tokens,
+        "embedding_cache": embedding_cache,
     }
+    if incremental:
+        result["changed_files"] = len(changed_paths)
+    if incremental or reembedded_tree is not None:
+        result["removed_files"] = len(removed_paths)
+    return result
 
 
 def get_retriever():
@@ -115,11 +310,11 @@ def get_retriever():
         Retriever instance configured with dual embedders.
     """
     from retrieval.retriever_new import Retriever
-    from embeddings.code_embedder_new import CodeEmbedder
-    from embeddings.sentence_embedder import SentenceEmbedder
+    from embeddings.embedder_manager import get_code_embedder, get_text_embedder
 
     store = ChromaStore()
-    code_embedder = CodeEmbedder()
-    text_embedder = SentenceEmbedder()
+    # the shared embedders, on the configured backend
+    code_embedder = get_code_embedder()
+    text_embedder = get_text_embedder()
 
     return Retriever(store, code_embedder, text_embedder)
\ No newline at end of file
@@ -3,24 +3,52 @@ import numpy as np
 from embeddings.embedder_manager import get_code_embedder, get_text_embedder
 
 
-def cosine_similarity(a, b):
-    """Compute cosine similarity between two vectors."""
-    a = np.array(a)
-    b = np.array(b)
-    if np.linalg.norm(a) == 0 or np.linalg.norm(b) == 0:
-        return 0.0
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
-
-
-def flatten_embedding(embedding):
+def cosine_similarities(query_vector, vectors):
     """
-    If embedding is 2D (multiple vectors per document), take mean along axis 0.
-    Otherwise, return as-is.
+    Cosine similarity of a query vector with every row of `vectors`, in one
+    matrix product (0 for zero vectors). A document with several vectors
+    (3D input) is represented by their mean.
     """
-    arr = np.array(embedding)
-    if arr.ndim == 2:
-        return arr.mean(axis=0)
-    return arr
+    query = np.asarray(query_vector, dtype=np.float32)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 3:
+        matrix = matrix.mean(axis=1)
+    if matrix.size == 0:
+        return np.zeros(len(matrix), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    dots = matrix @ query
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def _results(raw, query_vector, source):
+    """Unwrap the (nested) results of one Chroma query and score them."""
+    if not raw.get("ids") or len(raw["ids"]) == 0 or len(raw["ids"][0]) == 0:
+        return []
+
+    try:
+        similarities = cosine_similarities(query_vector, raw["embeddings"][0])
+    except Exception as e:
+        print(f"[RETRIEVER] Error scoring {source} results: {e}")
+        return []
+
+    results = []
+    for i in range(len(raw["ids"][0])):
+        try:
+            # Safely unwrap metadata
+            metadata_item = raw["metadatas"][0][i]
+            if isinstance(metadata_item, list):
+                metadata_item = metadata_item[0] if len(metadata_item) > 0 else {}
+
+            results.append({
+                "similarity": float(similarities[i]),
+                "document": raw["documents"][0][i],
+                "metadata": metadata_item,
+                "source": source
+            })
+        except Exception as e:
+            print(f"[RETRIEVER] Error processing {source} result {i}: {e}")
+            continue
+    return results
 
 
 class Retriever:
@@ -77,53 +105,11 @@ class Retriever:
 
         print(f"[RETRIEVER] Retrieved: {code_count} code chunks, {text_count} text chunks")
 
-        # 3️⃣ Process code results (unwrap nested lists from Chroma)
-        code_results = []
-        if code_results_raw.get("ids") and len(code_results_raw["ids"]) > 0 and len(code_results_raw["ids"][0]) > 0:
-            for i in range(len(code_results_raw["ids"][0])):
-                try:
-                    doc_vector = flatten_embedding(code_results_raw["embeddings"][0][i])
-                    sim = cosine_similarity(code_query_vector, doc_vector)
-
-                    # Safely unwrap metadata
-                    metadata_item = code_results_raw["metadatas"][0][i]
-                    if isinstance(metadata_item, list):
-                        metadata_item = metadata_item[0] if len(metadata_item) > 0 else {}
-
-                    code_results.append({
-                        "similarity": sim,
-                        "document": code_results_raw["documents"][0][i],
-                        "metadata": metadata_item,
-                        "source": "code"
-                    })
-                except Exception as e:
-                    print(f"[RETRIEVER] Error processing code result {i}: {e}")
-                    continue
-
-        # 4️⃣ Process text results (unwrap nested lists from Chroma)
-        text_results = []
-        if text_results_raw.get("ids") and len(text_results_raw["ids"]) > 0 and len(text_results_raw["ids"][0]) > 0:
-            for i in range(len(text_results_raw["ids"][0])):
-                try:
-                    doc_vector = flatten_embedding(text_results_raw["embeddings"][0][i])
-                    sim = cosine_similarity(text_query_vector, doc_vector)
-
-                    # Safely unwrap metadata
-                    metadata_item = text_results_raw["metadatas"][0][i]
-                    if isinstance(metadata_item, list):
-                        metadata_item = metadata_item[0] if len(metadata_item) > 0 else {}
-
-                    text_results.append({
-                        "similarity": sim,
-                        "document": text_results_raw["documents"][0][i],
-                        "metadata": metadata_item,
-                        "source": "text"
-                    })
-                except Exception as e:
-                    print(f"[RETRIEVER] Error processing text result {i}: {e}")
-                    continue
-
-        # 5️⃣ Merge results and sort by similarity
+        # 3️⃣ Score code and text results (unwrap nested lists from Chroma)
+        code_results = _results(code_results_raw, code_query_vector, "code")
+        text_results = _results(text_results_raw, text_query_vector, "text")
+
+        # 4️⃣ Merge results and sort by similarity
         combined = code_results + text_results
         for r in combined:
          if r["metadata"].get("type") == "repo_summary":
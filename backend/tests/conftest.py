@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# the backend modules import each other as top-level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config reads these at import time
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("GITHUB_PAT", "test")
+os.environ.setdefault("GITSAGE_DATA_DIR", tempfile.mkdtemp(prefix="gitsage-tests-"))
+# validate/chunk in a thread: no worker processes to spawn in tests
+os.environ.setdefault("GITSAGE_PROCESS_WORKERS", "0")
@@ -0,0 +1,131 @@
+import asyncio
+import io
+import os
+import tarfile
+
+import pytest
+
+from repo_ingestion import archive_downloader
+from repo_ingestion.archive_downloader import ARCHIVE_QUEUE_DEPTH, download_repo_archive_async
+
+
+class FakeContent:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeResponse:
+    def __init__(self, chunks):
+        self.content = FakeContent(chunks)
+
+    def raise_for_status(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def get(self, url, timeout=None):
+        return FakeResponse(self.chunks)
+
+
+class FakeClient:
+    def __init__(self, chunks):
+        self._session = FakeSession(chunks)
+
+    async def session(self):
+        return self._session
+
+
+def tarball(file_count: int) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for i in range(file_count):
+            # random contents: the archive stays large after compression
+            data = f"def f_{i}():\n    return {i}\n# ".encode() + os.urandom(4096).hex().encode()
+            info = tarfile.TarInfo(f"owner-repo-sha/src/module_{i}.py")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def split(data: bytes, size: int = 1024):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def download(chunks, on_file=None):
+    return download_repo_archive_async(
+        "owner", "repo", "main", client=FakeClient(chunks), on_file=on_file,
+    )
+
+
+def test_corrupt_archive_fails_instead_of_hanging():
+    chunks = [b"not a gzip stream" * 64] * (4 * ARCHIVE_QUEUE_DEPTH)
+
+    async def run():
+        await asyncio.wait_for(download(chunks), timeout=10)
+
+    with pytest.raises(tarfile.TarError):
+        asyncio.run(run())
+
+
+def test_on_file_error_reaches_the_caller():
+    chunks = split(tarball(50))
+    assert len(chunks) > 4 * ARCHIVE_QUEUE_DEPTH
+
+    async def on_file(path, content):
+        raise ValueError(f"cannot process {path}")
+
+    async def run():
+        await asyncio.wait_for(download(chunks, on_file), timeout=10)
+
+    with pytest.raises(ValueError, match="cannot process"):
+        asyncio.run(run())
+
+
+def test_cancelled_download_releases_the_reader_thread(monkeypatch):
+    chunks = split(tarball(50))
+    entered = asyncio.Event()
+    cancelled = []
+
+    async def on_file(path, content):
+        entered.set()
+        try:
+            await asyncio.Event().wait()  # a consumer that never catches up
+        except asyncio.CancelledError:
+            cancelled.append(path)
+            raise
+
+    extracting = []
+    real_extract = archive_downloader._extract_archive
+
+    def extract(*args):
+        extracting.append(True)
+        try:
+            return real_extract(*args)
+        finally:
+            extracting.pop()
+
+    monkeypatch.setattr(archive_downloader, "_extract_archive", extract)
+
+    async def run():
+        task = asyncio.ensure_future(download(chunks, on_file))
+        await asyncio.wait_for(entered.wait(), timeout=10)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=10)
+
+    asyncio.run(run())
+    assert cancelled, "the pending on_file call was not cancelled"
+    assert not extracting, "the reader thread is still running"
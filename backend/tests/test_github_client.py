@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from benchmarks.github_standin import Simulation, start_standin
+from repo_ingestion import github_client, step1_pipeline
+from repo_ingestion.github_client import GitHubClient, TreeTruncatedError
+
+TREE_LIMIT = 20
+
+
+def wide_fixture():
+    # one directory with more entries than a listing returns
+    files = {"README.md": "# wide\n"}
+    files.update({f"wide/module_{i}.py": f"VALUE = {i}\n" for i in range(TREE_LIMIT * 2)})
+    return {
+        "metadata": {"full_name": "example/wide", "default_branch": "main"},
+        "files": files,
+    }
+
+
+def test_truncated_directory_listing_raises(monkeypatch):
+    async def run():
+        runner, base_url = await start_standin(
+            {"example/wide": wide_fixture()}, Simulation(tree_limit=TREE_LIMIT)
+        )
+        monkeypatch.setattr(github_client, "API_BASE", base_url)
+        client = GitHubClient(token=None)
+        try:
+            await client.fetch_repo_tree("example", "wide", "main")
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    with pytest.raises(TreeTruncatedError):
+        asyncio.run(run())
+
+
+def test_truncated_tree_falls_back_to_the_archive(monkeypatch):
+    calls = []
+
+    async def fetch_repo_tree_async(owner, repo, branch):
+        raise TreeTruncatedError("truncated")
+
+    async def download_repo_archive_async(owner, repo, branch, wanted_paths=None, **kwargs):
+        calls.append(wanted_paths)
+        return [{"path": "README.md", "content": "# wide\n"}]
+
+    monkeypatch.setattr(step1_pipeline, "fetch_repo_tree_async", fetch_repo_tree_async)
+    monkeypatch.setattr(step1_pipeline, "download_repo_archive_async", download_repo_archive_async)
+    monkeypatch.setattr(step1_pipeline, "extract_repo_summary", lambda *args: None)
+
+    report = {}
+    files = asyncio.run(step1_pipeline.run_step1_async(
+        "https://github.com/example/wide", mode="files", report=report,
+        metadata={"default_branch": "main"},
+    ))
+
+    # every file of the archive, not a selection from the incomplete tree
+    assert calls == [None]
+    assert report["tree_truncated"] is True
+    assert [f["path"] for f in files] == ["README.md"]
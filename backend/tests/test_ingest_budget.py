@@ -0,0 +1,29 @@
+from repo_ingestion.before_file_download_filter import filter_repo_tree
+from repo_ingestion.unified_pipeline import _ingest_warnings
+
+
+def tree(count, size=20_000):
+    return [
+        {"type": "blob", "path": f"src/module_{i}.py", "size": size, "sha": f"{i:040x}"}
+        for i in range(count)
+    ]
+
+
+def test_no_budget_by_default():
+    # more files and bytes than the old defaults (5000 files, 50 MiB)
+    report = {}
+    selected = filter_repo_tree(tree(6000), report=report)
+
+    assert len(selected) == 6000
+    assert report["selection"]["cut_files"] == 0
+    assert _ingest_warnings(report) == []
+
+
+def test_partial_ingest_is_reported():
+    report = {}
+    selected = filter_repo_tree(tree(10), max_files=4, report=report)
+
+    assert len(selected) == 4
+    warnings = _ingest_warnings(report)
+    assert len(warnings) == 1
+    assert "left out 6 of 10 files" in warnings[0]
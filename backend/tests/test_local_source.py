@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from repo_ingestion import local_source
+from repo_ingestion.local_source import LocalSourceError, resolve_local_source
+
+
+def test_disabled_rejects_paths_and_ignores_github_urls(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_source, "LOCAL_SOURCES_ENABLED", False)
+
+    for link in ("/etc", "~", str(tmp_path), f"file://{tmp_path}", "."):
+        with pytest.raises(LocalSourceError):
+            resolve_local_source(link)
+
+    monkeypatch.setattr(os.path, "isdir", lambda path: pytest.fail("filesystem checked"))
+    assert resolve_local_source("https://github.com/example/repo") is None
+    assert resolve_local_source("github.com/example/repo") is None
+
+
+def test_enabled_only_reads_under_the_roots(monkeypatch, tmp_path):
+    root = tmp_path / "mirrors"
+    repo = root / "repo"
+    repo.mkdir(parents=True)
+    outside = tmp_path / "secrets"
+    outside.mkdir()
+    (root / "escape").symlink_to(outside)
+
+    monkeypatch.setattr(local_source, "LOCAL_SOURCES_ENABLED", True)
+    monkeypatch.setattr(local_source, "LOCAL_SOURCE_ROOTS", [os.path.realpath(root)])
+
+    assert resolve_local_source(str(repo)) == str(repo)
+    assert resolve_local_source(f"file://{repo}") == str(repo)
+    for link in (str(outside), str(root / "escape"), str(root / "repo" / ".." / ".." / "secrets"), "/etc"):
+        with pytest.raises(LocalSourceError):
+            resolve_local_source(link)
+    assert resolve_local_source("https://github.com/example/repo") is None
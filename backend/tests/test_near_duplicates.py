@@ -0,0 +1,31 @@
+from repo_ingestion.before_file_download_filter import score_file
+from repo_ingestion.near_duplicates import NearDuplicateIndex, fingerprint
+
+SOURCE = "".join(f"def function_{n}(value):\n    return value * {n} + {n * 7}\n\n" for n in range(40))
+
+
+def add(index, path, text=SOURCE, ranked=True):
+    score = score_file(path, len(text)) if ranked else None
+    return index.add(path, *fingerprint(text), score=score)
+
+
+def test_better_ranked_file_takes_over_its_cluster():
+    index = NearDuplicateIndex(threshold=0.9)
+    assert add(index, "vendor/copy_a.py") is None
+    # arrives later, but a source file outranks a vendored copy
+    assert add(index, "src/module_114.py") is None
+    assert add(index, "examples/copy_b.py") == "src/module_114.py"
+    near_copy = SOURCE.replace("function_39", "function_thirty_nine")
+    assert add(index, "third_party/copy_c.py", near_copy) == "src/module_114.py"
+
+    assert index.demoted == ["vendor/copy_a.py"]
+    assert index.aliases == {
+        "src/module_114.py": ["vendor/copy_a.py", "examples/copy_b.py", "third_party/copy_c.py"],
+    }
+
+
+def test_without_scores_the_first_file_stays():
+    index = NearDuplicateIndex(threshold=0.9)
+    assert add(index, "vendor/copy_a.py", ranked=False) is None
+    assert add(index, "src/module_114.py", ranked=False) == "vendor/copy_a.py"
+    assert index.demoted == []
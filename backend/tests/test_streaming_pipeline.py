@@ -0,0 +1,217 @@
+import asyncio
+import random
+
+import pytest
+
+from repo_ingestion import streaming_pipeline
+from repo_ingestion.streaming_pipeline import run_streaming_ingest
+
+
+class FailingRouter:
+    parallelism = 1
+
+    def route_and_embed(self, chunks):
+        raise RuntimeError("embedder failed")
+
+    def cache_stats(self):
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0}
+
+
+class MemoryStore:
+    def __init__(self):
+        self.added = []
+        self.deleted_paths = []
+
+    def add_embeddings(self, chunks, repo_url):
+        self.added.extend(chunks)
+
+    def delete_paths(self, repo_url, paths):
+        self.deleted_paths.extend(paths)
+
+
+def python_file(i: int) -> str:
+    return "".join(f"def function_{i}_{n}(x):\n    return x * {n} + {i}\n\n" for n in range(5))
+
+
+async def produce_files(on_file):
+    # more files than the file queue holds, so the download stage is still
+    # producing when the embed stage fails
+    for i in range(4 * streaming_pipeline.FILE_QUEUE_SIZE):
+        await on_file(f"src/module_{i}.py", python_file(i))
+
+
+def test_embed_failure_reaches_the_caller():
+    async def ingest():
+        return await asyncio.wait_for(
+            run_streaming_ingest(
+                "https://github.com/example/repo",
+                produce_files,
+                router=FailingRouter(),
+                store=MemoryStore(),
+            ),
+            timeout=30,
+        )
+
+    with pytest.raises(RuntimeError, match="embedder failed"):
+        asyncio.run(ingest())
+
+
+class RecordingRouter:
+    parallelism = 1
+
+    def __init__(self):
+        self.embedded = []
+
+    def model_keys(self):
+        return {"code": "codet5:masked-mean", "text": "minilm"}
+
+    def route_and_embed(self, chunks):
+        keys = self.model_keys()
+        for chunk in chunks:
+            chunk["vector"] = [0.0]
+            chunk["embedder"] = keys["code" if chunk["type"] == "code" else "text"]
+        self.embedded.extend(chunks)
+        return chunks
+
+    def cache_stats(self):
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0}
+
+
+class StoredChunks(MemoryStore):
+    def __init__(self, stored):
+        super().__init__()
+        # {chunk id: embedder its vector was made with}
+        self.stored = stored
+        self.refreshed = []
+
+    def existing_ids(self, ids, embedders=None):
+        return {
+            chunk_id for chunk_id in ids
+            if chunk_id in self.stored and self.stored[chunk_id] == embedders["code"]
+        }
+
+    def update_metadata(self, chunks, repo_url):
+        self.refreshed.extend(chunks)
+
+    def delete_stale_chunks(self, repo_url, kept_ids):
+        return 0
+
+
+def test_chunks_of_another_embedder_are_embedded_again():
+    async def produce(on_file):
+        for i in range(2):
+            await on_file(f"src/module_{i}.py", python_file(i))
+
+    async def ingest(router, store, reuse_existing=True):
+        return await run_streaming_ingest(
+            "https://github.com/example/repo", produce,
+            router=router, store=store, reuse_existing=reuse_existing,
+        )
+
+    # first ingest: learn the chunk ids
+    router = RecordingRouter()
+    asyncio.run(ingest(router, MemoryStore(), reuse_existing=False))
+    first, second = {}, {}
+    for chunk in router.embedded:
+        (first if chunk["path"] == "src/module_0.py" else second)[chunk["id"]] = chunk["embedder"]
+    assert first and second
+
+    # module_0 was stored with the current pooling, module_1 before it changed
+    stored = dict(first)
+    stored.update({chunk_id: "codet5" for chunk_id in second})
+    router = RecordingRouter()
+    store = StoredChunks(stored)
+    asyncio.run(ingest(router, store))
+
+    assert {chunk["id"] for chunk in router.embedded} == set(second)
+    assert {chunk["id"] for chunk in store.refreshed} == set(first)
+    assert all(chunk["embedder"] == "codet5:masked-mean" for chunk in store.refreshed)
+
+
+def test_outranked_duplicate_is_removed_from_the_store():
+    async def produce(on_file):
+        # the vendored copy arrives before the source file it copies
+        await on_file("vendor/copy_a.py", python_file(114))
+        await on_file("src/module_114.py", python_file(114))
+
+    store = MemoryStore()
+    stats = asyncio.run(run_streaming_ingest(
+        "https://github.com/example/repo", produce, router=RecordingRouter(), store=store,
+    ))
+
+    assert stats["duplicates"] == {"src/module_114.py": ["vendor/copy_a.py"]}
+    assert store.deleted_paths == ["vendor/copy_a.py"]
+    assert any(chunk["path"] == "src/module_114.py" for chunk in store.added)
+
+
+class ParallelFailingRouter(RecordingRouter):
+    # several batches in flight, as with embedding workers; the second fails
+    parallelism = 4
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def route_and_embed(self, chunks):
+        self.calls += 1
+        if self.calls == 2:
+            raise RuntimeError("embedder failed")
+        return super().route_and_embed(chunks)
+
+
+def test_embed_failure_with_batches_in_flight_reaches_the_caller():
+    async def ingest():
+        return await asyncio.wait_for(
+            run_streaming_ingest(
+                "https://github.com/example/repo",
+                produce_files,
+                router=ParallelFailingRouter(),
+                store=MemoryStore(),
+            ),
+            timeout=30,
+        )
+
+    with pytest.raises(RuntimeError, match="embedder failed"):
+        asyncio.run(ingest())
+
+
+def markdown_file(rng: random.Random, i: int) -> str:
+    return "".join(
+        f"## Section {i}.{n}\n\nNotes on item {rng.randint(0, 10 ** 6)} of the guide.\n\n"
+        for n in range(rng.randint(1, 60))
+    )
+
+
+@pytest.mark.parametrize("limit", [8_000, 12_000, 20_000, 30_000])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_concurrent_downloads_under_a_small_budget_finish(monkeypatch, limit, seed):
+    monkeypatch.setattr(streaming_pipeline, "INGEST_MAX_INFLIGHT_BYTES", limit)
+    # every file is embedded: none is dropped as a near-duplicate
+    monkeypatch.setattr(streaming_pipeline, "DEDUP_THRESHOLD", 0)
+    rng = random.Random(seed)
+    files = 300
+
+    async def produce(on_file):
+        # as many concurrent downloads as the files mode runs by default
+        paths = list(range(files))
+
+        async def download():
+            while paths:
+                i = paths.pop()
+                await asyncio.sleep(rng.random() / 200)
+                await on_file(f"docs/page_{i}.md", markdown_file(rng, i))
+
+        await asyncio.gather(*(download() for _ in range(16)))
+
+    async def ingest():
+        return await asyncio.wait_for(
+            run_streaming_ingest(
+                "https://github.com/example/repo", produce,
+                router=RecordingRouter(), store=MemoryStore(),
+            ),
+            timeout=30,
+        )
+
+    stats = asyncio.run(ingest())
+    assert stats["file_count"] == files
+    assert stats["stored_count"] == stats["chunk_count"]
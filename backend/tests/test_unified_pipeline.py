@@ -0,0 +1,68 @@
+import asyncio
+
+from repo_ingestion import unified_pipeline
+from repo_ingestion.tree_state import load_tree_embedders, save_tree_state
+
+REPO = "https://github.com/example/reembed"
+MODEL_KEYS = {"code": "codet5:masked-mean", "text": "minilm"}
+
+
+class FakeStore:
+    def __init__(self):
+        self.deleted_paths = []
+
+    def has_repo_chunks(self, repo_url):
+        return True
+
+    def delete_paths(self, repo_url, paths):
+        self.deleted_paths.extend(paths)
+
+    def set_path_aliases(self, repo_url, aliases):
+        pass
+
+    def mark_repo_ingested(self, repo_url, repo_version):
+        pass
+
+
+class FakeRouter:
+    def model_keys(self):
+        return MODEL_KEYS
+
+
+def test_embedder_change_removes_chunks_of_deleted_files(monkeypatch):
+    store = FakeStore()
+    previous_trees = []
+
+    async def fetch_meta_repodata_async(owner, repo):
+        return {"default_branch": "main", "pushed_at": "2024-02-01T00:00:00Z"}
+
+    async def run_step1_async(repo_link, report=None, previous_tree=None, **kwargs):
+        previous_trees.append(previous_tree)
+        report["tree"] = {"README.md": "a" * 40}
+
+    async def run_streaming_ingest(repo_url, produce, **kwargs):
+        await produce(None)
+        return {
+            "duplicates": {}, "chunk_count": 1, "reused_count": 0, "stages": {},
+            "max_inflight_bytes": 0,
+            "embedding_cache": {"hits": 0, "misses": 1, "hit_rate": 0.0},
+        }
+
+    monkeypatch.setattr(unified_pipeline, "ChromaStore", lambda: store)
+    monkeypatch.setattr(unified_pipeline, "EmbeddingRouter", FakeRouter)
+    monkeypatch.setattr(unified_pipeline, "fetch_meta_repodata_async", fetch_meta_repodata_async)
+    monkeypatch.setattr(unified_pipeline, "run_step1_async", run_step1_async)
+    monkeypatch.setattr(unified_pipeline, "run_streaming_ingest", run_streaming_ingest)
+
+    # last ingested before the CodeT5 pooling changed; old.py is gone since
+    repo = unified_pipeline.normalize_repo_url(REPO)
+    save_tree_state(repo, {"README.md": "a" * 40, "old.py": "b" * 40},
+                    embedders={"code": "codet5", "text": "minilm"})
+
+    result = asyncio.run(unified_pipeline.ingest_repository(REPO))
+
+    # every file is processed again, and the deleted one leaves the store
+    assert previous_trees == [None]
+    assert store.deleted_paths == ["old.py"]
+    assert result["removed_files"] == 1
+    assert load_tree_embedders(repo) == MODEL_KEYS
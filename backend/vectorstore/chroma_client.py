@@ -3,9 +3,10 @@ import uuid
 import chromadb
 from chromadb.config import Settings
 
-# Get absolute path for persistent DB
-base_dir = os.path.dirname(os.path.abspath(__file__))
-persist_dir = os.path.join(base_dir, "chroma_db")
+from config import CHROMA_DB_DIR
+
+# Absolute path of the persistent DB (GITSAGE_CHROMA_DIR / GITSAGE_DATA_DIR)
+persist_dir = os.path.abspath(CHROMA_DB_DIR)
 
 print(f"[chroma_client] Using persist_directory={persist_dir}")
 
@@ -1,12 +1,24 @@
 # vectorstore/chroma_store.py
+import hashlib
 import os
-import uuid
 
 import chromadb
+import numpy as np
 
+from config import CHROMA_DB_DIR
 from ingestion.repo_fetcher import normalize_repo_url
 
 
+def chunk_id(repo_url: str, path: str, text: str) -> str:
+    """
+    Stable id of a chunk: the same text at the same path of the same repo
+    always maps to the same id, across batches and re-ingests.
+    """
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = f"{repo_url}\n{path}\n{content_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
 class ChromaStore:
     """
     Centralized access to ChromaDB collections used by GitSage.
@@ -35,12 +47,17 @@ class ChromaStore:
     @staticmethod
     def _initialize_shared_client(db_path: str | None = None) -> None:
         if db_path is None:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(base_dir, "chroma_db")
+            db_path = CHROMA_DB_DIR
         db_path = os.path.abspath(db_path)
 
         print(f"[ChromaStore] Using persist_directory={db_path}")
 
+        if db_path != os.path.abspath(CHROMA_DB_DIR):
+            # chroma_client always opens the configured store
+            ChromaStore._shared_client = chromadb.PersistentClient(path=db_path)
+            ChromaStore._initialized = True
+            return
+
         try:
             from vectorstore.chroma_client import client as shared_client
 
@@ -56,67 +73,208 @@ class ChromaStore:
     # ------------------------------------------------------------------
     # Embedding storage
     # ------------------------------------------------------------------
+    def _chunk_record(self, chunk, normalized_repo: str):
+        """
+        (collection, id, document, metadata) of one chunk.
+        """
+        # Ensure text payload is always a plain string for Chroma
+        text = chunk.get("text", "")
+        if isinstance(text, list):
+            text = "\n".join(str(t) for t in text)
+        else:
+            text = str(text)
+
+        base_id = chunk.get("id") or chunk_id(normalized_repo, chunk["path"], text)
+        metadata = {
+            "repo_url": normalized_repo,
+            "path": chunk["path"],
+            "language": chunk["language"],
+            "type": chunk["type"],
+        }
+        for key in ("start_line", "end_line", "kind", "symbol"):
+            # location within the file, when the chunker knows it
+            if chunk.get(key) is not None:
+                metadata[key] = chunk[key]
+        if chunk.get("aliases"):
+            # near-duplicate files represented by this chunk's file
+            metadata["aliases"] = chunk["aliases"]
+        if chunk.get("embedder"):
+            # model and pooling the vector was made with; the id only
+            # covers the text, so this tells whether it must be re-embedded
+            metadata["embedder"] = chunk["embedder"]
+
+        collection = self.code_collection if chunk["type"] == "code" else self.text_collection
+        return collection, base_id, text, metadata
+
     def add_embeddings(self, embedded_chunks, repo_url: str):
         """
         Persist a batch of embedded chunks into code/text collections.
 
+        Chunks are upserted under content-derived ids (see chunk_id), so
+        writing the same chunk again replaces it instead of duplicating it.
+
         Each chunk is expected to have:
             - path
             - language
             - type ("code" | "text")
             - text
-            - vector
+            - vector (float32 array)
         """
-        code_ids, code_docs, code_embeds, code_meta = [], [], [], []
-        text_ids, text_docs, text_embeds, text_meta = [], [], [], []
+        normalized_repo = normalize_repo_url(repo_url)
+        batches = {}
+
+        for chunk in embedded_chunks:
+            collection, base_id, text, metadata = self._chunk_record(chunk, normalized_repo)
+            ids, docs, embeds, metas = batches.setdefault(collection.name, (collection, [], [], [], []))[1:]
+            ids.append(base_id)
+            docs.append(text)
+            embeds.append(chunk["vector"])
+            metas.append(metadata)
+
+        for collection, ids, docs, embeds, metas in batches.values():
+            # one contiguous float32 matrix; chromadb takes it without
+            # converting every vector to a list of Python floats
+            collection.upsert(
+                ids=ids,
+                documents=docs,
+                embeddings=np.stack([np.asarray(vector, dtype=np.float32) for vector in embeds]),
+                metadatas=metas,
+            )
+
+        print("Code count:", self.code_collection.count())
+        print("Text count:", self.text_collection.count())
 
+    def update_metadata(self, chunks, repo_url: str) -> None:
+        """
+        Rewrite the metadata (line ranges, aliases...) of chunks that are
+        already stored, keeping their documents and embeddings.
+        """
         normalized_repo = normalize_repo_url(repo_url)
+        batches = {}
 
-        for i, chunk in enumerate(embedded_chunks):
-            # Ensure text payload is always a plain string for Chroma
-            text = chunk.get("text", "")
-            if isinstance(text, list):
-                text = "\n".join(str(t) for t in text)
-            else:
-                text = str(text)
-
-            base_id = f"{normalized_repo}_{chunk['path']}_{i}"
-            metadata = {
-                "repo_url": normalized_repo,
-                "path": chunk["path"],
-                "language": chunk["language"],
-                "type": chunk["type"],
-            }
+        for chunk in chunks:
+            collection, base_id, _, metadata = self._chunk_record(chunk, normalized_repo)
+            ids, metas = batches.setdefault(collection.name, (collection, [], []))[1:]
+            ids.append(base_id)
+            metas.append(metadata)
 
-            if chunk["type"] == "code":
-                code_ids.append(base_id)
-                code_docs.append(text)
-                code_embeds.append(chunk["vector"])
-                code_meta.append(metadata)
-            else:
-                text_ids.append(base_id)
-                text_docs.append(text)
-                text_embeds.append(chunk["vector"])
-                text_meta.append(metadata)
-
-        if code_ids:
-            self.code_collection.add(
-                ids=code_ids,
-                documents=code_docs,
-                embeddings=code_embeds,
-                metadatas=code_meta,
-            )
+        for collection, ids, metas in batches.values():
+            collection.update(ids=ids, metadatas=metas)
+
+    def existing_ids(self, ids, embedders: dict | None = None) -> set:
+        """
+        The subset of `ids` already present in the code/text collections.
 
-        if text_ids:
-            self.text_collection.add(
-                ids=text_ids,
-                documents=text_docs,
-                embeddings=text_embeds,
-                metadatas=text_meta,
+        Args:
+            ids: Chunk ids to look up
+            embedders: Optional {"code": model key, "text": model key}; a
+                       chunk only counts as present when its vector was
+                       made by the current embedder of its collection
+        """
+        ids = list(ids)
+        if not ids:
+            return set()
+
+        found = set()
+        for route, collection in (("code", self.code_collection), ("text", self.text_collection)):
+            if embedders is None:
+                found.update(collection.get(ids=ids, include=[]).get("ids") or [])
+                continue
+            existing = collection.get(ids=ids, include=["metadatas"])
+            found.update(
+                stored_id
+                for stored_id, meta in zip(existing.get("ids") or [], existing.get("metadatas") or [])
+                if (meta or {}).get("embedder") == embedders.get(route)
             )
+        return found
 
-        print("Code count:", self.code_collection.count())
-        print("Text count:", self.text_collection.count())
+    def delete_stale_chunks(self, repo_url: str, kept_ids, batch_size: int = 500) -> int:
+        """
+        Remove the chunks of the given files that are not in their new set
+        of chunk ids (edited, dropped or moved-out content).
+
+        Args:
+            repo_url: Repository the files belong to
+            kept_ids: {path: set of chunk ids the file has now}
+
+        Returns:
+            Number of chunks deleted
+        """
+        normalized_repo = normalize_repo_url(repo_url)
+        paths = list(kept_ids)
+        deleted = 0
+
+        for start in range(0, len(paths), batch_size):
+            where = {
+                "$and": [
+                    {"repo_url": normalized_repo},
+                    {"path": {"$in": paths[start:start + batch_size]}},
+                ]
+            }
+            for collection in (self.code_collection, self.text_collection):
+                existing = collection.get(where=where, include=["metadatas"])
+                stale = [
+                    stored_id
+                    for stored_id, meta in zip(existing.get("ids") or [], existing.get("metadatas") or [])
+                    if stored_id not in kept_ids.get((meta or {}).get("path"), ())
+                ]
+                if stale:
+                    collection.delete(ids=stale)
+                    deleted += len(stale)
+
+        return deleted
+
+    def delete_paths(self, repo_url: str, paths, batch_size: int = 500) -> None:
+        """
+        Remove every stored chunk of the given files from code/text collections.
+        Used by incremental re-ingestion for deleted and modified files.
+        """
+        paths = list(paths)
+        if not paths:
+            return
+
+        normalized_repo = normalize_repo_url(repo_url)
+
+        for start in range(0, len(paths), batch_size):
+            where = {
+                "$and": [
+                    {"repo_url": normalized_repo},
+                    {"path": {"$in": paths[start:start + batch_size]}},
+                ]
+            }
+            self.code_collection.delete(where=where)
+            self.text_collection.delete(where=where)
+
+    def set_path_aliases(self, repo_url: str, aliases) -> None:
+        """
+        Record the near-duplicate aliases of already stored files.
+
+        Args:
+            repo_url: Repository the files belong to
+            aliases: {path: alias string}; an empty string clears the aliases
+        """
+        normalized_repo = normalize_repo_url(repo_url)
+
+        for path, alias_text in aliases.items():
+            where = {"$and": [{"repo_url": normalized_repo}, {"path": path}]}
+            for collection in (self.code_collection, self.text_collection):
+                existing = collection.get(where=where, include=["metadatas"])
+                ids = existing.get("ids") or []
+                if not ids:
+                    continue
+                metadatas = [dict(meta or {}, aliases=alias_text) for meta in existing["metadatas"]]
+                collection.update(ids=ids, metadatas=metadatas)
+
+    def has_repo_chunks(self, repo_url: str) -> bool:
+        """
+        Check whether any chunk of this repo is present in the store.
+        """
+        where = {"repo_url": normalize_repo_url(repo_url)}
+
+        for collection in (self.code_collection, self.text_collection):
+            if collection.get(where=where, limit=1, include=[]).get("ids"):
+                return True
+        return False
 
     # ------------------------------------------------------------------
     # Repository ingestion index (to avoid re-embedding unchanged repos)